@@ -14,3 +14,7 @@ class CustomerdataapiConfig(AppConfig):
     """
 
     name = 'customerdataapi'
+
+    def ready(self):
+        # Connects the signal receivers of the application.
+        from customerdataapi import signals  # pylint: disable=import-outside-toplevel,unused-import
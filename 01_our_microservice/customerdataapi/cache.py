@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Per record cache of the serialized CustomerData answered by the retrieve route.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+HITS_KEY = 'customerdata:hits'
+MISSES_KEY = 'customerdata:misses'
+
+
+def customer_cache():
+    """
+    The Django cache of the CustomerData, see CUSTOMERDATA_CACHE
+    """
+    return caches[getattr(settings, 'CUSTOMERDATA_CACHE', 'default')]
+
+
+def stats_cache():
+    """
+    The Django cache of the hit and miss counters, see CUSTOMERDATA_STATS_CACHE.
+    It is kept apart so the counters are not evicted with the customers
+    """
+    return caches[getattr(settings, 'CUSTOMERDATA_STATS_CACHE', 'default')]
+
+
+def cache_key(customer_id):
+    """
+    Cache key of the CustomerData of a customer id, or None when it is
+    not a valid UUID. The UUID is normalized, so every spelling of the
+    same primary key gets the key its signals invalidate
+    """
+    try:
+        return f'customerdata:{uuid.UUID(str(customer_id))}'
+    except ValueError:
+        return None
+
+
+def generation_key(key):
+    """
+    Cache key of the generation of the CustomerData of a cache key
+    """
+    return f'{key}:generation'
+
+
+def current_generation(cache, key):
+    """
+    Returns the generation of the CustomerData of a cache key, a random
+    token replaced by every invalidation, starting a new one when missing
+    """
+    generation = cache.get(generation_key(key))
+    if generation is None:
+        cache.add(generation_key(key), uuid.uuid4().hex, timeout=None)
+        generation = cache.get(generation_key(key))
+    return generation
+
+
+def count(key):
+    """
+    Increases one of the hit and miss counters of the cache
+    """
+    cache = stats_cache()
+    cache.add(key, 0, timeout=None)
+    cache.incr(key)
+
+
+def get_or_cache_customer(customer_id, load):
+    """
+    Returns the serialized CustomerData of a customer id from the cache,
+    or the one returned by `load`, which is then kept in the cache. The
+    customers are cached under the generation read before loading them,
+    so a customer loaded while a concurrent write invalidates it is kept
+    under a generation nobody reads anymore, instead of served stale
+    """
+    key = cache_key(customer_id)
+    if key is None:
+        return load()
+    cache = customer_cache()
+    versioned_key = f'{key}:{current_generation(cache, key)}'
+    data = cache.get(versioned_key)
+    count(MISSES_KEY if data is None else HITS_KEY)
+    if data is None:
+        data = load()
+        cache.set(versioned_key, dict(data))
+    return data
+
+
+def invalidate_customers(*customer_ids):
+    """
+    Starts a new generation of the CustomerData of the customer ids in the
+    cache, at once and again when the current transaction commits, so a
+    retrieve served in between does not keep the previous version in the cache
+    """
+    keys = [cache_key(customer_id) for customer_id in customer_ids]
+
+    def invalidate():
+        customer_cache().set_many({generation_key(key): uuid.uuid4().hex for key in keys}, timeout=None)
+
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def get_cache_stats():
+    """
+    Returns the hits and misses of the cache since it started,
+    and the ratio of retrieves answered from the cache
+    """
+    cache = stats_cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / lookups if lookups else 0.0}
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Key level changes applied to the data of our customers.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+from customerdataapi.serializers import CustomerDataChangeSerializer
+
+
+class ChangeError(Exception):
+    """
+    Raised when a change can not be applied to the data of a customer
+    """
+
+
+def apply_key_changes(data, update, delete):
+    """
+    Returns the data with the keys in `update` added or replaced
+    and the keys in `delete` removed
+    """
+    data = {} if data is None else data
+    if not isinstance(data, dict):
+        raise ChangeError('The customer data is not a JSON object.')
+    for key in delete:
+        data.pop(key, None)
+    data.update(update)
+    return data
+
+
+def merge_patch(target, patch):
+    """
+    Applies a JSON merge patch (RFC 7396) to the target: the members of
+    the patch set to null are removed from the target, the objects are
+    merged recursively and any other value replaces the target one
+    """
+    if not isinstance(patch, dict):
+        return patch
+    if not isinstance(target, dict):
+        target = {}
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        else:
+            target[key] = merge_patch(target.get(key), value)
+    return target
+
+
+def failed(customer_id, errors):
+    """
+    Result of a change that could not be applied
+    """
+    return {'id': str(customer_id), 'status': 'failed', 'errors': errors}
+
+
+def conflict(customer):
+    """
+    Result of a change that expected another version of the customer
+    """
+    errors = [f'The customer data is at version {customer.version}.']
+    return {'id': str(customer.id), 'status': 'conflict', 'errors': errors}
+
+
+def apply_change(serializer, customers, updated):
+    """
+    Applies a validated change to its customer, which is then added to
+    the `updated` customers. Returns the result of the change
+    """
+    if not serializer.is_valid():
+        return failed(serializer.initial_data.get('id', ''), serializer.errors)
+
+    change = serializer.validated_data
+    customer = customers.get(change['id'])
+    if customer is None:
+        return failed(change['id'], ['Not found.'])
+    if change.get('version', customer.version) != customer.version:
+        return conflict(customer)
+    try:
+        customer.data = apply_key_changes(customer.data, change['update'], change['delete'])
+    except ChangeError as error:
+        return failed(change['id'], [str(error)])
+
+    updated[customer.id] = customer
+    return {'id': str(customer.id), 'status': 'updated'}
+
+
+def apply_bulk_changes(changes, queryset):
+    """
+    Applies the key level changes to the customers of the queryset, in
+    order. Every change is checked against the version the customer had
+    before the request, which is then increased once per updated customer.
+    Returns the result of every change and the updated customers
+    """
+    serializers = [CustomerDataChangeSerializer(data=change) for change in changes]
+    ids = [serializer.validated_data['id'] for serializer in serializers if serializer.is_valid()]
+    customers = {customer.id: customer for customer in queryset.select_for_update().filter(id__in=ids)}
+
+    updated = {}
+    results = [apply_change(serializer, customers, updated) for serializer in serializers]
+    for customer in updated.values():
+        customer.version += 1
+    return results, list(updated.values())
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+Newline delimited JSON export of the data of our customers.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+def export_lines(queryset, chunk_size=None):
+    """
+    Yields one JSON line per CustomerData of the queryset, ordered by id.
+    The rows are read with a server side cursor, `chunk_size` at a time,
+    so the memory used does not grow with the size of the table
+    """
+    chunk_size = chunk_size or getattr(settings, 'CUSTOMERDATA_EXPORT_CHUNK_SIZE', 2000)
+    rows = queryset.order_by('id').values('id', 'data', 'version')
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Filters for customerdataapi.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import re
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+FEATURE_NAME = re.compile(r'^[A-Za-z0-9]+(_[A-Za-z0-9]+)*$')
+
+
+def query_list(request, name):
+    """
+    Values of a comma separated query parameter
+    """
+    values = request.query_params.get(name, '')
+    return [value.strip() for value in values.split(',') if value.strip()]
+
+
+def feature_lookups(names, enabled):
+    """
+    Lookups of the ENABLED_FEATURES of the data that must be `enabled`
+    """
+    invalid = [name for name in names if not FEATURE_NAME.match(name)]
+    if invalid:
+        raise ValidationError({'detail': f'Invalid feature names: {", ".join(invalid)}.'})
+    return {f'data__ENABLED_FEATURES__{name}': enabled for name in names}
+
+
+class CustomerDataFilterBackend(BaseFilterBackend):
+    """
+    Filters the CustomerData in the database by subscription level and
+    feature flags, for example
+    ?subscription=basic,premium&enabled_features=ENABLE_EDXNOTES&disabled_features=ENABLE_COURSE_DISCOVERY
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        subscriptions = query_list(request, 'subscription')
+        if subscriptions:
+            queryset = queryset.with_subscription(*subscriptions)
+        lookups = feature_lookups(query_list(request, 'enabled_features'), True)
+        lookups.update(feature_lookups(query_list(request, 'disabled_features'), False))
+        return queryset.filter(**lookups)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming import of the data of our customers.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import itertools
+import json
+import re
+import uuid
+
+from django.db import transaction
+
+from customerdataapi.models import CustomerData
+
+READ_SIZE = 64 * 1024
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+class InvalidRecord(Exception):
+    """
+    Raised when a record can not be imported as a CustomerData
+    """
+
+
+def read_records(stream):
+    """
+    Yields the records of a stream holding either a JSON array, such as a
+    fixture or a large dump, or newline delimited JSON. The stream is read
+    a block or a line at a time, never as a whole
+    """
+    char = stream.read(1)
+    while char.isspace():
+        char = stream.read(1)
+    if char == '[':
+        return iter_json_array(stream)
+    return iter_json_lines(itertools.chain([char + stream.readline()], stream))
+
+
+def iter_json_array(stream):
+    """
+    Yields the items of a JSON array whose opening bracket was already
+    read from the stream, decoding them as the blocks of the stream arrive
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except ValueError as error:
+            if eof:
+                raise InvalidRecord('The JSON array is malformed.') from error
+            block = stream.read(READ_SIZE)
+            buffer, position, eof = buffer[position:] + block, 0, not block
+            continue
+        yield item
+
+
+def iter_json_lines(lines):
+    """
+    Yields the JSON object of every line that is not blank
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            raise InvalidRecord(f'Line {number} is not valid JSON.') from error
+
+
+def record_id(record):
+    """
+    The id of an exported record or of a fixture object, a new one when it has none
+    """
+    customer_id = record.get('id', record.get('pk'))
+    if customer_id is None:
+        return uuid.uuid4()
+    try:
+        return uuid.UUID(str(customer_id))
+    except ValueError as error:
+        raise InvalidRecord(f'"{customer_id}" is not a valid id.') from error
+
+
+def record_version(fields):
+    """
+    The version of an exported record or of a fixture object, the first one when it has none
+    """
+    version = fields.get('version', 1)
+    if isinstance(version, bool) or not isinstance(version, int) or version < 1:
+        raise InvalidRecord(f'"{version}" is not a valid version.')
+    return version
+
+
+def customer_from_record(record):
+    """
+    Builds an unsaved CustomerData from a record of the export, such as
+    {"id": ..., "data": {...}, "version": ...}, or from an object of a
+    fixture. The version is kept, so the entity tags known by the clients
+    survive an export and import round trip
+    """
+    if not isinstance(record, dict):
+        raise InvalidRecord('The record is not a JSON object.')
+    fields = record.get('fields', record)
+    data = fields.get('data')
+    if data is not None and not isinstance(data, dict):
+        raise InvalidRecord('The data of the record is not a JSON object.')
+    return CustomerData(id=record_id(record), data=data, version=record_version(fields))
+
+
+def save_batch(customers, ignore_conflicts=False):
+    """
+    Inserts a batch of CustomerData with a single query in its own transaction.
+    Returns the number of rows inserted, without the ids skipped because they
+    already exist, or repeat in the batch, when the conflicts are ignored
+    """
+    with transaction.atomic():
+        skipped = 0
+        if ignore_conflicts:
+            ids = {customer.id for customer in customers}
+            skipped = len(customers) - len(ids) + CustomerData.objects.filter(id__in=ids).count()
+        CustomerData.objects.bulk_create(customers, ignore_conflicts=ignore_conflicts)
+    return len(customers) - skipped
+
+
+def import_customers(records, batch_size=1000, ignore_conflicts=False, on_invalid=None):
+    """
+    Validates the records one by one and inserts them in batches of
+    `batch_size`. Invalid records stop the import, unless `on_invalid` is
+    given, in which case it is called with their number and their error
+    and the record is skipped. Returns the number of customers inserted
+    """
+    imported = 0
+    batch = []
+    for number, record in enumerate(records, 1):
+        try:
+            batch.append(customer_from_record(record))
+        except InvalidRecord as error:
+            if on_invalid is None:
+                raise InvalidRecord(f'Record {number}: {error}') from error
+            on_invalid(number, error)
+            continue
+        if len(batch) >= batch_size:
+            imported += save_batch(batch, ignore_conflicts)
+            batch = []
+    return imported + save_batch(batch, ignore_conflicts)
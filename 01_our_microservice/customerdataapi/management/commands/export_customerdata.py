@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Management command to export the data of our customers as newline delimited JSON.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import time
+
+from django.core.management.base import BaseCommand, OutputWrapper
+
+from customerdataapi.export import export_lines
+from customerdataapi.models import CustomerData
+
+
+class Command(BaseCommand):
+    """
+    Writes one JSON line per CustomerData to a file or to stdout
+    """
+    help = 'Exports the customer data as newline delimited JSON, one customer per line.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help="File to write to, '-' for stdout.")
+        parser.add_argument('--subscription', action='append', default=[], help='Only export this subscription.')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows read from the database at once.')
+
+    def handle(self, *args, **options):
+        queryset = CustomerData.objects.all()
+        if options['subscription']:
+            queryset = queryset.with_subscription(*options['subscription'])
+
+        started = time.monotonic()
+        if options['output'] == '-':
+            rows = self.write(self.stdout, queryset, options['chunk_size'])
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                rows = self.write(OutputWrapper(output), queryset, options['chunk_size'])
+        elapsed = time.monotonic() - started
+        self.stderr.write(f'Exported {rows} customers in {elapsed:.2f} seconds.')
+
+    @staticmethod
+    def write(output, queryset, chunk_size):
+        """
+        Writes the lines of the export and returns the number of rows
+        """
+        rows = 0
+        for line in export_lines(queryset, chunk_size):
+            output.write(line, ending='')
+            rows += 1
+        return rows
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Management command to import the data of our customers from newline delimited JSON or a JSON array.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from customerdataapi.imports import InvalidRecord, import_customers, read_records
+
+
+class Command(BaseCommand):
+    """
+    Inserts the customers of a file or of stdin in batches
+    """
+    help = (
+        'Imports customer data from newline delimited JSON, such as the output of export_customerdata, '
+        'or from a JSON array, such as a fixture.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="File to read from, '-' for stdin.")
+        parser.add_argument('--batch-size', type=int, default=1000, help='Customers inserted with each query.')
+        parser.add_argument('--ignore-conflicts', action='store_true', help='Skip the ids that already exist.')
+        parser.add_argument('--skip-invalid', action='store_true', help='Report and skip the invalid records.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            if options['input'] == '-':
+                imported = self.import_stream(sys.stdin, options)
+            else:
+                with open(options['input'], encoding='utf-8') as stream:
+                    imported = self.import_stream(stream, options)
+        except (InvalidRecord, IntegrityError) as error:
+            raise CommandError(f'The import stopped: {error}') from error
+        elapsed = time.monotonic() - started
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(f'Imported {imported} customers in {elapsed:.2f} seconds ({rate:.0f} rows/s).')
+
+    def import_stream(self, stream, options):
+        """
+        Imports the records of the stream and returns their number
+        """
+        on_invalid = self.report_invalid if options['skip_invalid'] else None
+        return import_customers(
+            read_records(stream),
+            batch_size=options['batch_size'],
+            ignore_conflicts=options['ignore_conflicts'],
+            on_invalid=on_invalid,
+        )
+
+    def report_invalid(self, number, error):
+        """
+        Reports a record that was skipped
+        """
+        self.stderr.write(f'Skipped record {number}: {error}')
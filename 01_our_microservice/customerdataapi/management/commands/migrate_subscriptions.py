@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Management command to move every customer of some subscriptions to another one.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customerdataapi.models import CustomerData
+from customerdataapi.subscriptions import TransitionError, check_transition, migrate_chunk
+
+
+class Command(BaseCommand):
+    """
+    Upgrades or downgrades the subscription of many customers, a chunk at a time
+    """
+    help = (
+        'Upgrades or downgrades every customer of the --from subscriptions to the given one, in chunks '
+        'of customers changed with a single query. The customers already changed leave the --from '
+        'subscriptions, so running it again after a crash goes on with the rest of them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('command', choices=['upgrade', 'downgrade'], help='Type of subscription change.')
+        parser.add_argument('subscription', help='Subscription the customers are moved to.')
+        parser.add_argument(
+            '--from', dest='old', action='append', required=True, help='Move the customers of this subscription.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Customers changed in each transaction.')
+        parser.add_argument('--after', default=None, help='Only change the customers with a greater id.')
+
+    def handle(self, *args, **options):
+        command, new = options['command'], options['subscription']
+        try:
+            for old in options['old']:
+                check_transition(command, old, new)
+        except TransitionError as error:
+            raise CommandError(str(error)) from error
+
+        queryset = CustomerData.objects.with_subscription(*options['old'])
+        started = time.monotonic()
+        migrated, after = 0, options['after']
+        while True:
+            changed, after = migrate_chunk(queryset, command, new, after, options['chunk_size'])
+            if after is None:
+                break
+            migrated += changed
+            self.stderr.write(f'Migrated {migrated} customers, up to id {after}.')
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'Migrated {migrated} customers to {new} in {elapsed:.2f} seconds.')
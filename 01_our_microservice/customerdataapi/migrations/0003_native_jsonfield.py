@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 3.2.25 on 2026-10-17 04:07
+from __future__ import unicode_literals
+
+import customerdataapi.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customerdataapi', '0002_customerdata_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customerdata',
+            name='data',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='customerdata',
+            index=models.Index(customerdataapi.models.KeyText('SUBSCRIPTION', 'data'), name='customerdata_subscription_idx'),
+        ),
+    ]
@@ -5,11 +5,45 @@ Database models for customerdataapi.
 
 from __future__ import absolute_import, unicode_literals
 
-import collections
 import uuid
-import jsonfield
 
 from django.db import models
+from django.db.models.fields.json import KeyTextTransform
+
+
+class KeyText(KeyTextTransform):  # pylint: disable=abstract-method
+    """
+    A key of a JSON field as text. On SQLite the path of the key is
+    written in the SQL instead of sent as a parameter, since SQLite only
+    uses an index on an expression for the queries that repeat it as is
+    """
+
+    def as_sqlite(self, compiler, connection):
+        sql, params = super().as_sqlite(compiler, connection)
+        *params, path = params
+        head, tail = sql.rsplit('%s', 1)
+        path = path.replace("'", "''")
+        return f"{head}'{path}'{tail}", tuple(params)
+
+
+def subscription_key():
+    """
+    Expression of the SUBSCRIPTION key of the data, as text
+    """
+    return KeyText('SUBSCRIPTION', 'data')
+
+
+class CustomerDataQuerySet(models.QuerySet):
+    """
+    Queries on the keys of the data of our customers
+    """
+
+    def with_subscription(self, *subscriptions):
+        """
+        CustomerData whose SUBSCRIPTION is one of the given ones. The
+        lookup uses the same expression as the SUBSCRIPTION index
+        """
+        return self.alias(subscription=subscription_key()).filter(subscription__in=subscriptions)
 
 
 class CustomerData(models.Model):
@@ -17,7 +51,22 @@ class CustomerData(models.Model):
     A simple model to store our customer data
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # pylint: disable=invalid-name
-    data = jsonfield.JSONField(blank=True, null=True, load_kwargs={'object_pairs_hook': collections.OrderedDict})
+    data = models.JSONField(blank=True, null=True)
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = CustomerDataQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(subscription_key(), name='customerdata_subscription_idx'),
+        ]
+
+    @property
+    def etag(self):
+        """
+        Entity tag of the current version of the customer data
+        """
+        return f'"{self.version}"'
 
     def __str__(self):
         return "CustomerData with id <{}>".format(self.id)
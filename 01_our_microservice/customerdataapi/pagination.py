@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+Pagination for customerdataapi.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class CustomerDataCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the id of the CustomerData. Every page is read
+    from the primary key index after the last id of the previous page,
+    so walking the whole table costs the same for the first and the last
+    page, unlike the OFFSET of the limit/offset pagination
+    """
+    ordering = 'id'
+    page_size = getattr(settings, 'CUSTOMERDATA_PAGE_SIZE', 1000)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'CUSTOMERDATA_MAX_PAGE_SIZE', 10000)
@@ -5,10 +5,22 @@ Database models for customerdataapi.
 
 from __future__ import absolute_import, unicode_literals
 
+from django.conf import settings
 from rest_framework import serializers
 from customerdataapi.models import CustomerData
 
 
+def validate_bulk_size(value):
+    """
+    Limits the number of items accepted in a single bulk request
+    """
+    max_items = getattr(settings, 'CUSTOMERDATA_BULK_MAX_IDS', 500)
+    if len(value) > max_items:
+        raise serializers.ValidationError(
+            f'Ensure this field has no more than {max_items} elements.'
+        )
+
+
 class CustomerDataSerializer(serializers.ModelSerializer):
     """
     A simple serializer for our CustomerData model
@@ -18,4 +30,48 @@ class CustomerDataSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = CustomerData
-        fields = ('id', 'data')
+        fields = ('id', 'data', 'version')
+
+
+class CustomerDataIdsSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    Validates the list of CustomerData ids sent to the bulk actions
+    """
+    ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        validators=[validate_bulk_size],
+    )
+
+
+class CustomerDataChangeSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    Validates the key level changes of a single CustomerData: the keys
+    to add or update in its data, the keys to delete from it and,
+    optionally, the version of the CustomerData the changes expect
+    """
+    id = serializers.UUIDField()  # pylint: disable=invalid-name
+    update = serializers.DictField(required=False, default=dict)
+    delete = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    version = serializers.IntegerField(required=False, min_value=1)
+
+
+class CustomerDataChangesSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    Validates the list of changes sent to the bulk update action. Every
+    change is validated on its own so it can fail without the others
+    """
+    changes = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        validators=[validate_bulk_size],
+    )
+
+
+class CustomerDataTransitionSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    Validates a subscription change of a CustomerData: the command
+    and the subscription it moves the customer to
+    """
+    command = serializers.ChoiceField(choices=['upgrade', 'downgrade'])
+    subscription = serializers.CharField()
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+Signal receivers of customerdataapi.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from customerdataapi.cache import invalidate_customers
+from customerdataapi.models import CustomerData
+
+
+@receiver(post_save, sender=CustomerData)
+@receiver(post_delete, sender=CustomerData)
+def invalidate_cached_customer(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Removes a CustomerData from the cache of the retrieve route
+    once it is saved or deleted
+    """
+    invalidate_customers(instance.pk)
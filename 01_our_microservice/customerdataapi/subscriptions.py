@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Subscription changes of our customers, applied with the rules of RULES.md.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from customerdataapi.cache import invalidate_customers
+from customerdataapi.models import CustomerData
+
+# Exit codes of the subscription manager for the changes that are not allowed
+INVALID_SUBSCRIPTION_EXIT_CODE = 3
+INVALID_EXIT_CODES = {'upgrade': 4, 'downgrade': 5}
+
+# Sign of the change of level of every command
+DIRECTIONS = {'upgrade': 1, 'downgrade': -1}
+
+REPORT_ACTIONS = {'upgrade': 'UPGRADED', 'downgrade': 'DOWNGRADED'}
+
+DEFAULT_SUBSCRIPTIONS = {
+    'free': {'level': 1, 'free': True},
+    'basic': {'level': 2},
+    'premium': {'level': 3},
+}
+
+# The side effects described in RULES.md, in the format of the SUBSCRIPTION_RULES of the subscription manager
+DEFAULT_RULES = (
+    {'command': 'upgrade', 'delete': ['DOWNGRADE_DATE'], 'stamp': ['UPGRADE_DATE']},
+    {'command': 'downgrade', 'delete': ['UPGRADE_DATE'], 'stamp': ['DOWNGRADE_DATE']},
+    {'command': 'downgrade', 'restrict_features': True},
+)
+
+
+class TransitionError(Exception):
+    """
+    Raised when a subscription change is not allowed, with the
+    exit code the subscription manager gives to it
+    """
+
+    def __init__(self, exit_code, message):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+
+def get_subscriptions():
+    """
+    Returns the available subscription plans and their attributes
+    """
+    return getattr(settings, 'CUSTOMERDATA_SUBSCRIPTIONS', DEFAULT_SUBSCRIPTIONS)
+
+
+def get_rules():
+    """
+    Returns the declarative rules of the side effects of the changes
+    """
+    return getattr(settings, 'CUSTOMERDATA_SUBSCRIPTION_RULES', DEFAULT_RULES)
+
+
+def compile_rules(command, new):
+    """
+    Merges the rules of the command to the new subscription, the ones of that command, or of
+    every command, and of that plan, or of every plan, into the keys to delete, the keys to
+    stamp and whether the features are restricted, as the subscription manager does
+    """
+    rules = [
+        rule for rule in get_rules()
+        if rule.get('command') in (None, command) and new in rule.get('plans', (new,))
+    ]
+    stamp_keys = [key for rule in rules for key in rule.get('stamp', ())]
+    delete_keys = [key for rule in rules for key in rule.get('delete', ()) if key not in stamp_keys]
+    return delete_keys, stamp_keys, any(rule.get('restrict_features') for rule in rules)
+
+
+def allowed_features(plan):
+    """
+    Returns the features a plan allows, its "features" when listed, none for a
+    free plan and all of them, as None, for the rest
+    """
+    features = plan.get('features', () if plan.get('free') else None)
+    return None if features is None else set(features)
+
+
+def standard_datetime():
+    """
+    Returns the current datetime in the ISO 8601 format
+    used by the subscription manager
+    """
+    return timezone.now().strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def check_transition(command, old, new):
+    """
+    Raises TransitionError unless the command moves the customer from the
+    old subscription to a new one of a higher level for an upgrade, or
+    of a lower level for a downgrade
+    """
+    subscriptions = get_subscriptions()
+    if new not in subscriptions:
+        raise TransitionError(
+            INVALID_SUBSCRIPTION_EXIT_CODE,
+            'The new subscription level provided is not in the available subscriptions.',
+        )
+    old_level = subscriptions.get(old, {}).get('level')
+    new_level = subscriptions[new]['level']
+    if old_level is None or (new_level - old_level) * DIRECTIONS[command] <= 0:
+        raise TransitionError(INVALID_EXIT_CODES[command], f'Attempted to {command} from {old} to {new}.')
+
+
+def restrict_features(data, plan):
+    """
+    Turns off the enabled features of the customer data
+    that are not allowed by the plan
+    """
+    features = data.get('ENABLED_FEATURES')
+    allowed = allowed_features(plan)
+    if allowed is not None and isinstance(features, dict):
+        data['ENABLED_FEATURES'] = {name: value and name in allowed for name, value in features.items()}
+
+
+def apply_transition(data, command, new, now=None):
+    """
+    Changes the subscription of the customer data with the given command
+    and the side effects of the matching rules, the same declarative rules
+    as the SUBSCRIPTION_RULES of the subscription manager: their keys are
+    stamped with `now`, the current datetime by default, or deleted, and the
+    enabled features that the new plan does not allow are turned off.
+    Returns the old subscription
+    """
+    if not isinstance(data, dict):
+        raise TransitionError(INVALID_EXIT_CODES[command], 'The customer data is not a JSON object.')
+    old = data.get('SUBSCRIPTION')
+    check_transition(command, old, new)
+
+    delete_keys, stamp_keys, restricted = compile_rules(command, new)
+    for key in delete_keys:
+        data.pop(key, None)
+    data.update(dict.fromkeys(stamp_keys, now or standard_datetime()))
+    if restricted:
+        restrict_features(data, get_subscriptions()[new])
+    data['SUBSCRIPTION'] = new
+    return old
+
+
+def report_of_changes(customer_id, command, old, new):
+    """
+    Returns the report of a subscription change, the same
+    as the one of the subscription manager
+    """
+    return f'{customer_id} -- {REPORT_ACTIONS[command]} -- from {old} to {new}'
+
+
+def migrate_chunk(queryset, command, new, after=None, chunk_size=1000):
+    """
+    Changes the subscription of the next `chunk_size` customers of the
+    queryset, by id, after the given one. The chunk is locked, changed in
+    memory and written back with a single UPDATE query, in a transaction
+    of its own, so a crash only loses the chunk in progress. Returns the
+    number of customers changed and the id of the last one, None when
+    none was left
+    """
+    now = standard_datetime()
+    with transaction.atomic():
+        chunk = queryset.select_for_update().order_by('id')
+        if after is not None:
+            chunk = chunk.filter(id__gt=after)
+        customers = list(chunk[:chunk_size])
+        for customer in customers:
+            apply_transition(customer.data, command, new, now)
+            customer.version += 1
+        CustomerData.objects.bulk_update(customers, ['data', 'version'])
+        # The bulk update does not send the save signals.
+        invalidate_customers(*(customer.pk for customer in customers))
+    return len(customers), customers[-1].id if customers else None
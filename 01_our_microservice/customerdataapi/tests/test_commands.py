@@ -0,0 +1,216 @@
+"""
+Testing the management commands of customerdataapi
+"""
+
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from customerdataapi import imports
+from customerdataapi.models import CustomerData
+
+
+class ExportCustomerDataTestCase(TestCase):
+    """
+    Test case for the export_customerdata management command
+    """
+
+    def setUp(self):
+        self.customers = [
+            CustomerData.objects.create(data={"SUBSCRIPTION": subscription})
+            for subscription in ["free", "premium", "basic"]
+        ]
+
+    def test_writes_one_line_per_customer(self):
+        """
+        Asserts that every customer is written as a JSON line, ordered by id
+        """
+        stdout = io.StringIO()
+        call_command("export_customerdata", "--chunk-size=2", stdout=stdout, stderr=io.StringIO())
+
+        lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([line["id"] for line in lines], sorted(str(customer.id) for customer in self.customers))
+        self.assertEqual(lines[0]["version"], 1)
+
+    def test_writes_the_given_subscriptions_to_a_file(self):
+        """
+        Asserts that the export is written to the output file, filtered by subscription
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "export.ndjson")
+            stderr = io.StringIO()
+            call_command("export_customerdata", "--output", path, "--subscription", "premium", stderr=stderr)
+            with open(path, encoding="utf-8") as export:
+                lines = [json.loads(line) for line in export]
+
+        self.assertEqual([line["data"] for line in lines], [{"SUBSCRIPTION": "premium"}])
+        self.assertIn("Exported 1 customers", stderr.getvalue())
+
+
+class ImportCustomerDataTestCase(TestCase):
+    """
+    Test case for the import_customerdata management command
+    """
+
+    def import_text(self, text, *args):
+        """
+        Runs the command with the text as its stdin, returns its stdout and stderr
+        """
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with mock.patch("sys.stdin", io.StringIO(text)):
+            call_command("import_customerdata", "-", *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_imports_newline_delimited_json(self):
+        """
+        Asserts that the lines of an export are imported in batches and
+        the speed of the import is reported
+        """
+        customer_id = "49a6307e-c261-414d-86f5-c6004bcec8ab"
+        lines = [
+            json.dumps({"id": customer_id, "data": {"SUBSCRIPTION": "free"}, "version": 3}),
+            "",
+            json.dumps({"data": {"SUBSCRIPTION": "basic"}}),
+            json.dumps({"data": None}),
+        ]
+
+        stdout, _ = self.import_text("\n".join(lines), "--batch-size=2")
+
+        self.assertEqual(CustomerData.objects.count(), 3)
+        customer = CustomerData.objects.get(id=customer_id)
+        self.assertEqual((customer.data, customer.version), ({"SUBSCRIPTION": "free"}, 3))
+        self.assertEqual(set(CustomerData.objects.exclude(id=customer_id).values_list("version", flat=True)), {1})
+        self.assertRegex(stdout, r"Imported 3 customers in [0-9.]+ seconds \([0-9]+ rows/s\)")
+
+    def test_imports_a_json_array_a_block_at_a_time(self):
+        """
+        Asserts that the objects of a fixture are imported while the
+        file is read in blocks smaller than its objects
+        """
+        with mock.patch.object(imports, "READ_SIZE", 7):
+            call_command("import_customerdata", "customerdataapi/initial_data.json", stdout=io.StringIO())
+
+        customer = CustomerData.objects.get(id="1b2f7b83-7b4d-441d-a210-afaa970e5b76")
+        self.assertEqual(CustomerData.objects.count(), 3)
+        self.assertEqual(customer.data["SUBSCRIPTION"], "basic")
+
+    def test_stops_at_the_first_invalid_record(self):
+        """
+        Asserts that the import stops with the number of the first invalid record
+        """
+        records = ['{"data": {}}', '{"id": "not-an-id", "data": {}}', '{"data": {}}']
+
+        with self.assertRaisesMessage(CommandError, "Record 2"):
+            self.import_text("\n".join(records))
+        with self.assertRaisesMessage(CommandError, 'Record 1: "0" is not a valid version.'):
+            self.import_text('{"data": {}, "version": 0}')
+
+    def test_skips_the_invalid_records(self):
+        """
+        Asserts that the invalid records are reported and skipped when asked
+        """
+        records = '[{"data": {}}, ["not an object"], {"data": "not an object"}, {"data": {}}]'
+
+        stdout, stderr = self.import_text(records, "--skip-invalid")
+
+        self.assertIn("Imported 2 customers", stdout)
+        self.assertIn("Skipped record 2: The record is not a JSON object.", stderr)
+        self.assertIn("Skipped record 3: The data of the record is not a JSON object.", stderr)
+
+    def test_rejects_malformed_json(self):
+        """
+        Asserts that malformed lines and arrays stop the import
+        """
+        with self.assertRaisesMessage(CommandError, "Line 2 is not valid JSON."):
+            self.import_text('{"data": {}}\n{"data": ')
+        with self.assertRaisesMessage(CommandError, "The JSON array is malformed."):
+            self.import_text('  [{"data": {}}, {"data": ')
+
+    def test_existing_ids_stop_the_import_unless_ignored(self):
+        """
+        Asserts that importing an existing id fails, unless the conflicts are ignored
+        """
+        customer = CustomerData.objects.create(data={"SUBSCRIPTION": "premium"})
+        records = json.dumps({"id": str(customer.id), "data": {}})
+
+        with self.assertRaises(CommandError):
+            self.import_text(records)
+        new_record = json.dumps({"data": {}})
+        stdout, _ = self.import_text(f"{records}\n{records}\n{new_record}", "--ignore-conflicts")
+
+        customer.refresh_from_db()
+        self.assertIn("Imported 1 customers", stdout)
+        self.assertEqual(customer.data, {"SUBSCRIPTION": "premium"})
+
+
+class MigrateSubscriptionsTestCase(TestCase):
+    """
+    Test case for the migrate_subscriptions management command
+    """
+
+    def setUp(self):
+        self.customers = [
+            CustomerData.objects.create(
+                data={
+                    "SUBSCRIPTION": subscription,
+                    "UPGRADE_DATE": "2020-01-10T09:25:00Z",
+                    "ENABLED_FEATURES": {"ENABLE_EDXNOTES": True},
+                }
+            )
+            for subscription in ["premium", "basic", "premium", "free", "basic"]
+        ]
+
+    def migrate(self, *args):
+        """
+        Runs the command and returns its stdout and stderr
+        """
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command("migrate_subscriptions", *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_changes_every_customer_of_the_subscriptions_in_chunks(self):
+        """
+        Asserts that the customers of the --from subscriptions are downgraded
+        with the rules, a chunk at a time, and the rest are left untouched
+        """
+        stdout, stderr = self.migrate("downgrade", "free", "--from", "premium", "--from", "basic", "--chunk-size=3")
+
+        migrated = CustomerData.objects.exclude(pk=self.customers[3].pk)
+        untouched = CustomerData.objects.get(pk=self.customers[3].pk)
+        self.assertEqual({customer.data["SUBSCRIPTION"] for customer in migrated}, {"free"})
+        self.assertEqual({customer.version for customer in migrated}, {2})
+        self.assertEqual(len({customer.data["DOWNGRADE_DATE"] for customer in migrated}), 1)
+        self.assertFalse(any("UPGRADE_DATE" in customer.data for customer in migrated))
+        self.assertFalse(any(customer.data["ENABLED_FEATURES"]["ENABLE_EDXNOTES"] for customer in migrated))
+        self.assertEqual(untouched.version, 1)
+        self.assertIn("Migrated 4 customers to free", stdout)
+        self.assertEqual(len(stderr.splitlines()), 2)
+
+    def test_goes_on_after_the_given_id(self):
+        """
+        Asserts that only the customers after the given id are changed,
+        and running it again finds the ones left
+        """
+        basics = sorted(str(customer.id) for customer in self.customers if customer.data["SUBSCRIPTION"] == "basic")
+
+        first, _ = self.migrate("upgrade", "premium", "--from", "basic", "--after", basics[0])
+        second, _ = self.migrate("upgrade", "premium", "--from", "basic")
+
+        self.assertIn("Migrated 1 customers", first)
+        self.assertIn("Migrated 1 customers", second)
+        self.assertFalse(CustomerData.objects.with_subscription("basic").exists())
+
+    def test_rejects_the_changes_that_are_not_allowed(self):
+        """
+        Asserts that the command stops before changing anything when the
+        change is not allowed for one of the subscriptions
+        """
+        with self.assertRaises(CommandError):
+            self.migrate("upgrade", "basic", "--from", "free", "--from", "premium")
+
+        self.assertEqual({customer.version for customer in CustomerData.objects.all()}, {1})
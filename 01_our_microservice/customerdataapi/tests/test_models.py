@@ -34,3 +34,17 @@ class CustomerDataTestCase(TestCase):
             }
         )
         str(new_customer)
+
+    def test_can_filter_by_subscription(self):
+        """
+        This method tests that the customers are filtered by their
+        SUBSCRIPTION in the database, with the SUBSCRIPTION index.
+        """
+        premium = CustomerData.objects.create(data={"SUBSCRIPTION": "premium"})
+        CustomerData.objects.create(data={"SUBSCRIPTION": "free"})
+        CustomerData.objects.create(data=None)
+
+        customers = CustomerData.objects.with_subscription("premium", "basic")
+
+        self.assertEqual(list(customers), [premium])
+        self.assertIn("customerdata_subscription_idx", customers.explain())
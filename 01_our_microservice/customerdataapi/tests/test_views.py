@@ -2,9 +2,22 @@
 Testing the django rest framework configuration
 """
 
-from django.test import TestCase
+import json
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 
+from customerdataapi.cache import (
+    customer_cache,
+    get_cache_stats,
+    get_or_cache_customer,
+    invalidate_customers,
+    stats_cache,
+)
+from customerdataapi.models import CustomerData
+
 
 class CustomerDataAPITestCase(TestCase):
     """
@@ -19,3 +32,611 @@ class CustomerDataAPITestCase(TestCase):
         response = client.get("/api/v1/customerdata/")
 
         self.assertEqual(response.status_code, 200)
+
+
+class CustomerDataBulkRetrieveTestCase(TestCase):
+    """
+    Test case for the bulk retrieve action of the customer data API
+    """
+
+    url = "/api/v1/customerdata/bulk-retrieve/"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.customers = [
+            CustomerData.objects.create(data={"SUBSCRIPTION": "free", "index": index})
+            for index in range(3)
+        ]
+
+    def test_returns_every_requested_customer(self):
+        """
+        Asserts that the posted ids are returned in one response
+        and the unknown ones are listed as missing
+        """
+        unknown_id = "49a6307e-c261-414d-86f5-c6004bcec8ab"
+        ids = [str(customer.id) for customer in self.customers[:2]] + [unknown_id]
+
+        response = self.client.post(self.url, {"ids": ids}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(customer["id"] for customer in response.json()["results"]),
+            sorted(ids[:2]),
+        )
+        self.assertEqual(response.data["missing"], [unknown_id])
+
+    def test_uses_a_single_query(self):
+        """
+        Asserts that all the customers are read with one query
+        """
+        ids = [str(customer.id) for customer in self.customers]
+
+        with self.assertNumQueries(1):
+            self.client.post(self.url, {"ids": ids}, format="json")
+
+    def test_rejects_bad_ids(self):
+        """
+        Asserts that empty lists and malformed ids are rejected
+        """
+        empty = self.client.post(self.url, {"ids": []}, format="json")
+        malformed = self.client.post(self.url, {"ids": ["not-a-uuid"]}, format="json")
+
+        self.assertEqual(empty.status_code, 400)
+        self.assertEqual(malformed.status_code, 400)
+
+    @override_settings(CUSTOMERDATA_BULK_MAX_IDS=2)
+    def test_rejects_lists_longer_than_the_limit(self):
+        """
+        Asserts that a list with more ids than the limit is rejected
+        """
+        ids = [str(customer.id) for customer in self.customers]
+
+        response = self.client.post(self.url, {"ids": ids}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+
+
+class CustomerDataBulkUpdateTestCase(TestCase):
+    """
+    Test case for the bulk update action of the customer data API
+    """
+
+    url = "/api/v1/customerdata/bulk-update/"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = CustomerData.objects.create(
+            data={"SUBSCRIPTION": "free", "DOWNGRADE_DATE": "2020-01-10T09:25:00Z", "theme_name": "Tropical Island"}
+        )
+
+    def test_applies_key_level_changes(self):
+        """
+        Asserts that only the changed keys of the data are modified
+        """
+        change = {
+            "id": str(self.customer.id),
+            "update": {"SUBSCRIPTION": "basic", "UPGRADE_DATE": "2021-01-10T09:25:00Z"},
+            "delete": ["DOWNGRADE_DATE"],
+        }
+
+        response = self.client.patch(self.url, {"changes": [change]}, format="json")
+
+        self.customer.refresh_from_db()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"], [{"id": str(self.customer.id), "status": "updated"}])
+        self.assertEqual(
+            self.customer.data,
+            {"SUBSCRIPTION": "basic", "UPGRADE_DATE": "2021-01-10T09:25:00Z", "theme_name": "Tropical Island"},
+        )
+
+    def test_reports_the_failed_changes(self):
+        """
+        Asserts that every change gets its own status and the
+        failed ones do not stop the others
+        """
+        unknown_id = "49a6307e-c261-414d-86f5-c6004bcec8ab"
+        changes = [
+            {"id": unknown_id, "update": {"SUBSCRIPTION": "basic"}},
+            {"id": "not-a-uuid"},
+            {"id": str(self.customer.id), "update": {"SUBSCRIPTION": "premium"}},
+        ]
+
+        response = self.client.patch(self.url, {"changes": changes}, format="json")
+
+        statuses = [result["status"] for result in response.json()["results"]]
+        self.customer.refresh_from_db()
+        self.assertEqual(statuses, ["failed", "failed", "updated"])
+        self.assertEqual(response.json()["results"][0]["errors"], ["Not found."])
+        self.assertEqual(self.customer.data["SUBSCRIPTION"], "premium")
+
+    def test_fails_on_data_that_is_not_an_object(self):
+        """
+        Asserts that the changes to a data that is not a JSON object
+        fail, while empty data is treated as an empty object
+        """
+        wrong = CustomerData.objects.create(data=["not", "an", "object"])
+        empty = CustomerData.objects.create(data=None)
+        changes = [
+            {"id": str(wrong.id), "update": {"SUBSCRIPTION": "basic"}},
+            {"id": str(empty.id), "update": {"SUBSCRIPTION": "basic"}},
+        ]
+
+        response = self.client.patch(self.url, {"changes": changes}, format="json")
+
+        empty.refresh_from_db()
+        self.assertEqual(response.json()["results"][0]["status"], "failed")
+        self.assertEqual(empty.data, {"SUBSCRIPTION": "basic"})
+
+    def test_writes_every_customer_in_one_query(self):
+        """
+        Asserts that the changed customers are read with one query
+        and saved with one bulk update inside a transaction
+        """
+        other = CustomerData.objects.create(data={"SUBSCRIPTION": "free"})
+        changes = [
+            {"id": str(customer.id), "update": {"SUBSCRIPTION": "basic"}}
+            for customer in (self.customer, other)
+        ]
+
+        with self.assertNumQueries(4):  # savepoint, select, update and release
+            self.client.patch(self.url, {"changes": changes}, format="json")
+
+    def test_rejects_an_empty_list_of_changes(self):
+        """
+        Asserts that a request without changes is rejected
+        """
+        response = self.client.patch(self.url, {"changes": []}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+
+
+class CustomerDataMergePatchTestCase(TestCase):
+    """
+    Test case for the JSON merge patch support of the customer data API
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = CustomerData.objects.create(
+            data={
+                "SUBSCRIPTION": "premium",
+                "UPGRADE_DATE": "2020-01-10T09:25:00Z",
+                "theme_name": "Tropical Island",
+                "ENABLED_FEATURES": {"ENABLE_EDXNOTES": True, "ENABLE_COURSE_DISCOVERY": True},
+            }
+        )
+        self.url = f"/api/v1/customerdata/{self.customer.id}/"
+
+    def test_merges_the_patch_into_the_data(self):
+        """
+        Asserts that the patched keys change, the keys set to null are
+        removed, nested objects are merged and the rest are kept
+        """
+        patch = {
+            "data": {
+                "SUBSCRIPTION": "free",
+                "UPGRADE_DATE": None,
+                "DOWNGRADE_DATE": "2021-01-10T09:25:00Z",
+                "ENABLED_FEATURES": {"ENABLE_EDXNOTES": False},
+            }
+        }
+
+        response = self.client.patch(
+            self.url, json.dumps(patch), content_type="application/merge-patch+json"
+        )
+
+        self.customer.refresh_from_db()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"], self.customer.data)
+        self.assertEqual(
+            self.customer.data,
+            {
+                "SUBSCRIPTION": "free",
+                "DOWNGRADE_DATE": "2021-01-10T09:25:00Z",
+                "theme_name": "Tropical Island",
+                "ENABLED_FEATURES": {"ENABLE_EDXNOTES": False, "ENABLE_COURSE_DISCOVERY": True},
+            },
+        )
+
+    def test_accepts_plain_json_patches(self):
+        """
+        Asserts that a merge patch sent as application/json is applied,
+        and a patch without data leaves the customer untouched
+        """
+        self.client.patch(self.url, {"data": {"theme_name": None}}, format="json")
+        response = self.client.patch(self.url, {}, format="json")
+
+        self.customer.refresh_from_db()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("theme_name", self.customer.data)
+        self.assertEqual(self.customer.data["SUBSCRIPTION"], "premium")
+
+    def test_replaces_values_that_are_not_objects(self):
+        """
+        Asserts that patching a value that is not an object replaces it
+        """
+        self.customer.data = "not an object"
+        self.customer.save()
+
+        self.client.patch(self.url, {"data": {"SUBSCRIPTION": "basic"}}, format="json")
+
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.data, {"SUBSCRIPTION": "basic"})
+
+    def test_rejects_patches_that_are_not_objects(self):
+        """
+        Asserts that a merge patch must be a JSON object
+        """
+        response = self.client.patch(self.url, ["SUBSCRIPTION"], format="json")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_returns_404_for_unknown_customers(self):
+        """
+        Asserts that patching a customer that does not exist fails
+        """
+        response = self.client.patch(
+            "/api/v1/customerdata/49a6307e-c261-414d-86f5-c6004bcec8ab/", {"data": {}}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+
+class CustomerDataVersionTestCase(TestCase):
+    """
+    Test case for the optimistic concurrency control of the customer data API
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = CustomerData.objects.create(data={"SUBSCRIPTION": "free"})
+        self.url = f"/api/v1/customerdata/{self.customer.id}/"
+
+    def test_retrieve_returns_the_etag(self):
+        """
+        Asserts that the retrieved customer data comes with its version as ETag
+        """
+        response = self.client.get(self.url)
+
+        self.assertEqual(response["ETag"], '"1"')
+        self.assertEqual(response.json()["version"], 1)
+
+    def test_retrieve_answers_not_modified_to_the_current_etag(self):
+        """
+        Asserts that the customer data is not sent again to a client that has
+        its current version, and is sent once it changed
+        """
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH='"1"')
+        self.client.patch(self.url, {"data": {"SUBSCRIPTION": "premium"}}, format="json")
+        modified = self.client.get(self.url, HTTP_IF_NONE_MATCH='"1"')
+
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], '"1"')
+        self.assertEqual(modified.status_code, 200)
+        self.assertEqual(modified["ETag"], '"2"')
+
+    def test_updates_increase_the_version(self):
+        """
+        Asserts that every update and merge patch increases the version
+        of the customer data, and the new ETag is returned
+        """
+        put = self.client.put(self.url, {"data": {"SUBSCRIPTION": "basic"}}, format="json", HTTP_IF_MATCH='"1"')
+        patch = self.client.patch(self.url, {"data": {"SUBSCRIPTION": "premium"}}, format="json")
+
+        self.customer.refresh_from_db()
+        self.assertEqual(put.status_code, 200)
+        self.assertEqual(put["ETag"], '"2"')
+        self.assertEqual(patch["ETag"], '"3"')
+        self.assertEqual(self.customer.version, 3)
+
+    def test_rejects_updates_of_another_version(self):
+        """
+        Asserts that an update with an If-Match header that does not match
+        the current version fails with 412 and leaves the customer untouched
+        """
+        self.client.patch(self.url, {"data": {"SUBSCRIPTION": "basic"}}, format="json")
+
+        put = self.client.put(self.url, {"data": {}}, format="json", HTTP_IF_MATCH='"1"')
+        patch = self.client.patch(self.url, {"data": {}}, format="json", HTTP_IF_MATCH='"1", "3"')
+
+        self.customer.refresh_from_db()
+        self.assertEqual(put.status_code, 412)
+        self.assertEqual(patch.status_code, 412)
+        self.assertEqual(self.customer.data, {"SUBSCRIPTION": "basic"})
+
+    def test_accepts_any_version_with_a_wildcard(self):
+        """
+        Asserts that an If-Match header with '*' matches any version
+        """
+        response = self.client.patch(self.url, {"data": {"SUBSCRIPTION": "basic"}}, format="json", HTTP_IF_MATCH="*")
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk_update_reports_conflicts(self):
+        """
+        Asserts that the bulk changes are checked against the version the
+        customers had before the request, which then increases only once
+        """
+        other = CustomerData.objects.create(data={"SUBSCRIPTION": "free"})
+        changes = [
+            {"id": str(self.customer.id), "update": {"SUBSCRIPTION": "basic"}, "version": 1},
+            {"id": str(self.customer.id), "update": {"SUBSCRIPTION": "premium"}, "version": 1},
+            {"id": str(other.id), "update": {"SUBSCRIPTION": "basic"}, "version": 2},
+        ]
+
+        response = self.client.patch("/api/v1/customerdata/bulk-update/", {"changes": changes}, format="json")
+
+        self.customer.refresh_from_db()
+        other.refresh_from_db()
+        statuses = [result["status"] for result in response.json()["results"]]
+        self.assertEqual(statuses, ["updated", "updated", "conflict"])
+        self.assertEqual((self.customer.version, self.customer.data["SUBSCRIPTION"]), (2, "premium"))
+        self.assertEqual((other.version, other.data["SUBSCRIPTION"]), (1, "free"))
+
+
+class CustomerDataRetrieveCacheTestCase(TestCase):
+    """
+    Test case for the cache of the retrieve route of the customer data API
+    """
+
+    def setUp(self):
+        customer_cache().clear()
+        stats_cache().clear()
+        self.client = APIClient()
+        self.customer = CustomerData.objects.create(data={"SUBSCRIPTION": "free"})
+        self.url = f"/api/v1/customerdata/{self.customer.id}/"
+
+    def test_serves_repeated_retrieves_from_the_cache(self):
+        """
+        Asserts that a customer retrieved again, with any spelling of its id,
+        is answered without queries, and that the hit rate of the cache is reported
+        """
+        first = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(f"/api/v1/customerdata/{str(self.customer.id).upper()}/")
+        stats = self.client.get("/api/v1/customerdata/cache-stats/")
+
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["ETag"], '"1"')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(stats.json(), {"hits": 1, "misses": 1, "hit_rate": 0.5})
+
+    def test_invalidates_the_customers_saved_or_deleted(self):
+        """
+        Asserts that the cached customer is dropped once it is saved,
+        updated in bulk or deleted, also when the transaction commits
+        """
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer.data = {"SUBSCRIPTION": "basic"}
+            self.customer.save()
+        saved = self.client.get(self.url).json()
+        change = {"id": str(self.customer.id), "update": {"SUBSCRIPTION": "premium"}}
+        self.client.patch("/api/v1/customerdata/bulk-update/", {"changes": [change]}, format="json")
+        updated = self.client.get(self.url).json()
+        self.customer.delete()
+
+        self.assertEqual(saved["data"], {"SUBSCRIPTION": "basic"})
+        self.assertEqual(updated["data"], {"SUBSCRIPTION": "premium"})
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_does_not_serve_a_customer_loaded_during_a_change(self):
+        """
+        Asserts that a customer read before a concurrent change invalidated
+        it is not served from the cache afterwards
+        """
+        def load_stale():
+            stale = {"id": str(self.customer.id), "data": {"SUBSCRIPTION": "free"}, "version": 1}
+            invalidate_customers(self.customer.id)
+            return stale
+
+        customer_cache().clear()
+        get_or_cache_customer(self.customer.id, load_stale)
+        fresh = get_or_cache_customer(self.customer.id, lambda: {"version": 2})
+
+        self.assertEqual(fresh, {"version": 2})
+        self.assertEqual(get_cache_stats()["misses"], 2)
+
+    def test_does_not_cache_filtered_or_invalid_retrieves(self):
+        """
+        Asserts that the filtered retrieves and the invalid ids
+        skip the cache
+        """
+        filtered = self.client.get(self.url, {"subscription": "basic"})
+        invalid = self.client.get("/api/v1/customerdata/not-a-uuid/")
+
+        self.assertEqual(filtered.status_code, 404)
+        self.assertEqual(invalid.status_code, 404)
+        self.assertEqual(get_cache_stats(), {"hits": 0, "misses": 0, "hit_rate": 0.0})
+
+
+class CustomerDataTransitionTestCase(TestCase):
+    """
+    Test case for the subscription transition action of the customer data API
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = CustomerData.objects.create(
+            data={
+                "SUBSCRIPTION": "premium",
+                "UPGRADE_DATE": "2020-01-10T09:25:00Z",
+                "theme_name": "Tropical Island",
+                "ENABLED_FEATURES": {"ENABLE_EDXNOTES": True, "ENABLE_COURSE_DISCOVERY": False},
+            }
+        )
+        self.url = f"/api/v1/customerdata/{self.customer.id}/transition/"
+
+    def test_applies_the_rules_of_the_change(self):
+        """
+        Asserts that a downgrade to the free plan stamps its date, deletes the
+        upgrade date, turns off the features and returns the report of the change
+        """
+        response = self.client.post(self.url, {"command": "downgrade", "subscription": "free"}, format="json")
+
+        self.customer.refresh_from_db()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], '"2"')
+        self.assertEqual(response.json()["report"], f"{self.customer.id} -- DOWNGRADED -- from premium to free")
+        self.assertEqual(response.json()["old_subscription"], "premium")
+        self.assertEqual(self.customer.data["SUBSCRIPTION"], "free")
+        self.assertNotIn("UPGRADE_DATE", self.customer.data)
+        self.assertRegex(self.customer.data["DOWNGRADE_DATE"], r"^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\dZ$")
+        self.assertEqual(
+            self.customer.data["ENABLED_FEATURES"], {"ENABLE_EDXNOTES": False, "ENABLE_COURSE_DISCOVERY": False}
+        )
+        self.assertEqual(self.customer.data["theme_name"], "Tropical Island")
+
+    @override_settings(
+        CUSTOMERDATA_SUBSCRIPTIONS={
+            "free": {"level": 1, "free": True},
+            "basic": {"level": 2, "features": ["ENABLE_EDXNOTES"]},
+            "premium": {"level": 3},
+        },
+        CUSTOMERDATA_SUBSCRIPTION_RULES=[
+            {"command": "downgrade", "delete": ["UPGRADE_DATE", "theme_name"], "stamp": ["DOWNGRADE_DATE"]},
+            {"command": "downgrade", "plans": ["basic"], "restrict_features": True, "stamp": ["BASIC_SINCE"]},
+            {"command": "downgrade", "plans": ["free"], "delete": ["ENABLED_FEATURES"]},
+        ],
+    )
+    def test_applies_the_declarative_rules_and_the_features_of_the_plans(self):
+        """
+        Asserts that the rules of the settings apply to their command and
+        plans, and the features are restricted to the ones the plan lists
+        """
+        self.customer.data["ENABLED_FEATURES"]["ENABLE_COURSE_DISCOVERY"] = True
+        self.customer.save()
+
+        response = self.client.post(self.url, {"command": "downgrade", "subscription": "basic"}, format="json")
+
+        self.customer.refresh_from_db()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.customer.data["DOWNGRADE_DATE"], self.customer.data["BASIC_SINCE"])
+        self.assertEqual(
+            self.customer.data["ENABLED_FEATURES"], {"ENABLE_EDXNOTES": True, "ENABLE_COURSE_DISCOVERY": False}
+        )
+        self.assertEqual(
+            sorted(self.customer.data), ["BASIC_SINCE", "DOWNGRADE_DATE", "ENABLED_FEATURES", "SUBSCRIPTION"]
+        )
+
+    def test_rejects_the_changes_that_are_not_allowed(self):
+        """
+        Asserts that the changes to an unknown plan or in the wrong direction
+        get the exit code of the subscription manager and change nothing
+        """
+        unknown = self.client.post(self.url, {"command": "upgrade", "subscription": "gold"}, format="json")
+        upgrade = self.client.post(self.url, {"command": "upgrade", "subscription": "basic"}, format="json")
+        self.customer.data = ["not an object"]
+        self.customer.save()
+        downgrade = self.client.post(self.url, {"command": "downgrade", "subscription": "basic"}, format="json")
+
+        self.customer.refresh_from_db()
+        self.assertEqual(unknown.status_code, 409)
+        self.assertEqual(unknown.json()["exit_code"], 3)
+        self.assertEqual(upgrade.json(), {"detail": "Attempted to upgrade from premium to basic.", "exit_code": 4})
+        self.assertEqual(downgrade.json()["exit_code"], 5)
+        self.assertEqual(self.customer.version, 1)
+
+    def test_rejects_bad_requests(self):
+        """
+        Asserts that an unknown command, a stale If-Match header
+        or an unknown customer are rejected
+        """
+        command = self.client.post(self.url, {"command": "cancel", "subscription": "free"}, format="json")
+        stale = self.client.post(
+            self.url, {"command": "upgrade", "subscription": "premium"}, format="json", HTTP_IF_MATCH='"7"'
+        )
+        missing = self.client.post(
+            "/api/v1/customerdata/49a6307e-c261-414d-86f5-c6004bcec8ab/transition/",
+            {"command": "upgrade", "subscription": "premium"},
+            format="json",
+        )
+
+        self.assertEqual(command.status_code, 400)
+        self.assertEqual(stale.status_code, 412)
+        self.assertEqual(missing.status_code, 404)
+
+
+class CustomerDataListTestCase(TestCase):
+    """
+    Test case for the keyset pagination and the filters of the customer data list
+    """
+
+    url = "/api/v1/customerdata/"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.customers = [
+            CustomerData.objects.create(
+                data={
+                    "SUBSCRIPTION": subscription,
+                    "ENABLED_FEATURES": {"ENABLE_EDXNOTES": index % 2 == 0, "ENABLE_COURSE_DISCOVERY": index < 2},
+                }
+            )
+            for index, subscription in enumerate(["free", "basic", "premium", "premium", "free"])
+        ]
+
+    def list_ids(self, url):
+        """
+        Returns the ids of every page of the list, and the number of pages
+        """
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [customer["id"] for customer in response.json()["results"]]
+            url = response.json()["next"]
+            pages += 1
+        return ids, pages
+
+    def test_walks_every_customer_by_id(self):
+        """
+        Asserts that the pages of the list return every customer once,
+        ordered by id, without OFFSET scans
+        """
+        with CaptureQueriesContext(connection) as queries:
+            ids, pages = self.list_ids(f"{self.url}?page_size=2")
+
+        self.assertEqual(ids, sorted(str(customer.id) for customer in self.customers))
+        self.assertEqual(pages, 3)
+        self.assertFalse(any("OFFSET" in query["sql"] for query in queries.captured_queries))
+
+    def test_filters_by_subscription(self):
+        """
+        Asserts that the list only returns the customers of the given subscriptions
+        """
+        ids, _ = self.list_ids(f"{self.url}?subscription=basic,premium")
+
+        self.assertEqual(ids, sorted(str(customer.id) for customer in self.customers[1:4]))
+
+    def test_filters_by_feature_flags(self):
+        """
+        Asserts that the list only returns the customers with the
+        given features enabled and disabled
+        """
+        ids, _ = self.list_ids(
+            f"{self.url}?enabled_features=ENABLE_EDXNOTES&disabled_features=ENABLE_COURSE_DISCOVERY"
+        )
+
+        self.assertEqual(ids, sorted(str(customer.id) for customer in self.customers[2::2]))
+
+    def test_rejects_invalid_feature_names(self):
+        """
+        Asserts that feature names that are not a single key of the
+        ENABLED_FEATURES are rejected
+        """
+        response = self.client.get(f"{self.url}?enabled_features=ENABLE__EDXNOTES")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_exports_the_filtered_customers_as_ndjson(self):
+        """
+        Asserts that the export streams one JSON line per customer
+        of the list filters
+        """
+        response = self.client.get(f"{self.url}export/?subscription=premium")
+
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual([line["id"] for line in lines], sorted(str(customer.id) for customer in self.customers[2:4]))
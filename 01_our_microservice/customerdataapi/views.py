@@ -4,10 +4,70 @@ Views for customerdataapi.
 """
 from __future__ import absolute_import, unicode_literals
 
-from rest_framework import viewsets, permissions
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+from customerdataapi.cache import get_cache_stats, get_or_cache_customer, invalidate_customers
+from customerdataapi.changes import apply_bulk_changes, merge_patch
+from customerdataapi.export import NDJSON_CONTENT_TYPE, export_lines
+from customerdataapi.filters import CustomerDataFilterBackend
 from customerdataapi.models import CustomerData
-from customerdataapi.serializers import CustomerDataSerializer
+from customerdataapi.pagination import CustomerDataCursorPagination
+from customerdataapi.serializers import (
+    CustomerDataChangesSerializer,
+    CustomerDataIdsSerializer,
+    CustomerDataSerializer,
+    CustomerDataTransitionSerializer,
+)
+from customerdataapi.subscriptions import TransitionError, apply_transition, report_of_changes
+
+
+class MergePatchParser(JSONParser):
+    """
+    Parses JSON merge patch (RFC 7396) request bodies
+    """
+    media_type = 'application/merge-patch+json'
+
+
+class PreconditionFailed(APIException):
+    """
+    The If-Match header of the request does not match the CustomerData
+    """
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The customer data was modified by another request.'
+    default_code = 'precondition_failed'
+
+
+def check_if_match(request, customer):
+    """
+    Raises PreconditionFailed when the request has an If-Match header
+    that lists neither the entity tag of the customer nor '*'
+    """
+    if_match = request.headers.get('If-Match')
+    if if_match is None:
+        return
+    etags = {etag.strip() for etag in if_match.split(',')}
+    if '*' not in etags and customer.etag not in etags:
+        raise PreconditionFailed()
+
+
+def is_not_modified(request, etag):
+    """
+    Returns True when the request has an If-None-Match header that lists
+    the entity tag of the customer or '*', so its copy is still valid
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is None:
+        return False
+    etags = {etag.strip() for etag in if_none_match.split(',')}
+    return '*' in etags or etag in etags
 
 
 class CustomerDataViewSet(viewsets.ModelViewSet):
@@ -18,3 +78,172 @@ class CustomerDataViewSet(viewsets.ModelViewSet):
     queryset = CustomerData.objects.all()
     serializer_class = CustomerDataSerializer
     permission_classes = (permissions.AllowAny,)
+    pagination_class = CustomerDataCursorPagination
+    filter_backends = (CustomerDataFilterBackend,)
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES + [MergePatchParser]
+
+    def get_locked_object(self, lookup):
+        """
+        Returns the CustomerData of the lookup value with its row locked
+        until the end of the current transaction
+        """
+        queryset = self.get_queryset().select_for_update()
+        customer = get_object_or_404(queryset, **{self.lookup_field: lookup})
+        self.check_object_permissions(self.request, customer)
+        return customer
+
+    def versioned_response(self, customer):
+        """
+        Returns the serialized CustomerData with its entity tag
+        """
+        return Response(self.get_serializer(customer).data, headers={'ETag': customer.etag})
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Returns the CustomerData with its version as the ETag header,
+        to be sent back in the If-Match header of the updates. Clients
+        that send it in the If-None-Match header get a 304 response without
+        body while their copy is still the current version
+        """
+        data = self.get_serialized_object()
+        headers = {'ETag': f'"{data["version"]}"'}
+        if is_not_modified(request, headers['ETag']):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(data, headers=headers)
+
+    def get_serialized_object(self):
+        """
+        Returns the serialized CustomerData of the request from the cache
+        of customers, serializing and caching it on a miss. Filtered
+        retrieves are not cached
+        """
+        lookup = self.kwargs[self.lookup_field]
+        if self.request.query_params:
+            return self.get_serializer(self.get_object()).data
+        return get_or_cache_customer(lookup, lambda: self.get_serializer(self.get_object()).data)
+
+    def update(self, request, *args, **kwargs):
+        """
+        Replaces the CustomerData, checking the If-Match header of the
+        request against its locked row. Every update increases its version
+        """
+        with transaction.atomic():
+            customer = self.get_locked_object(kwargs[self.lookup_field])
+            check_if_match(request, customer)
+            serializer = self.get_serializer(customer, data=request.data)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(version=customer.version + 1)
+        return self.versioned_response(customer)
+
+    def partial_update(self, request, *args, **kwargs):
+        """
+        Applies the request body to the CustomerData as a JSON merge
+        patch (RFC 7396), so only the keys of the data present in the
+        patch change and concurrent edits of other keys are kept. The
+        patch is applied to the locked row inside a transaction, once
+        the If-Match header of the request matches it.
+        """
+        patch = request.data
+        if not isinstance(patch, dict):
+            raise ValidationError({'detail': 'The merge patch must be a JSON object.'})
+
+        with transaction.atomic():
+            customer = self.get_locked_object(kwargs[self.lookup_field])
+            check_if_match(request, customer)
+            if 'data' in patch:
+                customer.data = merge_patch(customer.data, patch['data'])
+                customer.version += 1
+                customer.save(update_fields=['data', 'version'])
+        return self.versioned_response(customer)
+
+    @action(detail=True, methods=['post'])
+    def transition(self, request, **kwargs):
+        """
+        Upgrades or downgrades the subscription of the CustomerData to the
+        posted {"command": ..., "subscription": ...} with the rules of
+        RULES.md, on its locked row inside a transaction, so a change costs a
+        single request. Returns the report of the change with the new version
+        of the customer, or 409 with the exit code of the subscription
+        manager when the change is not allowed
+        """
+        serializer = CustomerDataTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        command = serializer.validated_data['command']
+        new = serializer.validated_data['subscription']
+
+        try:
+            with transaction.atomic():
+                customer = self.get_locked_object(kwargs[self.lookup_field])
+                check_if_match(request, customer)
+                old = apply_transition(customer.data, command, new)
+                customer.version += 1
+                customer.save(update_fields=['data', 'version'])
+        except TransitionError as error:
+            rejected = {'detail': str(error), 'exit_code': error.exit_code}
+            return Response(rejected, status=status.HTTP_409_CONFLICT)
+        result = {
+            'id': str(customer.id),
+            'report': report_of_changes(customer.id, command, old, new),
+            'old_subscription': old,
+            'new_subscription': new,
+            'version': customer.version,
+        }
+        return Response(result, headers={'ETag': customer.etag})
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):  # pylint: disable=unused-argument
+        """
+        Streams every CustomerData as newline delimited JSON, one customer
+        per line, with the same filters as the list. The rows are read
+        with a database cursor while the response is sent, so the memory
+        used does not grow with the size of the table
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(export_lines(queryset), content_type=NDJSON_CONTENT_TYPE)
+
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):  # pylint: disable=unused-argument
+        """
+        Returns the hits, misses and hit rate of the cache of
+        the retrieved customers
+        """
+        return Response(get_cache_stats())
+
+    @action(detail=False, methods=['post'], url_path='bulk-retrieve')
+    def bulk_retrieve(self, request):
+        """
+        Returns the CustomerData of every id in the posted {"ids": [...]}
+        list with a single query. The ids that do not exist are listed
+        under "missing". Clients must split larger lists in chunks of
+        CUSTOMERDATA_BULK_MAX_IDS ids.
+        """
+        ids_serializer = CustomerDataIdsSerializer(data=request.data)
+        ids_serializer.is_valid(raise_exception=True)
+        ids = ids_serializer.validated_data['ids']
+
+        customers = self.get_queryset().filter(id__in=ids)
+        serializer = self.get_serializer(customers, many=True)
+        found = {customer.id for customer in customers}
+        missing = [str(customer_id) for customer_id in ids if customer_id not in found]
+        return Response({'results': serializer.data, 'missing': missing})
+
+    @action(detail=False, methods=['patch'], url_path='bulk-update')
+    def bulk_partial_update(self, request):
+        """
+        Applies the key level changes posted as
+        {"changes": [{"id": ..., "update": {...}, "delete": [...]}]}
+        to many CustomerData in a single transaction. A change with a
+        "version" is only applied when the CustomerData is still at that
+        version. Returns the "updated", "conflict" or "failed" status of
+        every change, in order.
+        """
+        changes_serializer = CustomerDataChangesSerializer(data=request.data)
+        changes_serializer.is_valid(raise_exception=True)
+        changes = changes_serializer.validated_data['changes']
+
+        with transaction.atomic():
+            results, customers = apply_bulk_changes(changes, self.get_queryset())
+            CustomerData.objects.bulk_update(customers, ['data', 'version'])
+            # The bulk update does not send the save signals.
+            invalidate_customers(*(customer.pk for customer in customers))
+        return Response({'results': results})
@@ -98,6 +98,30 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The retrieved customers are kept in the memory of every process, use the
+# django.core.cache.backends.filebased.FileBasedCache backend to share them
+# between processes without an outside service.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'customerdata': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'customerdata',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'customerdata-stats': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'customerdata-stats',
+        'TIMEOUT': None,
+    },
+}
+
+
 # Rest framework
 
 REST_FRAMEWORK = {
@@ -107,3 +131,30 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 10
 }
+
+
+# Customer data API
+
+CUSTOMERDATA_BULK_MAX_IDS = 500  # Maximum number of ids in a bulk request
+CUSTOMERDATA_PAGE_SIZE = 1000  # Default number of customers per page of the list
+CUSTOMERDATA_MAX_PAGE_SIZE = 10000  # Maximum page_size accepted by the list
+CUSTOMERDATA_EXPORT_CHUNK_SIZE = 2000  # Rows read from the database at once by the export
+CUSTOMERDATA_CACHE = 'customerdata'  # Alias in CACHES of the cache of the retrieved customers
+CUSTOMERDATA_STATS_CACHE = 'customerdata-stats'  # Alias in CACHES of the hit and miss counters
+
+# Subscription plans of the transition action, with the "level" of every plan, whether it is "free"
+# and the "features" it allows, none for a free plan and all of them for the rest when not listed.
+# Keep them the same as the SUBSCRIPTIONS of the subscription manager
+CUSTOMERDATA_SUBSCRIPTIONS = {
+    'free': {'level': 1, 'free': True},
+    'basic': {'level': 2},
+    'premium': {'level': 3},
+}
+
+# Side effects of the changes of the transition action and of migrate_subscriptions, in the format of
+# the SUBSCRIPTION_RULES of the subscription manager. Keep them the same
+CUSTOMERDATA_SUBSCRIPTION_RULES = [
+    {'command': 'upgrade', 'delete': ['DOWNGRADE_DATE'], 'stamp': ['UPGRADE_DATE']},
+    {'command': 'downgrade', 'delete': ['UPGRADE_DATE'], 'stamp': ['DOWNGRADE_DATE']},
+    {'command': 'downgrade', 'restrict_features': True},
+]
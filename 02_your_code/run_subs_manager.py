@@ -9,30 +9,249 @@ python run_subs_manager.py upgrade 1b2f7b83-7b4d-441d-a210-afaa970e5b76 premium
 
 python run_subs_manager.py downgrade 1b2f7b83-7b4d-441d-a210-afaa970e5b76 free
     output: 1b2f7b83-7b4d-441d-a210-afaa970e5b76 -- DOWNGRADED -- from premium to free
+
+python run_subs_manager.py batch changes.csv report.csv
+    output: 3 changes -- 2 applied -- 1 failed -- 66.7% connections reused
+
+python run_subs_manager.py dry-run changes.csv diff.csv
+    output: 3 changes -- 2 would apply -- 1 would fail -- nothing was written
+
+python run_subs_manager.py worker
+    output: Listening on subscription_worker.sock
+
+Use '-' as the file name of the batch input or report to read from
+stdin or write to stdout.
 """
+import logging
+import signal
 import sys
 
-from settings_subs_manager import CUSTOMER_DATA_API_URL, SUBSCRIPTIONS
+from settings_subs_manager import (
+    BATCH_BULK_UPDATE,
+    BATCH_CONCURRENCY,
+    BATCH_JOURNAL_SUFFIX,
+    BATCH_JOURNAL_SYNC_EVERY,
+    BATCH_PREFETCH_SIZE,
+    BREAKER_RESET_TIMEOUT,
+    BREAKER_THRESHOLD,
+    CACHE_MAX_SIZE,
+    CACHE_TTL,
+    CONCURRENCY_MAX,
+    CONCURRENCY_MIN,
+    CONCURRENCY_TOLERANCE,
+    CONCURRENCY_WINDOW,
+    CONFLICT_RETRIES,
+    CUSTOMER_DATA_API_URL,
+    HTTP_KEEP_ALIVE,
+    HTTP_POOL_BLOCK,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    RATE_BURST,
+    RATE_LIMIT,
+    REQUEST_TIMEOUT,
+    RETRY_ATTEMPTS,
+    RETRY_BACKOFF,
+    RETRY_MAX_BACKOFF,
+    SERVER_TRANSITIONS,
+    SUBSCRIPTION_RULES,
+    SUBSCRIPTIONS,
+    WORKER_LOG_FILE,
+    WORKER_SOCKET,
+    WORKER_THREADS,
+)
+from subscription_manager_base.subscription_manager.aio import AsyncSubscriptionManager
+from subscription_manager_base.subscription_manager.batch import (
+    BatchSubscriptionManager,
+)
+from subscription_manager_base.subscription_manager.cache import CustomerDataCache
 from subscription_manager_base.subscription_manager.core import (
     DowngradeSubscription,
     UpgradeSubscription,
 )
+from subscription_manager_base.subscription_manager.dryrun import (
+    DryRunSubscriptionManager,
+)
+from subscription_manager_base.subscription_manager.exceptions import (
+    SubscriptionManagerError,
+)
+from subscription_manager_base.subscription_manager.journal import CheckpointJournal
+from subscription_manager_base.subscription_manager.plans import PlanRegistry
+from subscription_manager_base.subscription_manager.resilience import (
+    CircuitBreaker,
+    RetryPolicy,
+)
+from subscription_manager_base.subscription_manager.sessions import build_session
+from subscription_manager_base.subscription_manager.throttle import (
+    AdaptiveConcurrency,
+    TokenBucket,
+)
+from subscription_manager_base.subscription_manager.worker import SubscriptionWorker
+
+PLANS = PlanRegistry(SUBSCRIPTIONS, SUBSCRIPTION_RULES)
+
+SESSION = build_session(
+    pool_connections=HTTP_POOL_CONNECTIONS,
+    pool_maxsize=HTTP_POOL_MAXSIZE,
+    pool_block=HTTP_POOL_BLOCK,
+    keep_alive=HTTP_KEEP_ALIVE,
+    retry_policy=RetryPolicy(RETRY_ATTEMPTS, RETRY_BACKOFF, RETRY_MAX_BACKOFF)
+    if RETRY_ATTEMPTS
+    else None,
+    breaker=CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET_TIMEOUT)
+    if BREAKER_THRESHOLD
+    else None,
+    rate_limiter=TokenBucket(RATE_LIMIT, RATE_BURST) if RATE_LIMIT else None,
+    concurrency=AdaptiveConcurrency(
+        min(BATCH_CONCURRENCY, CONCURRENCY_MAX),
+        CONCURRENCY_MIN,
+        CONCURRENCY_MAX,
+        CONCURRENCY_WINDOW,
+        CONCURRENCY_TOLERANCE,
+    )
+    if CONCURRENCY_MAX
+    else None,
+)
+
+
+def open_stream(name, mode):
+    """
+    Opens the given file name, '-' stands for stdin or stdout.
+    """
+    if name == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return open(name, mode, newline="", encoding="utf-8")
+
+
+def run_batch(input_name, report_name):
+    """
+    Runs every change of the input file and writes the per customer report.
+    The changes that succeeded in a previous run of the file are skipped.
+    """
+    journal = None
+    if BATCH_JOURNAL_SUFFIX and input_name != "-":
+        journal = CheckpointJournal(
+            input_name + BATCH_JOURNAL_SUFFIX, sync_every=BATCH_JOURNAL_SYNC_EVERY
+        )
+    if BATCH_CONCURRENCY > 1 and not BATCH_BULK_UPDATE:
+        batch_manager = AsyncSubscriptionManager(
+            CUSTOMER_DATA_API_URL,
+            PLANS,
+            session=SESSION,
+            timeout=REQUEST_TIMEOUT,
+            prefetch_size=BATCH_PREFETCH_SIZE,
+            conflict_retries=CONFLICT_RETRIES,
+            concurrency=BATCH_CONCURRENCY,
+            journal=journal,
+        )
+    else:
+        batch_manager = BatchSubscriptionManager(
+            CUSTOMER_DATA_API_URL,
+            PLANS,
+            session=SESSION,
+            timeout=REQUEST_TIMEOUT,
+            prefetch_size=BATCH_PREFETCH_SIZE,
+            bulk_update=BATCH_BULK_UPDATE,
+            conflict_retries=CONFLICT_RETRIES,
+            journal=journal,
+        )
+    try:
+        return run_report(batch_manager, input_name, report_name)
+    finally:
+        if journal is not None:
+            journal.close()
+
+
+def run_dry_run(input_name, report_name):
+    """
+    Computes the diff of every change of the input file without writing
+    it, and writes the per customer report with the diffs.
+    """
+    batch_manager = DryRunSubscriptionManager(
+        CUSTOMER_DATA_API_URL,
+        PLANS,
+        session=SESSION,
+        timeout=REQUEST_TIMEOUT,
+        prefetch_size=BATCH_PREFETCH_SIZE,
+    )
+    return run_report(batch_manager, input_name, report_name)
+
+
+def run_report(batch_manager, input_name, report_name):
+    """
+    Runs the batch manager on the input file, writes its report and
+    prints its summary. Returns 1 when some changes failed.
+    """
+    input_stream = open_stream(input_name, "r")
+    report_stream = open_stream(report_name, "w")
+    try:
+        failed = batch_manager.run(input_stream, report_stream)
+    finally:
+        for stream in (input_stream, report_stream):
+            if stream not in (sys.stdin, sys.stdout):
+                stream.close()
+    print(batch_manager.summary(), file=sys.stderr)
+    return 1 if failed else 0
+
+
+def run_worker():
+    """
+    Applies the changes sent by './cli' until the process is stopped.
+    """
+    # The errors of every change go back to its client, and to the
+    # worker log instead of the error.log of the single changes.
+    logging.basicConfig(filename=WORKER_LOG_FILE, format="%(message)s", force=True)
+    batch_manager = BatchSubscriptionManager(
+        CUSTOMER_DATA_API_URL,
+        PLANS,
+        session=SESSION,
+        timeout=REQUEST_TIMEOUT,
+        conflict_retries=CONFLICT_RETRIES,
+        cache=CustomerDataCache(CACHE_MAX_SIZE, CACHE_TTL) if CACHE_MAX_SIZE else None,
+        server_transitions=SERVER_TRANSITIONS,
+    )
+    worker = SubscriptionWorker(batch_manager, WORKER_SOCKET, workers=WORKER_THREADS)
+    signal.signal(signal.SIGTERM, lambda *_: worker.shutdown())
+    print(f"Listening on {WORKER_SOCKET}", file=sys.stderr)
+    try:
+        worker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.shutdown()
+
 
 if __name__ == "__main__":
-    if len(sys.argv) < 4:
+    if len(sys.argv) >= 2 and sys.argv[1] == "worker":
+        run_worker()
+    elif len(sys.argv) >= 3 and sys.argv[1] in ("batch", "dry-run"):
+        REPORT = sys.argv[3] if len(sys.argv) > 3 else "-"
+        RUN = run_batch if sys.argv[1] == "batch" else run_dry_run
+        sys.exit(RUN(sys.argv[2], REPORT))
+    elif len(sys.argv) < 4:
         print("Usage: python script.py upgrade/downgrade uuid plan")
+        print("       python script.py batch input.csv [report.csv]")
+        print("       python script.py dry-run input.csv [report.csv]")
+        print("       python script.py worker")
     else:
         COMMAND = sys.argv[1]
         UUID = sys.argv[2]
         NEW_SUBSCRIPTION = sys.argv[3]
+        MANAGERS = {"upgrade": UpgradeSubscription, "downgrade": DowngradeSubscription}
 
-        if COMMAND == "upgrade":
-            upgrade_manager = UpgradeSubscription(
-                UUID, NEW_SUBSCRIPTION, CUSTOMER_DATA_API_URL, SUBSCRIPTIONS
-            )
-            print(upgrade_manager.upgrade())
-        if COMMAND == "downgrade":
-            downgrade_manager = DowngradeSubscription(
-                UUID, NEW_SUBSCRIPTION, CUSTOMER_DATA_API_URL, SUBSCRIPTIONS
+        if COMMAND in MANAGERS:
+            manager = MANAGERS[COMMAND](
+                UUID,
+                NEW_SUBSCRIPTION,
+                CUSTOMER_DATA_API_URL,
+                PLANS,
+                session=SESSION,
+                timeout=REQUEST_TIMEOUT,
+                conflict_retries=CONFLICT_RETRIES,
+                server_transitions=SERVER_TRANSITIONS,
             )
-            print(downgrade_manager.downgrade())
+            # The library raises the error of a failed change, only
+            # this script turns it into the exit code of the process.
+            try:
+                print(getattr(manager, COMMAND)())
+            except SubscriptionManagerError as error:
+                sys.exit(error.exit_code)
@@ -3,8 +3,105 @@ Configuration to run the subscription manager library.
 """
 CUSTOMER_DATA_API_URL = "http://localhost:8010/api/v1/customerdata/"
 
+# Subscription plans, compiled once into a PlanRegistry. A change to a higher
+# level is an upgrade and to a lower level a downgrade. The "features" of a plan
+# are the ENABLED_FEATURES it allows, a "free" plan allows none unless listed,
+# and the rest allow all of them. New plans only need a new entry.
 SUBSCRIPTIONS = {
-    "free": 1,
-    "basic": 2,
-    "premium": 3,
+    "free": {"level": 1, "free": True},
+    "basic": {"level": 2},
+    "premium": {"level": 3},
 }
+
+# Side effects of the changes, as described in RULES.md. Every rule applies to
+# a "command" and to the new "plans" it lists, or to all of them when missing,
+# and can "delete" keys, "stamp" keys with the datetime of the change and
+# "restrict_features" to the ones allowed by the new plan.
+SUBSCRIPTION_RULES = [
+    {"command": "upgrade", "delete": ["DOWNGRADE_DATE"], "stamp": ["UPGRADE_DATE"]},
+    {"command": "downgrade", "delete": ["UPGRADE_DATE"], "stamp": ["DOWNGRADE_DATE"]},
+    {"command": "downgrade", "restrict_features": True},
+]
+
+# Apply the upgrades and downgrades with the transition action of the customer
+# data API, a single request per change where the API applies the rules. Only
+# turn it on when the CUSTOMERDATA_SUBSCRIPTIONS and the
+# CUSTOMERDATA_SUBSCRIPTION_RULES of the API match SUBSCRIPTIONS and
+# SUBSCRIPTION_RULES. The changes are applied here with SUBSCRIPTION_RULES
+# when it is off, or when the API has no transition action.
+SERVER_TRANSITIONS = False
+
+# Deadline in seconds of every request sent to the customer data API.
+REQUEST_TIMEOUT = 5
+
+# Times a change is validated and applied again to the new customer data
+# when another client updated it since it was retrieved, 0 to fail at once.
+CONFLICT_RETRIES = 3
+
+# Number of customers kept in flight at once by './cli batch', use 1 to
+# apply the changes one after another. Keep it below HTTP_POOL_MAXSIZE.
+BATCH_CONCURRENCY = 10
+
+# Number of customers retrieved at once with the bulk retrieve endpoint of
+# the customer data API during './cli batch', use 0 to retrieve one by one.
+BATCH_PREFETCH_SIZE = 500
+
+# Send the changes of every BATCH_PREFETCH_SIZE customers of './cli batch' in
+# a single request to the bulk update endpoint of the customer data API.
+# The changes are applied one after another when it is enabled.
+BATCH_BULK_UPDATE = True
+
+# Journal of the results of './cli batch', kept next to the input file with
+# this suffix. Running the same input again skips the changes that succeeded
+# and retries the failed ones. Use "" to disable it.
+BATCH_JOURNAL_SUFFIX = ".journal"
+BATCH_JOURNAL_SYNC_EVERY = 100  # Results written between two syncs to the disk.
+
+# Connection pool of the HTTP session shared by all the requests of a run.
+HTTP_POOL_CONNECTIONS = 10  # Number of per host connection pools to keep.
+HTTP_POOL_MAXSIZE = 10  # Maximum number of open connections per host.
+HTTP_POOL_BLOCK = False  # Wait for a free connection when the pool is full.
+HTTP_KEEP_ALIVE = True  # Reuse the connections between requests.
+
+# Retries of the requests to the customer data API after a dropped connection,
+# a timeout or a 429/502/503/504 answer. The delay before every retry is drawn at
+# random below RETRY_BACKOFF seconds, doubled with every retry up to
+# RETRY_MAX_BACKOFF. Updates are only retried when they never reached the API.
+RETRY_ATTEMPTS = 3  # Times a request is sent again, 0 to disable the retries.
+RETRY_BACKOFF = 0.5
+RETRY_MAX_BACKOFF = 10
+
+# Circuit breaker shared by all the requests of a run. After BREAKER_THRESHOLD
+# failed requests in a row every request waits BREAKER_RESET_TIMEOUT seconds,
+# then a single one probes the API before the rest go on. Use 0 to disable it.
+BREAKER_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30
+
+# Client side rate limit of the requests to the customer data API, shared by
+# all the threads of a run: RATE_LIMIT requests per second on average, with
+# bursts of up to RATE_BURST after a quiet period. Use 0 to disable it.
+RATE_LIMIT = 0
+RATE_BURST = 10
+
+# Adaptive limit of the requests in flight at once, starting at
+# BATCH_CONCURRENCY. It is halved when the API answers a 5xx or a 429, or
+# when the p99 latency of the last CONCURRENCY_WINDOW requests grows beyond
+# CONCURRENCY_TOLERANCE times the p99 of a healthy API, and raised by one
+# after every healthy window. Use 0 as CONCURRENCY_MAX to disable it.
+CONCURRENCY_MIN = 1
+CONCURRENCY_MAX = HTTP_POOL_MAXSIZE
+CONCURRENCY_WINDOW = 50
+CONCURRENCY_TOLERANCE = 2.0
+
+# Worker started with './cli worker', which keeps the subscription manager
+# loaded and applies the upgrades and downgrades sent by './cli'.
+WORKER_SOCKET = "subscription_worker.sock"  # Unix socket the worker listens on.
+WORKER_THREADS = 8  # Number of changes applied at once by the worker.
+WORKER_LOG_FILE = "worker.log"  # Errors of every change applied by the worker.
+WORKER_CLIENT_TIMEOUT = 60  # Seconds './cli' waits for the result of a change.
+
+# Read-through cache of the customer data kept by the worker between changes.
+# Expired customers are revalidated with their ETag, and a customer is removed
+# once its changes are sent. Use 0 as the size to disable it.
+CACHE_MAX_SIZE = 10000  # Maximum number of customers kept.
+CACHE_TTL = 30  # Seconds a customer is used without asking the API again.
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Thin client that sends an upgrade or downgrade to the subscription worker
+started with './cli worker' and waits for its result. It only imports the
+standard library, so a change costs milliseconds instead of the startup
+of the whole subscription manager.
+
+Examples of usage:
+
+python subs_client.py upgrade 1b2f7b83-7b4d-441d-a210-afaa970e5b76 premium
+    output: 1b2f7b83-7b4d-441d-a210-afaa970e5b76 -- UPGRADED -- from free to premium
+
+The exit codes are the ones of run_subs_manager.py, with the errors written
+to error.log. When no worker is running the exit code is 75, so the cli
+applies the change with run_subs_manager.py instead.
+"""
+import sys
+
+from settings_subs_manager import WORKER_CLIENT_TIMEOUT, WORKER_SOCKET
+from subscription_manager_base.subscription_manager.exceptions import (
+    CustomerDataAPIUnavailableError,
+)
+from subscription_manager_base.subscription_manager.jobs import (
+    WORKER_UNAVAILABLE_EXIT_CODE,
+    send_job,
+)
+
+
+def write_error(message):
+    """
+    Writes the error of the change to error.log, as run_subs_manager.py does.
+    """
+    with open("error.log", "w", encoding="utf-8") as error_log:
+        error_log.write(f"{message}\n")
+
+
+def main(command, customer_id, plan):
+    """
+    Sends the change to the worker and returns its exit code.
+    """
+    try:
+        result = send_job(
+            WORKER_SOCKET, command, customer_id, plan, timeout=WORKER_CLIENT_TIMEOUT
+        )
+    except (FileNotFoundError, ConnectionRefusedError):
+        return WORKER_UNAVAILABLE_EXIT_CODE
+    except (OSError, ValueError):
+        write_error("The subscription worker did not answer, please try again later.")
+        return CustomerDataAPIUnavailableError.exit_code
+
+    if result["exit_code"] == 0:
+        print(result["report"])
+    else:
+        write_error(result["error"])
+    return result["exit_code"]
+
+
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:4]))
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio variant of the batch runner that keeps many customers in flight.
+"""
+import asyncio
+import csv
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from subscription_manager_base.subscription_manager.batch import (
+    REPORT_HEADER,
+    BatchSubscriptionManager,
+    change_result,
+)
+from subscription_manager_base.subscription_manager.exceptions import (
+    CustomerDataAPIUnavailableError,
+)
+from subscription_manager_base.subscription_manager.resilience import (
+    ResilientSession,
+)
+
+
+class AsyncSubscriptionManager(BatchSubscriptionManager):
+    """
+    Applies the changes of a batch with up to `concurrency` customers
+    in flight at once. Every change goes through the same validations,
+    rules and report strings of UpgradeSubscription and DowngradeSubscription,
+    while the blocking requests of the pooled session run on a bounded
+    thread pool under a per request deadline.
+    """
+
+    def __init__(self, *args, concurrency=10, **kwargs):
+        """
+        Attributes:
+        - concurrency (int): Maximum number of customers in flight at once.
+        - executor (ThreadPoolExecutor): Runs the requests to the API.
+
+        The rest of the attributes are the ones of BatchSubscriptionManager.
+        """
+        super().__init__(*args, **kwargs)
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def call_api(self, request):
+        """
+        Runs a blocking request of a subscription manager on the
+        thread pool and waits for it until the deadline is reached.
+        Returns the result of the request.
+
+        Raises asyncio.TimeoutError after the deadline, once the thread
+        has finished, since it cannot be cancelled: the timeout of the
+        session ends its request, which otherwise could still reach the
+        API after the change was reported as failed.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, request)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.deadline())
+        except asyncio.TimeoutError:
+            await asyncio.wait([future])
+            raise
+
+    def deadline(self):
+        """
+        Returns the seconds a request of a subscription manager is waited
+        for, which include its retries with a ResilientSession, and its
+        waits behind the other threads of the pool for the rate limiter
+        and the concurrency limit of the session.
+        """
+        if isinstance(self.session, ResilientSession):
+            return self.session.deadline(self.timeout, self.concurrency)
+        return self.timeout
+
+    async def run_change_async(self, change, customer_data=None):
+        """
+        Applies a single change and returns its ChangeResult.
+        """
+        exit_code = self.malformed_exit_code(change)
+        if exit_code:
+            return change_result(change, exit_code)
+        manager = self.build_manager(change, customer_data)
+        exit_code, report = await self.apply_changes_async(manager)
+        return change_result(change, exit_code, report)
+
+    async def apply_changes_async(self, manager):
+        """
+        Runs the fetch, validate, mutate and send steps of a subscription
+        manager. Returns its exit code and its report of changes.
+        """
+        try:
+            if not manager.customer_data:
+                await self.call_api(manager.get_customer_data)
+            applied = manager.customer_data and await self.call_api(
+                manager.apply_changes_to_current_data
+            )
+            if applied:
+                await self.call_api(manager.send_changes_to_customer_data_api)
+        except asyncio.TimeoutError:
+            # The changes may have reached the API after the deadline.
+            if not manager.changes_sent:
+                message = (
+                    f"The customer data API did not answer in "
+                    f"{self.deadline()} seconds, please try again later."
+                )
+                manager.log_error(CustomerDataAPIUnavailableError.exit_code, message)
+        if manager.changes_sent:
+            return 0, manager.report_of_changes(manager.report_action)
+        return manager.exit_code, ""
+
+    async def run_changes(self, chunks, writer):
+        """
+        Applies every change while keeping at most `concurrency` of them
+        in flight. The next change is not read from the input until one
+        of the running changes finishes, so the memory used by the run
+        does not grow with the size of the input. The changes of one
+        customer are applied one after the other, in the order they
+        were read, so they never race on its GET/PATCH cycle.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        running = set()
+        latest = {}
+
+        def finish(customer_id, task):
+            running.discard(task)
+            if latest.get(customer_id) is task:
+                del latest[customer_id]
+            semaphore.release()
+            self.record(task.result(), writer)
+
+        for chunk in chunks:
+            customers = await loop.run_in_executor(self.executor, self.prefetch, chunk)
+            for change in chunk:
+                await semaphore.acquire()
+                customer_data = customers.pop(change.customer_id, None)
+                previous = latest.get(change.customer_id)
+                if previous is not None:
+                    # The data prefetched may be older than the previous change.
+                    customer_data = None
+                task = asyncio.ensure_future(
+                    self.run_after(previous, change, customer_data)
+                )
+                latest[change.customer_id] = task
+                running.add(task)
+                task.add_done_callback(functools.partial(finish, change.customer_id))
+        if running:
+            await asyncio.wait(running)
+
+    async def run_after(self, previous, change, customer_data=None):
+        """
+        Applies a single change once the previous change of the same
+        customer, if any, has finished, and returns its ChangeResult.
+        """
+        if previous is not None:
+            await asyncio.wait([previous])
+        return await self.run_change_async(change, customer_data)
+
+    def run(self, input_stream, report_stream):
+        """
+        Applies every change read from the input stream and writes
+        one CSV row per customer to the report stream, in the order
+        the changes finish. Returns the number of failed changes.
+        """
+        writer = csv.writer(report_stream)
+        writer.writerow(REPORT_HEADER)
+        try:
+            asyncio.run(self.run_changes(self.read_chunks(input_stream), writer))
+        finally:
+            self.executor.shutdown(wait=True)
+        return self.failed
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+Batch runner to apply many subscription changes in a single process.
+"""
+import copy
+import csv
+from collections import namedtuple
+
+import requests
+from subscription_manager_base.subscription_manager.bulk import (
+    flush_pending_changes,
+    get_customer_data_many,
+)
+from subscription_manager_base.subscription_manager.core import (
+    DowngradeSubscription,
+    UpgradeSubscription,
+)
+from subscription_manager_base.subscription_manager.exceptions import (
+    SubscriptionManagerError,
+)
+from subscription_manager_base.subscription_manager.plans import PlanRegistry
+from subscription_manager_base.subscription_manager.resilience import (
+    ResilientSession,
+)
+from subscription_manager_base.subscription_manager.sessions import (
+    connection_reuse_ratio,
+)
+from subscription_manager_base.subscription_manager.utils import is_valid_uuid
+
+ChangeRequest = namedtuple("ChangeRequest", ["customer_id", "command", "plan"])
+
+ChangeResult = namedtuple(
+    "ChangeResult", ["customer_id", "command", "plan", "exit_code", "report"]
+)
+
+REPORT_HEADER = ("customer_id", "command", "plan", "exit_code", "report")
+
+# Same exit codes the cli uses for badly formed invocations.
+MISSING_ARGUMENTS_EXIT_CODE = 1
+UNKNOWN_COMMAND_EXIT_CODE = 5
+
+
+class BatchSubscriptionManager:  # pylint: disable=too-many-instance-attributes
+    """
+    Runs a stream of (uuid, command, plan) rows through the
+    UpgradeSubscription and DowngradeSubscription classes without
+    starting a new Python interpreter for every customer.
+    """
+
+    managers = {
+        "upgrade": UpgradeSubscription,
+        "downgrade": DowngradeSubscription,
+    }
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        customer_data_api_url,
+        subscriptions,
+        session=None,
+        timeout=5,
+        prefetch_size=0,
+        bulk_update=False,
+        conflict_retries=3,
+        cache=None,
+        server_transitions=False,
+        journal=None,
+    ):
+        """
+        Attributes:
+        - customer_data_api_url (str): The URL of the API used to retrieve customer data.
+        - subscriptions (Mapping):     All the vailable subscription plans, compiled once
+                                       into a PlanRegistry shared by all the changes.
+        - session (Session):           Pooled HTTP session shared by all the changes.
+        - timeout (float):             Deadline in seconds of every request to the API.
+        - prefetch_size (int):         Number of customers retrieved in bulk at once before
+                                       applying their changes, 0 disables the prefetch.
+        - bulk_update (bool):          Send the changes of every `prefetch_size` customers
+                                       in a single request to the bulk update endpoint.
+        - conflict_retries (int):      Times a change is applied again to fresh customer
+                                       data when another client updated it in the meantime.
+        - cache (CustomerDataCache):   Read-through cache of the customer data shared by
+                                       all the changes, none is used when not given.
+        - server_transitions (bool):   Apply the changes that were not prefetched with the
+                                       transition action of the customer data API.
+        - journal (CheckpointJournal): Journal of the results, where the changes that
+                                       succeeded in a previous run are skipped.
+        - succeeded (int):             Number of changes applied in the run.
+        - failed (int):                Number of changes that ended with an exit code.
+        - skipped (int):               Number of changes skipped by the journal.
+        """
+        self.customer_data_api_url = customer_data_api_url
+        self.subscriptions = PlanRegistry.from_subscriptions(subscriptions)
+        self.session = session
+        self.timeout = timeout
+        self.prefetch_size = prefetch_size
+        self.bulk_update = bulk_update
+        self.conflict_retries = conflict_retries
+        self.cache = cache
+        self.server_transitions = server_transitions
+        self.journal = journal
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+
+    @staticmethod
+    def read_changes(stream):
+        """
+        Yields a ChangeRequest for every row of the given stream.
+        Rows are comma separated, blank lines and lines starting
+        with '#' are ignored.
+        """
+        for row in csv.reader(stream):
+            if not row or row[0].strip().startswith("#"):
+                continue
+            fields = [field.strip() for field in row] + ["", "", ""]
+            yield ChangeRequest(*fields[:3])
+
+    def read_chunks(self, stream):
+        """
+        Yields the changes of the stream in lists of `prefetch_size`
+        changes, leaving out the ones that the journal skips.
+        """
+        chunk = []
+        for change in self.read_changes(stream):
+            if self.journal is not None and self.journal.skip(change):
+                self.skipped += 1
+                continue
+            chunk.append(change)
+            if len(chunk) >= max(self.prefetch_size, 1):
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def prefetch(self, changes):
+        """
+        Retrieves in bulk the customer data of the given changes.
+        An empty dictionary is returned when the prefetch is disabled
+        or fails, so every change retrieves its own customer data.
+        """
+        if not self.prefetch_size:
+            return {}
+        customer_ids = [
+            change.customer_id
+            for change in changes
+            if is_valid_uuid(change.customer_id)
+            and not self.malformed_exit_code(change)
+        ]
+        if not customer_ids:
+            return {}
+        try:
+            return get_customer_data_many(
+                customer_ids,
+                self.customer_data_api_url,
+                session=self.session,
+                timeout=self.timeout,
+                chunk_size=self.prefetch_size,
+            )
+        except (requests.exceptions.RequestException, ValueError, KeyError):
+            return {}
+
+    def malformed_exit_code(self, change):
+        """
+        Returns the cli exit code of a change with missing
+        arguments or an unknown command, None otherwise.
+        """
+        if not change.customer_id or not change.plan:
+            return MISSING_ARGUMENTS_EXIT_CODE
+        if change.command not in self.managers:
+            return UNKNOWN_COMMAND_EXIT_CODE
+        return None
+
+    def build_manager(self, change, customer_data=None):
+        """
+        Returns the subscription manager that applies the given
+        change, using the customer data when it was prefetched.
+        """
+        manager_class = self.managers[change.command]
+        manager = manager_class(
+            change.customer_id,
+            change.plan,
+            self.customer_data_api_url,
+            self.subscriptions,
+            session=self.session,
+            timeout=self.timeout,
+            conflict_retries=self.conflict_retries,
+            cache=self.cache,
+            server_transitions=self.server_transitions,
+        )
+        if customer_data:
+            manager.use_customer_data(customer_data)
+        return manager
+
+    def run_change(self, change, customer_data=None):
+        """
+        Applies a single change and returns its ChangeResult.
+        The validations and exit codes are the ones of the
+        UpgradeSubscription and DowngradeSubscription classes.
+        """
+        exit_code = self.malformed_exit_code(change)
+        if exit_code:
+            return change_result(change, exit_code)
+
+        manager = self.build_manager(change, customer_data)
+        try:
+            report = getattr(manager, change.command)()
+        except SubscriptionManagerError as error:
+            return change_result(change, error.exit_code)
+        return change_result(change, 0, report)
+
+    def apply_chunk(self, chunk, customers):
+        """
+        Applies the changes of a chunk in memory, without sending them.
+        Returns the subscription manager of every change, None for the
+        malformed ones, and the managers with changes pending to be sent.
+        """
+        managers = []
+        pending = []
+        for change in chunk:
+            if self.malformed_exit_code(change):
+                managers.append(None)
+                continue
+
+            manager = self.build_manager(
+                change, customers.pop(change.customer_id, None)
+            )
+            if not manager.customer_data:
+                manager.get_customer_data()
+            if manager.customer_data and manager.apply_changes_to_current_data():
+                # The next change of the same customer starts from this one.
+                customers[change.customer_id] = copy.deepcopy(manager.customer_data)
+                pending.append(manager)
+            elif manager.customer_data:
+                # The validations failed before changing the customer data.
+                customers[change.customer_id] = manager.customer_data
+            managers.append(manager)
+        return managers, pending
+
+    def run_chunk_in_bulk(self, chunk, customers):
+        """
+        Applies the changes of a chunk in memory and sends all of them
+        with a single request to the bulk update endpoint. Returns the
+        ChangeResult of every change of the chunk, in order.
+        """
+        managers, pending = self.apply_chunk(chunk, customers)
+        self.flush(pending)
+        return [
+            manager_result(change, manager)
+            if manager
+            else change_result(change, self.malformed_exit_code(change))
+            for change, manager in zip(chunk, managers)
+        ]
+
+    def flush(self, managers):
+        """
+        Sends the pending changes of the managers through the bulk update
+        endpoint. The changes are sent one by one, as a JSON merge patch
+        with a PATCH request, when the bulk update endpoint fails or is
+        not available.
+        """
+        try:
+            flush_pending_changes(
+                managers,
+                self.customer_data_api_url,
+                session=self.session,
+                timeout=self.timeout,
+                chunk_size=max(self.prefetch_size, 1),
+            )
+        except (requests.exceptions.RequestException, ValueError, KeyError):
+            for manager in managers:
+                if not manager.changes_sent:
+                    manager.send_changes_to_customer_data_api()
+
+    def record(self, result, writer):
+        """
+        Counts the result of a change and writes it to the report,
+        and to the journal when there is one.
+        """
+        if result.exit_code == 0:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        writer.writerow(result)
+        if self.journal is not None:
+            self.journal.append(result)
+
+    def run(self, input_stream, report_stream):
+        """
+        Applies every change read from the input stream and writes
+        one CSV row per customer to the report stream.
+        Returns the number of failed changes.
+        """
+        writer = csv.writer(report_stream)
+        writer.writerow(REPORT_HEADER)
+        for chunk in self.read_chunks(input_stream):
+            customers = self.prefetch(chunk)
+            if self.bulk_update:
+                for result in self.run_chunk_in_bulk(chunk, customers):
+                    self.record(result, writer)
+                continue
+            for change in chunk:
+                # Popped so a second change of the same customer gets fresh data.
+                customer_data = customers.pop(change.customer_id, None)
+                self.record(self.run_change(change, customer_data), writer)
+        return self.failed
+
+    def summary(self):
+        """
+        Returns a basic summary of the batch run.
+        """
+        total = self.succeeded + self.failed
+        summary = f"{total} changes -- {self.succeeded} applied -- {self.failed} failed"
+        if self.journal is not None:
+            summary += f" -- {self.skipped} skipped, applied in a previous run"
+        if isinstance(self.session, requests.Session):
+            ratio = connection_reuse_ratio(self.session)
+            summary += f" -- {ratio:.1%} connections reused"
+        if self.cache is not None:
+            summary += f" -- {self.cache.hit_ratio():.1%} cache hits"
+        if isinstance(self.session, ResilientSession):
+            metrics = self.session.metrics()
+            summary += (
+                f" -- {metrics['retries']} retries -- "
+                f"circuit opened {metrics['breaker_opens']} times"
+            )
+            if metrics["concurrency_limit"] is not None:
+                summary += f" -- concurrency limit {metrics['concurrency_limit']}"
+        return summary
+
+
+def change_result(change, exit_code, report=""):
+    """
+    Builds the ChangeResult of a given ChangeRequest.
+    """
+    return ChangeResult(*change, exit_code, report)
+
+
+def manager_result(change, manager):
+    """
+    Builds the ChangeResult of a given ChangeRequest from the
+    subscription manager that applied it.
+    """
+    if manager.changes_sent:
+        return change_result(
+            change, 0, manager.report_of_changes(manager.report_action)
+        )
+    return change_result(change, manager.exit_code)
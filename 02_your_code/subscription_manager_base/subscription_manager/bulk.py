@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk requests to the customer data API.
+"""
+import requests
+
+
+def get_customer_data_many(
+    customer_ids, customer_data_api_url, session=None, timeout=5, chunk_size=500
+):
+    """
+    Retrieves the customer data of many customers through the bulk
+    retrieve endpoint of the customer data API, sending `chunk_size`
+    ids per request. Returns a dictionary with the customer data of
+    every customer found, by customer id.
+
+    Raises requests.exceptions.RequestException when the API fails.
+    """
+    session = session if session is not None else requests
+    url = f"{customer_data_api_url}bulk-retrieve/"
+    customer_ids = list(dict.fromkeys(customer_ids))
+    customer_data = {}
+
+    for start in range(0, len(customer_ids), chunk_size):
+        chunk = customer_ids[start : start + chunk_size]
+        response = session.post(url, json={"ids": chunk}, timeout=timeout)
+        response.raise_for_status()
+        for customer in response.json()["results"]:
+            customer_data[customer["id"]] = customer
+    return customer_data
+
+
+def iter_customer_data(  # pylint: disable=too-many-arguments
+    customer_data_api_url,
+    session=None,
+    timeout=5,
+    page_size=1000,
+    subscriptions=(),
+    enabled_features=(),
+    disabled_features=(),
+):
+    """
+    Yields the customer data of every customer with one of the given
+    subscriptions and features, following the keyset pagination of the
+    list endpoint of the customer data API. The customers are selected
+    by the API, so a batch can find its targets without retrieving the
+    rest of the customers.
+
+    Raises requests.exceptions.RequestException when the API fails.
+    """
+    session = session if session is not None else requests
+    params = {
+        "page_size": page_size,
+        "subscription": ",".join(subscriptions),
+        "enabled_features": ",".join(enabled_features),
+        "disabled_features": ",".join(disabled_features),
+    }
+    url = customer_data_api_url
+    while url:
+        response = session.get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        page = response.json()
+        yield from page["results"]
+        # The next link already carries the cursor and the filters.
+        url, params = page["next"], None
+
+
+def send_changes_many(changes, customer_data_api_url, session=None, timeout=5):
+    """
+    Sends the key level changes of many customers to the bulk update
+    endpoint of the customer data API, where they are applied in a
+    single transaction. Returns the result of every change, in order.
+
+    Raises requests.exceptions.RequestException when the API fails.
+    """
+    session = session if session is not None else requests
+    url = f"{customer_data_api_url}bulk-update/"
+    response = session.patch(url, json={"changes": changes}, timeout=timeout)
+    response.raise_for_status()
+    return response.json()["results"]
+
+
+def flush_pending_changes(
+    managers, customer_data_api_url, session=None, timeout=5, chunk_size=500
+):
+    """
+    Sends the pending changes of many subscription managers through the
+    bulk update endpoint, `chunk_size` managers per request. As with
+    send_changes_to_customer_data_api, every manager gets its changes_sent
+    attribute in True or its exit code in 6. The changes of the customers
+    updated by another client in the meantime are applied again to their
+    new customer data and sent one by one.
+
+    Raises requests.exceptions.RequestException when the API fails.
+    """
+    for start in range(0, len(managers), chunk_size):
+        chunk = managers[start : start + chunk_size]
+        changes = [manager.pending_changes() for manager in chunk]
+        results = send_changes_many(
+            changes, customer_data_api_url, session=session, timeout=timeout
+        )
+        for manager, result in zip(chunk, results):
+            if result["status"] == "updated":
+                manager.mark_changes_sent()
+            elif result["status"] == "conflict" and manager.conflict_retries:
+                if manager.reapply_changes():
+                    manager.send_changes_to_customer_data_api()
+            else:
+                message = f"Failed to update the customer data [{result['errors']}]."
+                manager.log_error(6, message)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Read-through cache of the customer data retrieved from the customer data API.
+"""
+import collections
+import copy
+import threading
+import time
+
+CacheEntry = collections.namedtuple(
+    "CacheEntry", ["customer_data", "etag", "stored_at"]
+)
+
+
+class CustomerDataCache:  # pylint: disable=too-many-instance-attributes
+    """
+    Keeps the customer data of up to `max_size` customers for `ttl`
+    seconds, evicting the least recently used customer first. Expired
+    entries are kept until they are evicted, so their entity tag can be
+    sent in the If-None-Match header to revalidate them instead of
+    downloading the customer data again. It can be shared by the managers
+    of many threads.
+    """
+
+    def __init__(self, max_size=1024, ttl=60, clock=time.monotonic):
+        """
+        Attributes:
+        - max_size (int):      Maximum number of customers kept.
+        - ttl (float):         Seconds the customer data is used without
+                               asking the customer data API again.
+        - clock (callable):    Returns the current time in seconds.
+        - entries (OrderedDict): Cached CacheEntry of every customer ID,
+                               the least recently used first.
+        - hits (int):          Lookups answered from the cache.
+        - misses (int):        Lookups of customers missing or expired.
+        - revalidations (int): Expired entries the API confirmed unchanged.
+        - lock (Lock):         Guards the entries and counters.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, customer_id):
+        """
+        Returns the cached CacheEntry of the customer and whether it is
+        still fresh, or (None, False) when the customer is not cached.
+        The customer data of the entry is a copy that can be changed.
+        """
+        with self.lock:
+            entry = self.entries.get(customer_id)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            self.entries.move_to_end(customer_id)
+            fresh = self.clock() - entry.stored_at < self.ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry._replace(customer_data=copy.deepcopy(entry.customer_data)), fresh
+
+    def store(self, customer_id, customer_data, etag=None):
+        """
+        Caches a copy of the customer data of the given customer.
+        """
+        entry = CacheEntry(copy.deepcopy(customer_data), etag, self.clock())
+        with self.lock:
+            self.entries[customer_id] = entry
+            self.entries.move_to_end(customer_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def revalidate(self, customer_id):
+        """
+        Marks the cached customer data as fresh again, after
+        the customer data API confirmed it did not change.
+        """
+        with self.lock:
+            entry = self.entries.get(customer_id)
+            if entry is not None:
+                self.entries[customer_id] = entry._replace(stored_at=self.clock())
+                self.revalidations += 1
+
+    def invalidate(self, customer_id):
+        """
+        Removes the customer from the cache.
+        """
+        with self.lock:
+            self.entries.pop(customer_id, None)
+
+    def clear(self):
+        """
+        Removes every customer from the cache.
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def hit_ratio(self):
+        """
+        Returns the ratio of lookups answered from the cache.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
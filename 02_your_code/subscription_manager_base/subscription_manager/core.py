@@ -3,41 +3,112 @@
 Core classes of the subscription manager library.
 """
 import json
-import sys
 
 import requests
+from subscription_manager_base.subscription_manager.exceptions import (
+    error_for_exit_code,
+)
 from subscription_manager_base.subscription_manager.logging_config import logging
-from subscription_manager_base.subscription_manager.utils import get_standard_datetime
+from subscription_manager_base.subscription_manager.plans import PlanRegistry
+from subscription_manager_base.subscription_manager.utils import (
+    get_standard_datetime,
+    version_etag,
+)
 
 
-class SubscriptionManager:  # pylint: disable=too-many-instance-attributes
+def transition_action_missing(response):
+    """
+    Checks if the response comes from a customer data API without the
+    transition action, which does not answer JSON to unknown routes.
+    """
+    if response.status_code == 405:
+        return True
+    content_type = response.headers.get("Content-Type", "")
+    return response.status_code == 404 and "json" not in content_type
+
+
+class SubscriptionManager:  # pylint: disable=too-many-instance-attributes,too-many-public-methods
     """
     The SubscriptionManager class is used for managing customer subscriptions.
     Is the base class for UpgradeSubscription and DowngradeSubscription.
     """
 
-    def __init__(
-        self, customer_id, new_subscription, customer_data_api_url, subscriptions
+    command = None
+    invalid_exit_code = 1
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        customer_id,
+        new_subscription,
+        customer_data_api_url,
+        subscriptions,
+        session=None,
+        timeout=5,
+        conflict_retries=3,
+        cache=None,
+        server_transitions=False,
     ):
         """
         Attributes:
         - customer_id (int):           The ID of the customer.
         - new_subscription (str):      The new subscription plan for the customer.
         - customer_data_api_url (str): The URL of the API used to retrieve customer data.
-        - subscriptions (dict):        All the vailable subscription plans and their levels.
+        - subscriptions (dict):        All the vailable subscription plans and their levels,
+                                       or the PlanRegistry compiled from them.
+        - plans (PlanRegistry):        The registry of the subscriptions, compiled once.
+        - session (Session):           Pooled HTTP session shared between managers, the
+                                       requests module is used when none is given.
+        - timeout (float):             Deadline in seconds of every request to the API.
+        - conflict_retries (int):      Times the changes are applied again to fresh customer
+                                       data when another client updated it in the meantime.
+        - cache (CustomerDataCache):   Read-through cache of the customer data, shared
+                                       between managers, no cache is used when none is given.
+        - server_transitions (bool):   Apply the change with the transition action of the
+                                       customer data API, in a single request, when the
+                                       customer data was not given.
         - customer_data (dict):        Dictionary to store the customer data.
+        - cached (bool):               The customer data was served by the cache without
+                                       asking the customer data API.
+        - etag (str):                  Entity tag of the version of the customer data.
         - old_subscription (str):      The old subscription of the customer to be replaced.
+        - changed_keys (set):          Keys of the customer data changed since it was retrieved.
         - changes_sent (bool):         Check to confirm when the changes were sent to the API.
         - exit_code (int):             Exit code on error.
+        - error_message (str):         Message of the last error.
         """
         self.customer_id = customer_id
         self.new_subscription = new_subscription
         self.customer_data_api_url = customer_data_api_url
         self.subscriptions = subscriptions
+        self.session = session if session is not None else requests
+        self.timeout = timeout
+        self.conflict_retries = conflict_retries
+        self.cache = cache
+        self.server_transitions = server_transitions
         self.customer_data = {}
+        self.cached = False
+        self.etag = None
         self.old_subscription = ""
+        self.changed_keys = set()
         self.changes_sent = False
         self.exit_code = 1
+        self.error_message = ""
+
+    @property
+    def subscriptions(self):
+        """
+        All the available subscription plans, as given.
+        """
+        return self._subscriptions
+
+    @subscriptions.setter
+    def subscriptions(self, subscriptions):
+        """
+        Keeps the available subscription plans with their PlanRegistry,
+        compiled once here when only the plain levels were given.
+        """
+        self._subscriptions = subscriptions
+        self.plans = PlanRegistry.from_subscriptions(subscriptions)
 
     def get_url(self):
         """
@@ -46,33 +117,134 @@ class SubscriptionManager:  # pylint: disable=too-many-instance-attributes
         """
         return f"{self.customer_data_api_url}{self.customer_id}/"
 
+    def get_transition_url(self):
+        """
+        Returns the full URL to the transition action
+        of the given customer id.
+        """
+        return f"{self.get_url()}transition/"
+
+    def log_error(self, exit_code, message):
+        """
+        Keeps the exit code and the message of an error and logs it.
+        """
+        self.exit_code = exit_code
+        self.error_message = message
+        logging.error(message)
+
+    def change_subscription(self):
+        """
+        Retrieves the customer data when it was not given, applies the
+        changes and sends them to the customer data API. Returns the
+        report of changes, or raises the SubscriptionManagerError of the
+        exit code of the change when it fails. With server transitions, a
+        change whose customer data was not given is applied by the API.
+        """
+        if self.server_transitions and not self.customer_data:
+            report = self.change_subscription_on_server()
+            if report is not None:
+                return report
+        if not self.customer_data:
+            self.get_customer_data()
+        if self.customer_data and self.apply_changes_to_current_data():
+            self.send_changes_to_customer_data_api()
+            if self.changes_sent:
+                return self.report_of_changes(self.report_action)
+        raise error_for_exit_code(self.exit_code, self.error_message)
+
+    def change_subscription_on_server(self):
+        """
+        Sends the change to the transition action of the customer data API,
+        which validates it and applies the rules on its side, so the change
+        costs a single request. Returns the report of changes, or None when
+        the API has no transition action and the change must be applied here.
+        Raises the SubscriptionManagerError of the exit code when it fails.
+        """
+        change = {"command": self.command, "subscription": self.new_subscription}
+        try:
+            response = self.session.post(
+                self.get_transition_url(), json=change, timeout=self.timeout
+            )
+        except requests.exceptions.RequestException:
+            message = (
+                "The customer data API is currently "
+                "unavailable, please try again later."
+            )
+            self.log_error(2, message)
+            raise error_for_exit_code(self.exit_code, self.error_message) from None
+
+        if response.status_code == 200:
+            result = response.json()
+            self.old_subscription = result["old_subscription"]
+            self.mark_changes_sent()
+            return result["report"]
+        if transition_action_missing(response):
+            return None
+        if response.status_code == 409:
+            result = response.json()
+            self.log_error(result["exit_code"], result["detail"])
+        else:
+            message = (
+                f"Failed to change the subscription of the customer, "
+                f"(make sure the customer ID is correct) "
+                f"[{response.status_code} {response.reason}]."
+            )
+            self.log_error(1 if response.status_code == 404 else 6, message)
+        raise error_for_exit_code(self.exit_code, self.error_message)
+
     def get_customer_data(self):
         """
         Retrieves customer data obtained from the
-        customer data API.
+        customer data API. With a cache, the cached customer data is
+        used while fresh, and revalidated with its entity tag once expired.
         """
-        url = self.get_url()
+        entry, fresh = None, False
+        if self.cache is not None:
+            entry, fresh = self.cache.lookup(self.customer_id)
+        if fresh:
+            self.use_customer_data(entry.customer_data, entry.etag)
+            self.cached = True
+            return
 
+        options = {"timeout": self.timeout}
+        if entry is not None and entry.etag:
+            options["headers"] = {"If-None-Match": entry.etag}
         try:
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                self.customer_data = json.loads(response.text)
-                self.old_subscription = self.customer_data["data"]["SUBSCRIPTION"]
+            response = self.session.get(self.get_url(), **options)
+            if response.status_code == 304 and entry is not None:
+                self.cache.revalidate(self.customer_id)
+                self.use_customer_data(entry.customer_data, entry.etag)
+            elif response.status_code == 200:
+                self.use_customer_data(
+                    json.loads(response.text), response.headers.get("ETag")
+                )
+                if self.cache is not None:
+                    self.cache.store(self.customer_id, self.customer_data, self.etag)
             else:
                 message = (
                     f"Failed to retrieve the customer data, "
                     f"(make sure the customer ID is correct) "
                     f"[{response.status_code} {response.reason}]."
                 )
-                self.exit_code = 1
-                logging.error(message)
+                self.log_error(1, message)
         except requests.exceptions.RequestException:
             message = (
                 "The customer data API is currently "
                 "unavailable, please try again later."
             )
-            self.exit_code = 2
-            logging.error(message)
+            self.log_error(2, message)
+
+    def use_customer_data(self, customer_data, etag=None):
+        """
+        Uses customer data that was already retrieved, for example
+        in bulk, instead of requesting it again to the API. Without
+        an entity tag, the one of the version of the data is used.
+        """
+        self.customer_data = customer_data
+        self.etag = etag or version_etag(customer_data)
+        self.old_subscription = customer_data["data"]["SUBSCRIPTION"]
+        self.changed_keys = set()
+        self.cached = False
 
     def delete_item(self, key):
         """
@@ -80,36 +252,136 @@ class SubscriptionManager:  # pylint: disable=too-many-instance-attributes
         """
         if key in self.customer_data["data"]:
             del self.customer_data["data"][key]
+            self.changed_keys.add(key)
 
     def add_or_update_item(self, key, value):
         """
         Adds or updates a specific item from the customer data.
         """
         self.customer_data["data"][key] = value
+        self.changed_keys.add(key)
+
+    def pending_changes(self):
+        """
+        Returns the key level changes made to the customer data
+        that are pending to be sent to the customer data API.
+        """
+        data = self.customer_data.get("data", {})
+        changes = {
+            "id": self.customer_id,
+            "update": {
+                key: data[key] for key in sorted(self.changed_keys) if key in data
+            },
+            "delete": sorted(key for key in self.changed_keys if key not in data),
+        }
+        if "version" in self.customer_data:
+            changes["version"] = self.customer_data["version"]
+        return changes
+
+    def merge_patch(self):
+        """
+        Returns the pending changes of the customer data as a JSON
+        merge patch (RFC 7396), where the deleted keys are null.
+        """
+        changes = self.pending_changes()
+        data = dict.fromkeys(changes["delete"])
+        data.update(changes["update"])
+        return {"data": data}
+
+    def patch_customer_data(self):
+        """
+        Sends the merge patch of the pending changes to the customer
+        data API, only if the customer data is still at the version
+        the changes were applied to. Returns the response.
+        """
+        headers = {"Content-Type": "application/merge-patch+json"}
+        if self.etag:
+            headers["If-Match"] = self.etag
+        return self.session.patch(
+            self.get_url(),
+            data=json.dumps(self.merge_patch()),
+            headers=headers,
+            timeout=self.timeout,
+        )
+
+    def apply_changes_to_current_data(self):
+        """
+        Applies the changes to the customer data. When the cache served
+        it without asking the customer data API and the change is not
+        valid on it, the customer may have changed since it was cached,
+        so it is retrieved again first, instead of failing the change on
+        a stale copy. Returns False when the changes are not valid.
+        """
+        stale = (
+            self.cached
+            and self.new_subscription in self.plans
+            and self.transition() is None
+        )
+        if stale:
+            self.refresh_customer_data()
+            if not self.customer_data:
+                return False
+        return self.apply_changes()
+
+    def reapply_changes(self):
+        """
+        Retrieves the customer data again and applies the changes to it,
+        with their validations, after another client updated it.
+        Returns False when the changes are no longer valid.
+        """
+        self.refresh_customer_data()
+        return bool(self.customer_data) and self.apply_changes()
+
+    def refresh_customer_data(self):
+        """
+        Retrieves the customer data again from the customer data API,
+        dropping the copy kept in the cache, if any.
+        """
+        self.customer_data = {}
+        if self.cache is not None:
+            self.cache.invalidate(self.customer_id)
+        self.get_customer_data()
 
     def send_changes_to_customer_data_api(self):
         """
-        Sends the final changes to the customer data API.
+        Sends the final changes to the customer data API. Only the changed
+        keys are sent, as a JSON merge patch, so the keys modified by other
+        services and tools in the meantime are not overwritten. When the
+        customer data changed since it was retrieved, the changes are
+        validated and applied again to its new version, up to
+        `conflict_retries` times, instead of overwriting it.
         """
-        url = self.get_url()
         try:
-            response = requests.put(url, json=self.customer_data, timeout=5)
+            response = self.patch_customer_data()
+            for _ in range(self.conflict_retries):
+                if response.status_code != 412:
+                    break
+                if not self.reapply_changes():
+                    return
+                response = self.patch_customer_data()
             if response.status_code == 200:
-                self.changes_sent = True
+                self.mark_changes_sent()
             else:
                 message = (
                     f"Failed to update the customer data "
                     f"[{response.status_code} {response.reason}]."
                 )
-                self.exit_code = 6
-                logging.error(message)
+                self.log_error(6, message)
         except requests.exceptions.RequestException:
             message = (
                 "The customer data API is currently "
                 "unavailable, please try again later."
             )
-            self.exit_code = 2
-            logging.error(message)
+            self.log_error(2, message)
+
+    def mark_changes_sent(self):
+        """
+        Confirms the changes were sent to the customer data API,
+        and removes the customer data that changed from the cache.
+        """
+        self.changes_sent = True
+        if self.cache is not None:
+            self.cache.invalidate(self.customer_id)
 
     def subscription_is_valid(self):
         """
@@ -122,8 +394,7 @@ class SubscriptionManager:  # pylint: disable=too-many-instance-attributes
             "The new subscription level provided is not "
             "in the available subscriptions."
         )
-        self.exit_code = 3
-        logging.error(message)
+        self.log_error(3, message)
         return False
 
     def report_of_changes(self, action):
@@ -135,20 +406,55 @@ class SubscriptionManager:  # pylint: disable=too-many-instance-attributes
         new = self.new_subscription
         return f"{self.customer_id} -- {action} -- from {old} to {new}"
 
-    def new_subscription_level_is_free(self):
+    def transition(self):
+        """
+        Returns the Transition of this type of change from the old to
+        the new subscription, or None when it does not allow it.
+        """
+        return self.plans.transition(
+            self.command, self.old_subscription, self.new_subscription
+        )
+
+    def apply_transition(self, transition):
+        """
+        Applies the actions of the rules of the transition and
+        the new subscription to the customer data.
+        """
+        data = self.customer_data["data"]
+        update, delete = transition.actions.changes(data, get_standard_datetime())
+        for key in delete:
+            self.delete_item(key)
+        for key, value in update.items():
+            self.add_or_update_item(key, value)
+        self.add_or_update_item("SUBSCRIPTION", self.new_subscription)
+
+    def transition_is_valid(self, transition):
         """
-        Checks if the new provided subscription
-        level is the 'free' subscription.
+        Checks if the Transition looked up for this type of change allows
+        the move from the old to the new subscription, logging it otherwise.
         """
-        return "free" in self.new_subscription.lower()
+        if transition is not None:
+            return True
+
+        message = (
+            f"Attempted to {self.command} from {self.old_subscription} "
+            f"to {self.new_subscription}."
+        )
+        self.log_error(self.invalid_exit_code, message)
+        return False
 
-    def disable_features(self):
+    def apply_changes(self):
         """
-        This disables all the enabled features.
+        Validates the change and applies it to the customer
+        data that was retrieved. Returns False when invalid.
         """
-        features = self.customer_data["data"]["ENABLED_FEATURES"]
-        for feature in features.keys():
-            features[feature] = False
+        if not self.subscription_is_valid():
+            return False
+        transition = self.transition()
+        if not self.transition_is_valid(transition):
+            return False
+        self.apply_transition(transition)
+        return True
 
 
 class UpgradeSubscription(SubscriptionManager):
@@ -157,41 +463,25 @@ class UpgradeSubscription(SubscriptionManager):
     in the configuration data of a specific customer.
     """
 
+    command = "upgrade"
+    report_action = "UPGRADED"
+    invalid_exit_code = 4
+
     def upgrade_is_valid(self):
         """
         Validation to check if the new subscription
         level is greater than the old one.
         """
-        new_subscription_level = self.subscriptions[self.new_subscription]
-        old_subscription_level = self.subscriptions[self.old_subscription]
-
-        if new_subscription_level > old_subscription_level:
-            return True
-
-        message = (
-            f"Attempted to upgrade from {self.old_subscription} "
-            f"to {self.new_subscription}."
-        )
-        self.exit_code = 4
-        logging.error(message)
-        return False
+        return self.transition_is_valid(self.transition())
 
     def upgrade(self):
         """
         Upgrades the subscription level in the condiguration
-        data of a specific customer.
-        """
-        self.get_customer_data()
-        if self.customer_data:
-            if self.subscription_is_valid() and self.upgrade_is_valid():
-                self.delete_item("DOWNGRADE_DATE")
-                self.add_or_update_item("UPGRADE_DATE", get_standard_datetime())
-                self.add_or_update_item("SUBSCRIPTION", self.new_subscription)
+        data of a specific customer. Returns the report of changes.
 
-                self.send_changes_to_customer_data_api()
-                if self.changes_sent:
-                    return self.report_of_changes("UPGRADED")
-        sys.exit(self.exit_code)
+        Raises a SubscriptionManagerError carrying the exit code when it fails.
+        """
+        return self.change_subscription()
 
 
 class DowngradeSubscription(SubscriptionManager):
@@ -200,41 +490,22 @@ class DowngradeSubscription(SubscriptionManager):
     in the configuration data of a specific customer.
     """
 
+    command = "downgrade"
+    report_action = "DOWNGRADED"
+    invalid_exit_code = 5
+
     def downgrade_is_valid(self):
         """
         Validation to check if the new subscription
         level is lower than the old one.
         """
-        new_subscription_level = self.subscriptions[self.new_subscription]
-        old_subscription_level = self.subscriptions[self.old_subscription]
-
-        if new_subscription_level < old_subscription_level:
-            return True
-
-        message = (
-            f"Attempted to downgrade from {self.old_subscription} "
-            f"to {self.new_subscription}."
-        )
-        self.exit_code = 5
-        logging.error(message)
-        return False
+        return self.transition_is_valid(self.transition())
 
     def downgrade(self):
         """
         Downgrades the subscription level in the condiguration
-        data of a specific customer.
+        data of a specific customer. Returns the report of changes.
+
+        Raises a SubscriptionManagerError carrying the exit code when it fails.
         """
-        self.get_customer_data()
-        if self.customer_data:
-            if self.subscription_is_valid() and self.downgrade_is_valid():
-
-                self.delete_item("UPGRADE_DATE")
-                if self.new_subscription_level_is_free():
-                    self.disable_features()
-                self.add_or_update_item("DOWNGRADE_DATE", get_standard_datetime())
-                self.add_or_update_item("SUBSCRIPTION", self.new_subscription)
-
-                self.send_changes_to_customer_data_api()
-                if self.changes_sent:
-                    return self.report_of_changes("DOWNGRADED")
-        sys.exit(self.exit_code)
+        return self.change_subscription()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Dry run of a batch, which computes what every change would write without writing it.
+"""
+import collections
+import csv
+import json
+
+from subscription_manager_base.subscription_manager.batch import (
+    REPORT_HEADER,
+    BatchSubscriptionManager,
+    ChangeResult,
+)
+
+DiffResult = collections.namedtuple("DiffResult", ChangeResult._fields + ("diff",))
+
+DIFF_REPORT_HEADER = REPORT_HEADER + ("diff",)
+
+
+def compact_json(value):
+    """
+    Returns the given value as JSON without spaces.
+    """
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+class DryRunSubscriptionManager(BatchSubscriptionManager):
+    """
+    Runs a stream of (uuid, command, plan) rows like the batch runner, but
+    only applies the changes in memory. The customers are retrieved in
+    bulk, `prefetch_size` at a time, and nothing is ever sent back to the
+    customer data API. Every change gets a report row with its diff, the
+    JSON merge patch that would be sent, and only the counters of the
+    aggregate statistics are kept, so the memory used does not grow with
+    the number of changes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Attributes:
+        - transitions (Counter):  Changes that would apply, by old and new plan.
+        - changed_keys (Counter): Changes that would update or delete every key.
+        - exit_codes (Counter):   Changes that would fail, by exit code.
+
+        The rest of the attributes are the ones of BatchSubscriptionManager.
+        """
+        super().__init__(*args, **kwargs)
+        self.transitions = collections.Counter()
+        self.changed_keys = collections.Counter()
+        self.exit_codes = collections.Counter()
+
+    def plan_chunk(self, chunk, customers):
+        """
+        Applies the changes of a chunk in memory and returns the
+        DiffResult of every change of the chunk, in order.
+        """
+        managers, pending = self.apply_chunk(chunk, customers)
+        pending = set(pending)
+        results = []
+        for change, manager in zip(chunk, managers):
+            if manager is None:
+                exit_code = self.malformed_exit_code(change)
+                results.append(DiffResult(*change, exit_code, "", ""))
+            elif manager in pending:
+                results.append(self.diff_result(change, manager))
+            else:
+                results.append(DiffResult(*change, manager.exit_code, "", ""))
+        return results
+
+    def diff_result(self, change, manager):
+        """
+        Returns the DiffResult of a change applied in memory,
+        and counts it in the aggregate statistics.
+        """
+        diff = manager.merge_patch()["data"]
+        self.transitions[(manager.old_subscription, manager.new_subscription)] += 1
+        self.changed_keys.update(diff.keys())
+        report = manager.report_of_changes(manager.report_action)
+        return DiffResult(*change, 0, report, compact_json(diff))
+
+    def record(self, result, writer):
+        """
+        Counts the result of a change and writes it to the report.
+        """
+        if result.exit_code:
+            self.exit_codes[result.exit_code] += 1
+        super().record(result, writer)
+
+    def run(self, input_stream, report_stream):
+        """
+        Computes the diff of every change read from the input stream and
+        writes one CSV row per customer to the report stream, without
+        writing anything to the customer data API.
+        Returns the number of changes that would fail.
+        """
+        writer = csv.writer(report_stream)
+        writer.writerow(DIFF_REPORT_HEADER)
+        for chunk in self.read_chunks(input_stream):
+            for result in self.plan_chunk(chunk, self.prefetch(chunk)):
+                self.record(result, writer)
+        return self.failed
+
+    def summary(self):
+        """
+        Returns the aggregate statistics of the dry run.
+        """
+        total = self.succeeded + self.failed
+        lines = [
+            f"{total} changes -- {self.succeeded} would apply -- "
+            f"{self.failed} would fail -- nothing was written"
+        ]
+        for (old, new), count in sorted(self.transitions.items()):
+            lines.append(f"{old} -> {new}: {count}")
+        for key, count in sorted(self.changed_keys.items()):
+            lines.append(f"{key} changed: {count}")
+        for exit_code, count in sorted(self.exit_codes.items()):
+            lines.append(f"exit code {exit_code}: {count}")
+        return "\n".join(lines)
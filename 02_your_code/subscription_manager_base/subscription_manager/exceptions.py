@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Exceptions raised by the subscription manager library.
+"""
+
+
+class SubscriptionManagerError(Exception):
+    """
+    Base class of the errors of a subscription change. Every error
+    carries the exit code the cli reports for it.
+    """
+
+    exit_code = 1
+
+
+class CustomerDataNotFoundError(SubscriptionManagerError):
+    """
+    The customer data could not be retrieved, usually a wrong customer ID.
+    """
+
+    exit_code = 1
+
+
+class CustomerDataAPIUnavailableError(SubscriptionManagerError):
+    """
+    The customer data API did not answer.
+    """
+
+    exit_code = 2
+
+
+class InvalidSubscriptionError(SubscriptionManagerError):
+    """
+    The new subscription is not in the available subscriptions.
+    """
+
+    exit_code = 3
+
+
+class InvalidUpgradeError(SubscriptionManagerError):
+    """
+    The new subscription is not greater than the old one.
+    """
+
+    exit_code = 4
+
+
+class InvalidDowngradeError(SubscriptionManagerError):
+    """
+    The new subscription is not lower than the old one.
+    """
+
+    exit_code = 5
+
+
+class CustomerDataUpdateError(SubscriptionManagerError):
+    """
+    The customer data API did not apply the changes.
+    """
+
+    exit_code = 6
+
+
+ERRORS_BY_EXIT_CODE = {
+    error.exit_code: error
+    for error in (
+        CustomerDataNotFoundError,
+        CustomerDataAPIUnavailableError,
+        InvalidSubscriptionError,
+        InvalidUpgradeError,
+        InvalidDowngradeError,
+        CustomerDataUpdateError,
+    )
+}
+
+
+def error_for_exit_code(exit_code, message=""):
+    """
+    Returns the exception of the given exit code of a subscription manager,
+    the base exception keeps the exit codes without a specific one.
+    """
+    error = ERRORS_BY_EXIT_CODE.get(exit_code, SubscriptionManagerError)(message)
+    error.exit_code = exit_code
+    return error
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Jobs sent to the subscription worker through its Unix socket. This module
+only uses the standard library, so the clients of the worker start fast.
+"""
+import json
+import socket
+
+# Exit code of the client when no worker is listening on the socket,
+# the cli then applies the change in its own process.
+WORKER_UNAVAILABLE_EXIT_CODE = 75
+
+
+def write_message(stream, message):
+    """
+    Writes a message to the stream as a single JSON line.
+    """
+    stream.write(json.dumps(message).encode("utf-8") + b"\n")
+    stream.flush()
+
+
+def read_message(stream):
+    """
+    Reads a message written by write_message from the stream.
+
+    Raises ValueError when the stream ends or the message is malformed.
+    """
+    line = stream.readline()
+    if not line:
+        raise ValueError("The connection was closed before the message.")
+    return json.loads(line)
+
+
+def send_job(socket_path, command, customer_id, plan, timeout=30):
+    """
+    Sends an upgrade or downgrade job to the worker listening on the
+    socket and waits for its result, a dictionary with the exit code,
+    the report of changes and the errors logged by the job.
+
+    Raises FileNotFoundError or ConnectionRefusedError when no worker
+    is listening, and OSError or ValueError when it does not answer.
+    """
+    job = {"command": command, "customer_id": customer_id, "plan": plan}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(socket_path)
+        with client.makefile("rwb") as stream:
+            write_message(stream, job)
+            return read_message(stream)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Checkpoint journal of the changes applied by a batch run.
+"""
+import collections
+import json
+import os
+import time
+
+
+def change_key(change):
+    """
+    Returns the key of a ChangeRequest, or of a ChangeResult, in the journal.
+    """
+    return (change.customer_id, change.command, change.plan)
+
+
+class CheckpointJournal:  # pylint: disable=too-many-instance-attributes
+    """
+    Append-only log of the result of every change of a batch, one JSON
+    line per change, so a batch that stopped halfway can be run again
+    without applying twice the changes that succeeded. The failed changes
+    are run again. Every line is written to the file as soon as the change
+    ends, so it survives the crash of the process, but it is only synced
+    to the disk every `sync_every` lines or `sync_interval` seconds, so the
+    journal does not slow down the batch. A crash of the whole machine can
+    then lose the last lines, and their changes are run again.
+    """
+
+    def __init__(self, path, sync_every=100, sync_interval=1.0, clock=time.monotonic):
+        """
+        Attributes:
+        - path (str):            File of the journal, created when missing.
+        - sync_every (int):      Lines written between two syncs to the disk.
+        - sync_interval (float): Seconds after which the next line is synced anyway.
+        - clock (callable):      Returns the current time in seconds.
+        - completed (Counter):   Changes that succeeded in the previous runs,
+                                 by customer id, command and plan.
+        - unsynced (int):        Lines written since the last sync.
+        - synced_at (float):     Time of the last sync.
+        - stream (file):         The journal, open for appending.
+        """
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.clock = clock
+        self.completed = self.read_completed(path)
+        self.unsynced = 0
+        self.synced_at = clock()
+        # pylint: disable-next=consider-using-with
+        self.stream = open(path, "a", encoding="utf-8")
+        if self.ends_with_cut_line(path):
+            # The next lines must not join the line cut by a crash.
+            self.stream.write("\n")
+            self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def read_completed(path):
+        """
+        Returns the changes that succeeded according to the journal. The
+        lines cut by a crash are ignored, so their changes are run again.
+        """
+        completed = collections.Counter()
+        if not os.path.exists(path):
+            return completed
+        with open(path, encoding="utf-8") as stream:
+            for line in stream:
+                try:
+                    entry = json.loads(line)
+                    if entry["exit_code"] == 0:
+                        completed[
+                            (entry["customer_id"], entry["command"], entry["plan"])
+                        ] += 1
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return completed
+
+    @staticmethod
+    def ends_with_cut_line(path):
+        """
+        Checks if the last line of the journal was cut by a crash
+        before its newline was written.
+        """
+        with open(path, "rb") as stream:
+            if not stream.seek(0, os.SEEK_END):
+                return False
+            stream.seek(-1, os.SEEK_END)
+            return stream.read(1) != b"\n"
+
+    def skip(self, change):
+        """
+        Checks if the change succeeded in a previous run, and takes it out
+        of the completed changes, so the same change repeated in the input
+        is only skipped as many times as it succeeded.
+        """
+        key = change_key(change)
+        if self.completed[key] <= 0:
+            return False
+        self.completed[key] -= 1
+        return True
+
+    def append(self, result):
+        """
+        Writes the ChangeResult of a change at the end of the journal,
+        and syncs it to the disk when a sync is due.
+        """
+        self.stream.write(json.dumps(result._asdict()) + "\n")
+        self.stream.flush()
+        self.unsynced += 1
+        due = self.clock() - self.synced_at >= self.sync_interval
+        if self.unsynced >= self.sync_every or due:
+            self.sync()
+
+    def sync(self):
+        """
+        Syncs the lines written to the journal to the disk.
+        """
+        os.fsync(self.stream.fileno())
+        self.unsynced = 0
+        self.synced_at = self.clock()
+
+    def close(self):
+        """
+        Syncs the last lines and closes the journal.
+        """
+        if not self.stream.closed:
+            self.sync()
+            self.stream.close()
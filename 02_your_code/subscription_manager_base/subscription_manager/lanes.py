@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Scheduler that keeps the changes of every customer in order while the
+changes of different customers are applied in parallel.
+"""
+import threading
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from subscription_manager_base.subscription_manager.batch import (
+    ChangeRequest,
+    change_result,
+)
+
+
+class LaneScheduler:
+    """
+    Applies the changes of a BatchSubscriptionManager on `lanes` single
+    threaded lanes. Every customer ID is hashed to a lane, so the changes
+    of one customer are applied one after the other, in the order they
+    were submitted, and never race on the GET/PATCH cycle of the
+    SubscriptionManager, while different customers proceed concurrently.
+
+    With `coalesce`, the changes of a customer still waiting in its lane
+    are validated in order and collapsed into their net change, so the
+    customer data is written only once.
+    """
+
+    def __init__(self, batch_manager, lanes=10, coalesce=False):
+        """
+        Attributes:
+        - batch_manager (BatchSubscriptionManager): Applies every change.
+        - coalesce (bool):             Collapse the waiting changes of a customer.
+        - lanes (list):                Single threaded executors, one per lane.
+        - waiting (dict):              Changes of every customer not started yet,
+                                       with the futures of their results.
+        - lock (Lock):                 Guards the waiting changes.
+        """
+        self.batch_manager = batch_manager
+        self.coalesce = coalesce
+        self.lanes = [ThreadPoolExecutor(max_workers=1) for _ in range(lanes)]
+        self.waiting = {}
+        self.lock = threading.Lock()
+
+    def lane_of(self, customer_id):
+        """
+        Returns the lane of the given customer ID. A stable hash
+        is used so a customer always gets the same lane.
+        """
+        lane = zlib.crc32(customer_id.encode("utf-8")) % len(self.lanes)
+        return self.lanes[lane]
+
+    def submit(self, change, customer_data=None):
+        """
+        Schedules a ChangeRequest and returns the Future of its
+        ChangeResult. Malformed changes are answered at once.
+        """
+        future = Future()
+        exit_code = self.batch_manager.malformed_exit_code(change)
+        if exit_code:
+            future.set_result(change_result(change, exit_code))
+            return future
+
+        with self.lock:
+            group = self.waiting.get(change.customer_id)
+            if self.coalesce and group is not None:
+                group.append((change, future))
+                return future
+            group = [(change, future)]
+            if self.coalesce:
+                self.waiting[change.customer_id] = group
+        self.lane_of(change.customer_id).submit(self.run_group, group, customer_data)
+        return future
+
+    def run_group(self, group, customer_data=None):
+        """
+        Applies a group of changes of one customer on its lane and
+        sets the results of their futures.
+        """
+        customer_id = group[0][0].customer_id
+        with self.lock:
+            # Changes submitted from now on start a new group.
+            if self.waiting.get(customer_id) is group:
+                del self.waiting[customer_id]
+        changes = [change for change, _ in group]
+        try:
+            results = self.run_coalesced(changes, customer_data)
+        except Exception as error:  # pylint: disable=broad-except
+            for _, future in group:
+                future.set_exception(error)
+            return
+        for (_, future), result in zip(group, results):
+            future.set_result(result)
+
+    def run_coalesced(self, changes, customer_data=None):
+        """
+        Applies the given changes of one customer in order and returns
+        the ChangeResult of every one. Each change is validated against
+        the plan left by the previous one, with the exit code and report
+        it gets when applied alone, and only the net change from the
+        current plan of the customer to the plan of the last valid one
+        is sent. The changes after an invalid one start a new group.
+        """
+        if len(changes) <= 1:
+            return [
+                self.batch_manager.run_change(change, customer_data)
+                for change in changes
+            ]
+
+        manager = self.batch_manager.build_manager(changes[0], customer_data)
+        if not manager.customer_data:
+            # The plan of the customer must not come from a stale copy.
+            manager.refresh_customer_data()
+            if not manager.customer_data:
+                return [change_result(change, manager.exit_code) for change in changes]
+
+        plan = manager.old_subscription
+        reports = []
+        for change in changes:
+            step = self.batch_manager.build_manager(change)
+            step.old_subscription = plan
+            valid = step.subscription_is_valid() and step.transition_is_valid(
+                step.transition()
+            )
+            if not valid:
+                break
+            reports.append(step.report_of_changes(step.report_action))
+            plan = change.plan
+
+        applied = changes[: len(reports)]
+        results = self.send_net_change(applied, reports, manager, plan)
+        if len(applied) < len(changes):
+            results.append(change_result(changes[len(applied)], step.exit_code))
+            results.extend(self.run_coalesced(changes[len(applied) + 1 :]))
+        return results
+
+    def send_net_change(self, changes, reports, manager, plan):
+        """
+        Sends the net change of the given valid changes, from the current
+        plan of the customer of the subscription manager to the given
+        plan, and returns their ChangeResults with their own reports.
+        Nothing is sent when they end on the current plan, and they are
+        applied one by one when no single transition joins both plans.
+        """
+        if not changes:
+            return []
+        exit_code = 0
+        if plan != manager.old_subscription:
+            net = self.net_change(changes[-1].customer_id, manager, plan)
+            if net is None:
+                return [self.batch_manager.run_change(change) for change in changes]
+            exit_code = self.batch_manager.run_change(
+                net, manager.customer_data
+            ).exit_code
+        if exit_code:
+            reports = [""] * len(changes)
+        return [
+            change_result(change, exit_code, report)
+            for change, report in zip(changes, reports)
+        ]
+
+    @staticmethod
+    def net_change(customer_id, manager, plan):
+        """
+        Returns the ChangeRequest from the current plan of the customer
+        of the subscription manager to the given plan, or None when no
+        command allows it.
+        """
+        for command in ("upgrade", "downgrade"):
+            if manager.plans.transition(command, manager.old_subscription, plan):
+                return ChangeRequest(customer_id, command, plan)
+        return None
+
+    def close(self):
+        """
+        Waits for the changes of every lane and shuts the lanes down.
+        """
+        for lane in self.lanes:
+            lane.shutdown(wait=True)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Mass migration of every customer of some subscriptions to another one.
+"""
+import collections
+import itertools
+
+import requests
+from subscription_manager_base.subscription_manager.bulk import (
+    iter_customer_data,
+    send_changes_many,
+)
+from subscription_manager_base.subscription_manager.exceptions import (
+    InvalidDowngradeError,
+    InvalidSubscriptionError,
+    InvalidUpgradeError,
+)
+from subscription_manager_base.subscription_manager.plans import PlanRegistry
+from subscription_manager_base.subscription_manager.rules import FEATURES_KEY
+from subscription_manager_base.subscription_manager.utils import (
+    get_standard_datetime,
+)
+
+MigrationProgress = collections.namedtuple(
+    "MigrationProgress", ["migrated", "conflicts", "failed", "last_id"]
+)
+
+INVALID_TRANSITION_ERRORS = {
+    "upgrade": InvalidUpgradeError,
+    "downgrade": InvalidDowngradeError,
+}
+
+
+class SubscriptionMigration:  # pylint: disable=too-many-instance-attributes
+    """
+    Upgrades or downgrades every customer of the old subscriptions to the
+    new one. The customers are selected by the list endpoint of the customer
+    data API, `chunk_size` at a time, and the changes of every chunk are
+    computed column by column and sent in a single request to the bulk
+    update endpoint, each one with the version of its customer. The
+    customers already changed leave the old subscriptions, so running the
+    migration again after a crash, or after conflicts with other clients,
+    goes on with the customers left.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        customer_data_api_url,
+        subscriptions,
+        command,
+        old_subscriptions,
+        new_subscription,
+        session=None,
+        timeout=5,
+        chunk_size=500,
+        filters=None,
+    ):
+        """
+        Attributes:
+        - customer_data_api_url (str): The URL of the API used to retrieve customer data.
+        - subscriptions (Mapping):     All the vailable subscription plans, or the
+                                       PlanRegistry compiled from them.
+        - command (str):               "upgrade" or "downgrade".
+        - old_subscriptions (list):    Subscriptions of the customers to migrate.
+        - new_subscription (str):      Subscription the customers are moved to.
+        - session (Session):           Pooled HTTP session shared by all the requests.
+        - timeout (float):             Deadline in seconds of every request to the API.
+        - chunk_size (int):            Customers changed with every bulk update, up to
+                                       the CUSTOMERDATA_BULK_MAX_IDS of the API.
+        - filters (dict):              The enabled_features and disabled_features
+                                       the customers to migrate must also have.
+
+        Raises ValueError when no old subscription is given.
+        """
+        old_subscriptions = list(old_subscriptions)
+        if not old_subscriptions:
+            raise ValueError("At least one old subscription must be given.")
+        self.customer_data_api_url = customer_data_api_url
+        self.plans = PlanRegistry.from_subscriptions(subscriptions)
+        self.command = command
+        self.old_subscriptions = old_subscriptions
+        self.new_subscription = new_subscription
+        self.session = session if session is not None else requests
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.filters = filters or {}
+
+    def actions(self):
+        """
+        Returns the Actions of the migration, the same from every old
+        subscription, since they only depend on the command and the new
+        plan. Raises the SubscriptionManagerError of the exit code of the
+        subscription managers when the change is not allowed from one of
+        the old subscriptions.
+        """
+        if self.new_subscription not in self.plans:
+            raise InvalidSubscriptionError(
+                "The new subscription level provided is not "
+                "in the available subscriptions.",
+            )
+        transitions = []
+        for old in self.old_subscriptions:
+            transition = self.plans.transition(self.command, old, self.new_subscription)
+            if transition is None:
+                raise INVALID_TRANSITION_ERRORS[self.command](
+                    f"Attempted to {self.command} from {old} "
+                    f"to {self.new_subscription}.",
+                )
+            transitions.append(transition)
+        return transitions[0].actions
+
+    def chunks(self):
+        """
+        Yields the customer data of the customers to migrate,
+        in lists of `chunk_size` customers.
+
+        Raises requests.exceptions.RequestException when the API fails.
+        """
+        customers = iter_customer_data(
+            self.customer_data_api_url,
+            session=self.session,
+            timeout=self.timeout,
+            page_size=self.chunk_size,
+            subscriptions=self.old_subscriptions,
+            **self.filters,
+        )
+        while True:
+            chunk = list(itertools.islice(customers, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def changes(self, customers, actions, now):
+        """
+        Returns the key level changes of a chunk of customers, computed
+        column by column from the Actions of the migration.
+        """
+        features = [customer["data"].get(FEATURES_KEY) for customer in customers]
+        columns = actions.columns([enabled or {} for enabled in features], now)
+        for key in actions.delete_keys:
+            del columns[key]
+        changes = []
+        for index, customer in enumerate(customers):
+            update = {key: column[index] for key, column in columns.items()}
+            if features[index] is None:
+                update.pop(FEATURES_KEY, None)
+            update["SUBSCRIPTION"] = self.new_subscription
+            changes.append(
+                {
+                    "id": customer["id"],
+                    "update": update,
+                    "delete": list(actions.delete_keys),
+                    "version": customer["version"],
+                }
+            )
+        return changes
+
+    def run(self):
+        """
+        Migrates the customers a chunk at a time and yields the
+        MigrationProgress of the run after every chunk. The customers
+        updated by another client in the meantime are counted as
+        conflicts and left for the next run.
+
+        Raises the SubscriptionManagerError of the exit code of the change
+        when it is not allowed, and requests.exceptions.RequestException
+        when the API fails.
+        """
+        actions = self.actions()
+        counts = collections.Counter()
+        for chunk in self.chunks():
+            changes = self.changes(chunk, actions, get_standard_datetime())
+            results = send_changes_many(
+                changes,
+                self.customer_data_api_url,
+                session=self.session,
+                timeout=self.timeout,
+            )
+            counts.update(result["status"] for result in results)
+            yield MigrationProgress(
+                counts["updated"], counts["conflict"], counts["failed"], chunk[-1]["id"]
+            )
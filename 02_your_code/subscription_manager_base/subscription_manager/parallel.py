@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Executor that applies the changes of many customers in parallel.
+"""
+import collections
+import csv
+
+from subscription_manager_base.subscription_manager.batch import (
+    REPORT_HEADER,
+    BatchSubscriptionManager,
+)
+from subscription_manager_base.subscription_manager.lanes import LaneScheduler
+
+
+class ParallelSubscriptionManager(BatchSubscriptionManager):
+    """
+    Applies the changes of different customers on `workers` lanes that
+    share the pooled session, while the results come back in the same
+    order as the changes. The changes of one customer are applied in
+    order on the same lane and, with `coalesce`, the ones waiting for it
+    are collapsed into a single write. Every change goes through the
+    validations, rules and report strings of UpgradeSubscription and
+    DowngradeSubscription.
+
+    Can be used as a context manager to shut the pool down when done:
+
+        with ParallelSubscriptionManager(url, subscriptions, workers=8) as manager:
+            results = manager.run_changes(changes)
+    """
+
+    def __init__(self, *args, workers=10, coalesce=False, **kwargs):
+        """
+        Attributes:
+        - workers (int):                 Number of changes applied at once.
+        - max_pending (int):             Changes submitted to the lanes ahead of
+                                         the oldest one that did not finish.
+        - scheduler (LaneScheduler):     Applies the changes, one lane per worker.
+
+        The rest of the attributes are the ones of BatchSubscriptionManager.
+        """
+        super().__init__(*args, **kwargs)
+        self.workers = workers
+        self.max_pending = workers * 2
+        self.scheduler = LaneScheduler(self, lanes=workers, coalesce=coalesce)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Waits for the running changes and shuts the lanes down.
+        """
+        self.scheduler.close()
+
+    def iter_results(self, changes, customers=None):
+        """
+        Yields the ChangeResult of every change, in the order of the
+        changes, using the prefetched customer data when given. At most
+        `max_pending` changes are submitted ahead of the oldest one, so
+        the memory used does not grow with the number of changes.
+        """
+        customers = customers if customers is not None else {}
+        pending = collections.deque()
+        for change in changes:
+            # Popped so a second change of the same customer gets fresh data.
+            customer_data = customers.pop(change.customer_id, None)
+            future = self.scheduler.submit(change, customer_data)
+            pending.append(future)
+            if len(pending) >= self.max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def run_changes(self, changes):
+        """
+        Applies the given ChangeRequests and returns the list
+        of their ChangeResults, in the same order.
+        """
+        return list(self.iter_results(changes))
+
+    def run(self, input_stream, report_stream):
+        """
+        Applies every change read from the input stream and writes
+        one CSV row per customer to the report stream, in the order
+        of the input. Returns the number of failed changes.
+        """
+        writer = csv.writer(report_stream)
+        writer.writerow(REPORT_HEADER)
+        for chunk in self.read_chunks(input_stream):
+            for result in self.iter_results(chunk, self.prefetch(chunk)):
+                self.record(result, writer)
+        return self.failed
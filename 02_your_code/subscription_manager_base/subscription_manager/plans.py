@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Registry of the subscription plans and of the transitions between them.
+"""
+from collections import namedtuple
+from collections.abc import Mapping
+
+from subscription_manager_base.subscription_manager.rules import (
+    DEFAULT_RULES,
+    build_rule,
+    compile_rules,
+)
+
+Plan = namedtuple("Plan", ["name", "level", "free", "features"])
+
+Transition = namedtuple("Transition", ["command", "actions"])
+
+
+def build_plan(name, spec):
+    """
+    Builds the Plan of a subscription from its settings, either a dict
+    with its "level", whether it is "free" and the "features" it allows,
+    or only its level. Plans given only by their level are free when
+    their name says so, as the subscription manager did before plans had
+    attributes. Free plans allow no features unless they list them, and
+    the rest allow all of them.
+    """
+    if not isinstance(spec, Mapping):
+        spec = {"level": spec, "free": "free" in name.lower()}
+    free = bool(spec.get("free", False))
+    features = spec.get("features", () if free else None)
+    return Plan(
+        name,
+        spec["level"],
+        free,
+        frozenset(features) if features is not None else None,
+    )
+
+
+def build_transition(old_plan, new_plan, rules):
+    """
+    Builds the Transition from one plan to another with the actions of
+    the rules, or returns None when both plans have the same level.
+    """
+    if new_plan.level == old_plan.level:
+        return None
+    command = "upgrade" if new_plan.level > old_plan.level else "downgrade"
+    return Transition(command, compile_rules(rules, command, new_plan))
+
+
+class PlanRegistry(Mapping):
+    """
+    The subscription plans of the settings, compiled once with the matrix
+    of every allowed transition between them and the actions of its rules,
+    so a change is validated and applied with a single lookup. It is a mapping
+    of every plan name to its level, so it can be used everywhere the
+    plain SUBSCRIPTIONS dict of levels is.
+    """
+
+    def __init__(self, subscriptions, rules=DEFAULT_RULES):
+        """
+        Attributes:
+        - rules (tuple):      Rules of the side effects of the changes, built
+                              from their definitions, see build_rule.
+        - plans (dict):       Plan of every subscription name.
+        - transitions (dict): Transition of every (old, new) pair of names
+                              of plans with different levels.
+        """
+        self.rules = tuple(build_rule(rule) for rule in rules)
+        self.plans = {
+            name: build_plan(name, spec) for name, spec in subscriptions.items()
+        }
+        self.transitions = {}
+        for old_plan in self.plans.values():
+            for new_plan in self.plans.values():
+                transition = build_transition(old_plan, new_plan, self.rules)
+                if transition is not None:
+                    self.transitions[old_plan.name, new_plan.name] = transition
+
+    @classmethod
+    def from_subscriptions(cls, subscriptions):
+        """
+        Returns the given registry, or compiles the one of the given
+        subscription settings with the default rules.
+        """
+        if isinstance(subscriptions, cls):
+            return subscriptions
+        return cls(subscriptions)
+
+    def __getitem__(self, name):
+        return self.plans[name].level
+
+    def __iter__(self):
+        return iter(self.plans)
+
+    def __len__(self):
+        return len(self.plans)
+
+    def transition(self, command, old_name, new_name):
+        """
+        Returns the Transition of the given command between two plans,
+        or None when the command does not allow it.
+        """
+        transition = self.transitions.get((old_name, new_name))
+        if transition is None or transition.command != command:
+            return None
+        return transition
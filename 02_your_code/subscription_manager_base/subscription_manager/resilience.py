@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Retries with backoff and a circuit breaker for the requests to the customer data API.
+"""
+import math
+import random
+import threading
+import time
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+# Methods that can be sent again without changing the result. The PATCH and
+# POST requests are only sent again when they never reached the API.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Statuses of an API that is overloaded or restarting.
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+def overloaded(response):
+    """
+    Checks if a response of the API says it is failing, or asks
+    the client to slow down with a 429 Too Many Requests.
+    """
+    return response.status_code >= 500 or response.status_code == 429
+
+
+def never_sent(error):
+    """
+    Checks if a request failed before reaching the API,
+    because the connection could not be opened.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class RetryPolicy:
+    """
+    Decides which failed requests are sent again, and how long to wait
+    before. The delays grow exponentially with every attempt, up to
+    `max_backoff`, and are drawn at random below that limit ("full
+    jitter"), so the clients that failed together do not retry together.
+    """
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=10.0, rand=random.random):
+        """
+        Attributes:
+        - retries (int):       Times a request is sent again after the first one.
+        - backoff (float):     Limit in seconds of the delay before the first retry,
+                               doubled for every next one.
+        - max_backoff (float): Maximum delay in seconds before a retry.
+        - rand (callable):     Returns a random float between 0 and 1.
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rand = rand
+
+    def delay(self, attempt):
+        """
+        Returns the seconds to wait before sending again
+        a request that failed the given attempt, from 0.
+        """
+        return self.rand() * min(self.max_backoff, self.backoff * 2**attempt)
+
+    def max_delay(self):
+        """
+        Returns the longest time in seconds spent
+        waiting between the attempts of a request.
+        """
+        return sum(
+            min(self.max_backoff, self.backoff * 2**attempt)
+            for attempt in range(self.retries)
+        )
+
+    def should_retry(self, method, attempt, error=None, response=None):
+        """
+        Checks if a request that failed the given attempt, with an
+        error or with a response, must be sent again.
+        """
+        if attempt >= self.retries:
+            return False
+        if error is not None and never_sent(error):
+            return True
+        if method.upper() not in IDEMPOTENT_METHODS:
+            return False
+        if error is not None:
+            return isinstance(
+                error,
+                (requests.exceptions.ConnectionError, requests.exceptions.Timeout),
+            )
+        return response.status_code in RETRY_STATUSES
+
+
+class CircuitBreaker:  # pylint: disable=too-many-instance-attributes
+    """
+    Stops every request sent through it for `reset_timeout` seconds once
+    `failure_threshold` requests in a row failed, so an API that is down
+    is not flooded by the retries of all the threads. After the pause,
+    a single request is let through to probe the API: the rest wait for
+    it, and go on when it succeeds or pause again when it fails.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        """
+        Attributes:
+        - failure_threshold (int): Failures in a row that open the circuit.
+        - reset_timeout (float):   Seconds the requests are paused once open.
+        - clock (callable):        Returns the current time in seconds.
+        - state (str):             Closed, open or half-open.
+        - failures (int):          Failures in a row since the last success.
+        - opened_at (float):       Time the circuit was last opened, or probed.
+        - opens (int):             Times the circuit was opened.
+        - paused (float):          Seconds the requests spent waiting, added up.
+        - condition (Condition):   Wakes up the waiting requests.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.paused = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Waits until a request can be sent: at once while the circuit is
+        closed, and after the pause, or the probe, while it is open.
+        """
+        started = self.clock()
+        with self.condition:
+            while self.state != self.CLOSED:
+                remaining = self.opened_at + self.reset_timeout - self.clock()
+                if remaining <= 0:
+                    # Also replaces a probe that did not end in time.
+                    self.state = self.HALF_OPEN
+                    self.opened_at = self.clock()
+                    break
+                self.condition.wait(remaining)
+            self.paused += self.clock() - started
+
+    def record(self, success):
+        """
+        Counts the outcome of a request, which closes the circuit when it
+        succeeded and opens it after too many failures, or a failed probe.
+        """
+        with self.condition:
+            if success:
+                self.failures = 0
+                self.state = self.CLOSED
+            else:
+                self.failures += 1
+                probe = self.state == self.HALF_OPEN
+                tripped = self.failures >= self.failure_threshold
+                if probe or (tripped and self.state == self.CLOSED):
+                    self.state = self.OPEN
+                    self.opened_at = self.clock()
+                    self.opens += 1
+            self.condition.notify_all()
+
+
+class ResilientSession(
+    requests.Session
+):  # pylint: disable=too-many-instance-attributes
+    """
+    A requests.Session that sends the failed requests again following
+    its RetryPolicy, and through a CircuitBreaker when one is given. Only
+    the last failure of a request reaches the caller. The retries, the
+    requests that failed anyway and the circuit openings are counted.
+    Every attempt can also wait for a token of a TokenBucket and for a
+    slot of an AdaptiveConcurrency, shared by all the threads of the
+    session, which learns from the latency and the status of the answer.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        retry_policy=None,
+        breaker=None,
+        sleep=time.sleep,
+        rate_limiter=None,
+        concurrency=None,
+        max_deadline=60.0,
+    ):
+        """
+        Attributes:
+        - retry_policy (RetryPolicy):  Decides the retries, the default one when not given.
+        - breaker (CircuitBreaker):    Pauses the requests while the API is down.
+        - sleep (callable):            Waits the given seconds before a retry.
+        - rate_limiter (TokenBucket):  Limits the requests sent per second.
+        - concurrency (AdaptiveConcurrency): Limits the requests in flight at once.
+        - max_deadline (float):        Longest deadline in seconds of a request.
+        - retries (int):               Number of requests sent again.
+        - gave_up (int):               Number of requests that failed after the retries.
+        """
+        super().__init__()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.breaker = breaker
+        self.sleep = sleep
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.max_deadline = max_deadline
+        self.retries = 0
+        self.gave_up = 0
+        self.lock = threading.Lock()
+
+    def request(self, method, url, *args, **kwargs):  # pylint: disable=arguments-differ
+        attempt = 0
+        while True:
+            try:
+                response = self.send_attempt(method, url, *args, **kwargs)
+            except requests.exceptions.RequestException as error:
+                if not self.retry_policy.should_retry(method, attempt, error=error):
+                    self.count("gave_up")
+                    raise
+            else:
+                if not self.retry_policy.should_retry(
+                    method, attempt, response=response
+                ):
+                    return response
+            self.count("retries")
+            self.sleep(self.retry_policy.delay(attempt))
+            attempt += 1
+
+    def send_attempt(self, method, url, *args, **kwargs):
+        """
+        Sends a request once, after the circuit breaker, the rate limiter
+        and the concurrency limit let it through, and counts its outcome.
+        """
+        if self.breaker is not None:
+            self.breaker.acquire()
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        if self.concurrency is not None:
+            self.concurrency.acquire()
+        started = time.monotonic()
+        success, overload = False, True
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            success, overload = response.status_code < 500, overloaded(response)
+            return response
+        finally:
+            # Any error counts as a failure and releases the slot.
+            self.record(success, time.monotonic() - started, overload)
+
+    def record(self, success, latency=0.0, overload=False):
+        """
+        Counts the outcome of a request in the circuit breaker,
+        and its latency in the concurrency limit.
+        """
+        if self.breaker is not None:
+            self.breaker.record(success)
+        if self.concurrency is not None:
+            self.concurrency.release(latency, overload)
+
+    def count(self, name):
+        """
+        Adds one to the counter of the given name.
+        """
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def deadline(self, timeout, callers=1):
+        """
+        Returns the longest time in seconds a request with the given
+        timeout can take, with its retries and a pause of the circuit,
+        when up to `callers` threads send requests through the session,
+        and every attempt may wait behind theirs for a token of the rate
+        limiter and for a slot of the concurrency limit, up to
+        `max_deadline` so a change is never waited for minutes.
+        """
+        attempts = self.retry_policy.retries + 1
+        wait = timeout
+        if self.rate_limiter is not None:
+            wait += callers / self.rate_limiter.rate
+        if self.concurrency is not None:
+            wait += timeout * math.ceil(callers / self.concurrency.minimum - 1)
+        deadline = wait * attempts + self.retry_policy.max_delay()
+        if self.breaker is not None:
+            deadline += self.breaker.reset_timeout
+        return min(deadline, self.max_deadline)
+
+    def metrics(self):
+        """
+        Returns the retry, circuit breaker, rate limiter
+        and concurrency limit counters of the session.
+        """
+        breaker = self.breaker
+        limiter = self.rate_limiter
+        concurrency = self.concurrency
+        return {
+            "retries": self.retries,
+            "gave_up": self.gave_up,
+            "breaker_state": breaker.state if breaker else CircuitBreaker.CLOSED,
+            "breaker_opens": breaker.opens if breaker else 0,
+            "breaker_paused": breaker.paused if breaker else 0.0,
+            "throttled": limiter.throttled if limiter else 0.0,
+            "concurrency_limit": int(concurrency.limit) if concurrency else None,
+            "concurrency_decreases": concurrency.decreases if concurrency else 0,
+        }
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Declarative rules of the side effects of the subscription changes.
+"""
+from collections import namedtuple
+
+Rule = namedtuple("Rule", ["command", "plans", "delete", "stamp", "restrict_features"])
+
+FEATURES_KEY = "ENABLED_FEATURES"
+
+# The side effects described in RULES.md.
+DEFAULT_RULES = (
+    {"command": "upgrade", "delete": ["DOWNGRADE_DATE"], "stamp": ["UPGRADE_DATE"]},
+    {"command": "downgrade", "delete": ["UPGRADE_DATE"], "stamp": ["DOWNGRADE_DATE"]},
+    {"command": "downgrade", "restrict_features": True},
+)
+
+
+def build_rule(spec):
+    """
+    Builds a Rule from its definition, a dict with the optional keys:
+    - command (str):           "upgrade" or "downgrade", every change when missing.
+    - plans (list):            Names of the new plans it applies to, all when missing.
+    - delete (list):           Keys removed from the customer data.
+    - stamp (list):            Keys set to the datetime of the change.
+    - restrict_features (bool): Turn off the enabled features that are not in
+                               the features of the new plan.
+    """
+    plans = spec.get("plans")
+    return Rule(
+        spec.get("command"),
+        frozenset(plans) if plans is not None else None,
+        tuple(spec.get("delete", ())),
+        tuple(spec.get("stamp", ())),
+        bool(spec.get("restrict_features", False)),
+    )
+
+
+def restrict_features(features, allowed):
+    """
+    Returns a copy of the enabled features where the
+    ones that are not allowed are turned off.
+    """
+    return {name: value and name in allowed for name, value in features.items()}
+
+
+class Actions:
+    """
+    The side effects of the rules that match one transition, compiled into
+    the keys every customer gets deleted or stamped, the same for all of
+    them, and the features allowed by the new plan. They are applied to a
+    single customer data or, column by column, to a batch of customers.
+    """
+
+    def __init__(self, delete_keys=(), stamp_keys=(), allowed_features=None):
+        """
+        Attributes:
+        - delete_keys (tuple):          Keys removed from the customer data.
+        - stamp_keys (tuple):           Keys set to the datetime of the change.
+        - allowed_features (frozenset): Features kept on, None keeps all of them.
+        """
+        self.delete_keys = delete_keys
+        self.stamp_keys = stamp_keys
+        self.allowed_features = allowed_features
+
+    def changes(self, data, now):
+        """
+        Returns the keys updated, with their new values, and the keys
+        deleted by the actions on the data of a single customer.
+        """
+        update = dict.fromkeys(self.stamp_keys, now)
+        if self.allowed_features is not None and FEATURES_KEY in data:
+            update[FEATURES_KEY] = restrict_features(
+                data[FEATURES_KEY], self.allowed_features
+            )
+        delete = [key for key in self.delete_keys if key in data]
+        return update, delete
+
+    def columns(self, features, now):
+        """
+        Returns the merge patch of a batch of customers column by column,
+        where the deleted keys are null, given the column of their enabled
+        features. Only the features are computed for every customer.
+        """
+        size = len(features)
+        columns = {key: [None] * size for key in self.delete_keys}
+        columns.update({key: [now] * size for key in self.stamp_keys})
+        if self.allowed_features is not None:
+            columns[FEATURES_KEY] = [
+                restrict_features(enabled, self.allowed_features)
+                for enabled in features
+            ]
+        return columns
+
+
+def compile_rules(rules, command, plan):
+    """
+    Merges the rules that match a command to the given new Plan
+    into the Actions of the transition.
+    """
+    matching = [
+        rule
+        for rule in rules
+        if rule.command in (None, command)
+        and (rule.plans is None or plan.name in rule.plans)
+    ]
+    stamp_keys = tuple(key for rule in matching for key in rule.stamp)
+    delete_keys = tuple(
+        key for rule in matching for key in rule.delete if key not in stamp_keys
+    )
+    restricted = any(rule.restrict_features for rule in matching)
+    allowed_features = plan.features if restricted else None
+    return Actions(delete_keys, stamp_keys, allowed_features)
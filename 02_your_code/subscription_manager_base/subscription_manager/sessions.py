@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Connection pooled HTTP sessions for the customer data API.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from subscription_manager_base.subscription_manager.resilience import (
+    ResilientSession,
+)
+
+
+def build_session(  # pylint: disable=too-many-arguments
+    pool_connections=10,
+    pool_maxsize=10,
+    pool_block=False,
+    keep_alive=True,
+    retry_policy=None,
+    breaker=None,
+    rate_limiter=None,
+    concurrency=None,
+):
+    """
+    Returns a requests.Session whose connections are kept alive and
+    reused between the calls made to the customer data API. With a
+    retry policy, a circuit breaker, a rate limiter or a concurrency
+    limit, a ResilientSession is returned.
+
+    Arguments:
+    - pool_connections (int): Number of per host connection pools to keep.
+    - pool_maxsize (int):     Maximum number of connections kept per host.
+    - pool_block (bool):      Wait for a free connection instead of opening
+                              a new one when the per host limit is reached.
+    - keep_alive (bool):      Keep the connections open between requests.
+    - retry_policy (RetryPolicy):  Sends again the requests that failed.
+    - breaker (CircuitBreaker):    Pauses all the requests while the API is down.
+    - rate_limiter (TokenBucket):  Limits the requests sent per second.
+    - concurrency (AdaptiveConcurrency): Limits the requests in flight at once,
+                                   following the health of the API.
+    """
+    resilience = (retry_policy, breaker, rate_limiter, concurrency)
+    if any(option is not None for option in resilience):
+        session = ResilientSession(
+            retry_policy,
+            breaker,
+            rate_limiter=rate_limiter,
+            concurrency=concurrency,
+        )
+    else:
+        session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def connection_stats(session):
+    """
+    Returns the number of requests sent and the number of
+    connections opened by the pools of the given session.
+    """
+    requests_sent = 0
+    connections_opened = 0
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            requests_sent += pool.num_requests
+            connections_opened += pool.num_connections
+    return requests_sent, connections_opened
+
+
+def connection_reuse_ratio(session):
+    """
+    Returns the fraction of requests of the session that were
+    sent over an already open connection.
+    """
+    requests_sent, connections_opened = connection_stats(session)
+    if not requests_sent:
+        return 0.0
+    return max(requests_sent - connections_opened, 0) / requests_sent
@@ -5,6 +5,9 @@ Test the DowngradeSubscription class from the core.py file.
 from unittest import TestCase, mock
 
 from subscription_manager_base.subscription_manager.core import DowngradeSubscription
+from subscription_manager_base.subscription_manager.exceptions import (
+    SubscriptionManagerError,
+)
 from subscription_manager_base.subscription_manager.tests.mocks.mock_data import (
     mock_customer_data,
     mock_manager_arguments,
@@ -104,7 +107,7 @@ class DowngradeSubscriptionTestCase(TestCase):
         downgrade_manager = self.downgrade_subscription_manager
         downgrade_manager.new_subscription = "free"
 
-        kwargs = {"get": self.mock_response, "put": self.mock_response}
+        kwargs = {"get": self.mock_response, "patch": self.mock_response}
         with mock.patch.multiple("requests", **kwargs):
             downgrade_manager.downgrade()
 
@@ -121,7 +124,7 @@ class DowngradeSubscriptionTestCase(TestCase):
         downgrade_manager = self.downgrade_subscription_manager
         downgrade_manager.new_subscription = "free"
 
-        kwargs = {"get": self.mock_response, "put": self.mock_response}
+        kwargs = {"get": self.mock_response, "patch": self.mock_response}
         with mock.patch.multiple("requests", **kwargs):
             downgrade_manager.downgrade()
 
@@ -136,7 +139,7 @@ class DowngradeSubscriptionTestCase(TestCase):
         downgrade_manager = self.downgrade_subscription_manager
         downgrade_manager.new_subscription = "free"
 
-        kwargs = {"get": self.mock_response, "put": self.mock_response}
+        kwargs = {"get": self.mock_response, "patch": self.mock_response}
         with mock.patch.multiple("requests", **kwargs):
             downgrade_manager.downgrade()
 
@@ -151,7 +154,7 @@ class DowngradeSubscriptionTestCase(TestCase):
         downgrade_manager = self.downgrade_subscription_manager
         downgrade_manager.new_subscription = "free"
 
-        kwargs = {"get": self.mock_response, "put": self.mock_response}
+        kwargs = {"get": self.mock_response, "patch": self.mock_response}
         with mock.patch.multiple("requests", **kwargs):
             downgrade_manager.downgrade()
 
@@ -166,7 +169,7 @@ class DowngradeSubscriptionTestCase(TestCase):
         downgrade_manager = self.downgrade_subscription_manager
         downgrade_manager.new_subscription = "free"
 
-        kwargs = {"get": self.mock_response, "put": self.mock_response}
+        kwargs = {"get": self.mock_response, "patch": self.mock_response}
         with mock.patch.multiple("requests", **kwargs):
             report = downgrade_manager.downgrade()
 
@@ -177,13 +180,13 @@ class DowngradeSubscriptionTestCase(TestCase):
         )
         self.assertEqual(report, expected_message)
 
-    def test_downgrade_method_calls_system_exit_when_downgrade_fails(self):
+    def test_downgrade_method_raises_an_error_when_downgrade_fails(self):
         """
-        Tests if the downgrade method calls the 'sys.exit()'
-        method when the downgrade fails.
+        Tests if the downgrade method raises a SubscriptionManagerError
+        carrying a non zero exit code when the downgrade fails.
         """
         downgrade_manager = self.downgrade_subscription_manager
-        with self.assertRaises(SystemExit) as c_manager:
+        with self.assertRaises(SubscriptionManagerError) as c_manager:
             downgrade_manager.downgrade()
 
-        self.assertTrue(c_manager.exception.code != 0)
+        self.assertTrue(c_manager.exception.exit_code != 0)
@@ -2,8 +2,11 @@
 """
 Test the SubscriptionManager class from the core.py file.
 """
+import copy
+import json
 from unittest import TestCase, mock
 
+import requests
 from subscription_manager_base.subscription_manager.core import SubscriptionManager
 from subscription_manager_base.subscription_manager.tests.mocks.mock_data import (
     mock_customer_data,
@@ -65,6 +68,47 @@ class TestSubscriptionManager(TestCase):  # pylint: disable=R0904
         manager = SubscriptionManager("", "", "", subscriptions)
         self.assertEqual(manager.subscriptions, subscriptions)
 
+    def test_constructor_takes_the_session_argument(self):
+        """
+        Tests if the constructor of the subscription manager takes
+        a session argument and uses it to reach the customer data API.
+        """
+        session = mock.MagicMock()
+        session.get.return_value = MockResponse(
+            status_code=200, response_data=self.testing_customer_data
+        )
+        manager = SubscriptionManager(**mock_manager_arguments, session=session)
+        manager.get_customer_data()
+
+        session.get.assert_called_once_with(manager.get_url(), timeout=5)
+
+    def test_constructor_takes_the_timeout_argument(self):
+        """
+        Tests if the constructor of the subscription manager takes a
+        timeout argument used as the deadline of the requests.
+        """
+        session = mock.MagicMock()
+        session.patch.return_value = MockResponse(status_code=200)
+        manager = SubscriptionManager(
+            **mock_manager_arguments, session=session, timeout=1.5
+        )
+        manager.send_changes_to_customer_data_api()
+
+        session.patch.assert_called_once_with(
+            manager.get_url(),
+            data=json.dumps(manager.merge_patch()),
+            headers={"Content-Type": "application/merge-patch+json"},
+            timeout=1.5,
+        )
+
+    def test_default_session_is_the_requests_module(self):
+        """
+        Tests if the subscription manager uses the requests module
+        when no session is given.
+        """
+        instance = SubscriptionManager(**mock_manager_arguments)
+        self.assertIs(instance.session, requests)
+
     def test_initial_attributes_of_subscription_manager_instance(self):
         """
         Tests if the SubscriptionManager instance is initialized
@@ -204,6 +248,20 @@ class TestSubscriptionManager(TestCase):  # pylint: disable=R0904
         self.assertTrue(hasattr(manager, "old_subscription"))
         self.assertEqual(manager.old_subscription, "basic")
 
+    def test_use_customer_data_saves_customer_data_and_old_subscription(self):
+        """
+        Tests if the use_customer_data method saves customer data that was
+        already retrieved and its subscription as the old subscription.
+        """
+        manager = self.testing_subscription_manager
+        manager.use_customer_data(self.testing_customer_data)
+
+        self.assertEqual(manager.customer_data, self.testing_customer_data)
+        self.assertEqual(
+            manager.old_subscription,
+            self.testing_customer_data["data"]["SUBSCRIPTION"],
+        )
+
     def test_delete_item_deletes_specific_item_from_customer_data(self):
         """
         Tests if the delete_item method deletes a specific
@@ -254,7 +312,7 @@ class TestSubscriptionManager(TestCase):  # pylint: disable=R0904
         reason = "Bad Request"
 
         mock_response = MockResponse(status_code, reason)
-        use_mock_response = mock.patch("requests.put", return_value=mock_response)
+        use_mock_response = mock.patch("requests.patch", return_value=mock_response)
 
         with use_mock_response:
             with self.assertLogs() as logs_captured:
@@ -276,7 +334,7 @@ class TestSubscriptionManager(TestCase):  # pylint: disable=R0904
         reason = "Bad Request"
 
         mock_response = MockResponse(status_code, reason)
-        use_mock_response = mock.patch("requests.put", return_value=mock_response)
+        use_mock_response = mock.patch("requests.patch", return_value=mock_response)
 
         manager = self.testing_subscription_manager
         manager.exit_code = 0
@@ -298,7 +356,7 @@ class TestSubscriptionManager(TestCase):  # pylint: disable=R0904
         manager = self.testing_subscription_manager
 
         mock_response = MockResponse(status_code, reason)
-        use_mock_response = mock.patch("requests.put", return_value=mock_response)
+        use_mock_response = mock.patch("requests.patch", return_value=mock_response)
 
         with use_mock_response:
             manager.send_changes_to_customer_data_api()
@@ -333,6 +391,79 @@ class TestSubscriptionManager(TestCase):  # pylint: disable=R0904
 
         self.assertEqual(manager.exit_code, 2)
 
+    def test_pending_changes_returns_the_changed_keys_of_customer_data(self):
+        """
+        Tests if the pending_changes method returns the keys added,
+        updated or deleted from the customer data, and only them.
+        """
+        manager = self.testing_subscription_manager
+        manager.use_customer_data(copy.deepcopy(self.testing_customer_data))
+        manager.customer_data["data"]["DOWNGRADE_DATE"] = "2020-01-10T09:25:00Z"
+
+        manager.delete_item("DOWNGRADE_DATE")
+        manager.delete_item("NOT_IN_CUSTOMER_DATA")
+        manager.add_or_update_item("SUBSCRIPTION", "premium")
+        manager.add_or_update_item("ENABLED_FEATURES", {})
+
+        pending_changes = manager.pending_changes()
+        self.assertEqual(pending_changes["id"], manager.customer_id)
+        self.assertEqual(
+            sorted(pending_changes["update"]), ["ENABLED_FEATURES", "SUBSCRIPTION"]
+        )
+        self.assertEqual(pending_changes["delete"], ["DOWNGRADE_DATE"])
+
+    def test_send_changes_to_customer_data_api_sends_the_etag(self):
+        """
+        Tests if the changes are only sent for the version of the
+        customer data they were applied to, with the If-Match header.
+        """
+        session = mock.MagicMock()
+        session.patch.return_value = MockResponse(status_code=200)
+        manager = SubscriptionManager(**mock_manager_arguments, session=session)
+        manager.use_customer_data({"data": {"SUBSCRIPTION": "basic"}, "version": 7})
+
+        manager.send_changes_to_customer_data_api()
+
+        headers = session.patch.call_args.kwargs["headers"]
+        self.assertEqual(headers["If-Match"], '"7"')
+
+    def test_send_changes_to_customer_data_api_stops_retrying_conflicts(self):
+        """
+        Tests if the exit code is 6 when the customer data keeps
+        changing after `conflict_retries` attempts.
+        """
+        session = mock.MagicMock()
+        session.get.return_value = MockResponse(200, response_data=mock_customer_data)
+        session.patch.return_value = MockResponse(412, "Precondition Failed")
+        manager = SubscriptionManager(
+            **mock_manager_arguments, session=session, conflict_retries=2
+        )
+        manager.apply_changes = mock.MagicMock(return_value=True)
+
+        with self.assertLogs():
+            manager.send_changes_to_customer_data_api()
+
+        self.assertEqual(manager.exit_code, 6)
+        self.assertEqual(session.patch.call_count, 3)
+        self.assertEqual(session.get.call_count, 2)
+
+    def test_merge_patch_sets_the_deleted_keys_to_null(self):
+        """
+        Tests if the merge_patch method returns a JSON merge patch with
+        the updated keys and the deleted keys set to None, and only them.
+        """
+        manager = self.testing_subscription_manager
+        manager.use_customer_data(copy.deepcopy(self.testing_customer_data))
+        manager.customer_data["data"]["DOWNGRADE_DATE"] = "2020-01-10T09:25:00Z"
+
+        manager.delete_item("DOWNGRADE_DATE")
+        manager.add_or_update_item("SUBSCRIPTION", "premium")
+
+        self.assertEqual(
+            manager.merge_patch(),
+            {"data": {"DOWNGRADE_DATE": None, "SUBSCRIPTION": "premium"}},
+        )
+
     def test_subscription_is_valid_returns_true(self):
         """
         Tests if the subscription_is_valid method returns
@@ -392,36 +523,3 @@ class TestSubscriptionManager(TestCase):  # pylint: disable=R0904
         manager.old_subscription = "free"
         manager.new_subscription = "premium"
         self.assertEqual(str, type(manager.report_of_changes("ACTION_DONE")))
-
-    def test_new_subscription_level_is_free_returns_true(self):
-        """
-        Tests if the new_subscription_level_is_free method returns
-        True when the new_subscription attribute is equal to 'free'.
-        """
-        manager = self.testing_subscription_manager
-        manager.new_subscription = "free"
-        self.assertTrue(manager.new_subscription_level_is_free())
-
-    def test_new_subscription_level_is_free_returns_false(self):
-        """
-        Tests if the new_subscription_level_is_free method returns
-        True when the new_subscription attribute is not equal to 'free'.
-        """
-        manager = self.testing_subscription_manager
-        manager.new_subscription = "premium"
-        self.assertFalse(manager.new_subscription_level_is_free())
-
-    def test_disable_features_changes_all_enabled_features_in_customer_data_to_false(
-        self,
-    ):
-        """
-        Tests if the disable_features method changes all the enabled_features
-        in the customer data to False.
-        """
-        manager = self.testing_subscription_manager
-        manager.customer_data = self.testing_customer_data
-
-        manager.disable_features()
-        features = manager.customer_data["data"]["ENABLED_FEATURES"]
-        for feat in features.values():
-            self.assertFalse(feat)
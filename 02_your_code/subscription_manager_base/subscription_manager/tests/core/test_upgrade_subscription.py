@@ -2,9 +2,14 @@
 """
 Test the UpgradeSubscription class from the core.py file.
 """
+import copy
 from unittest import TestCase, mock
 
 from subscription_manager_base.subscription_manager.core import UpgradeSubscription
+from subscription_manager_base.subscription_manager.exceptions import (
+    InvalidUpgradeError,
+    SubscriptionManagerError,
+)
 from subscription_manager_base.subscription_manager.tests.mocks.mock_data import (
     mock_customer_data,
     mock_manager_arguments,
@@ -104,7 +109,7 @@ class UpgradeSubscriptionTestCase(TestCase):
         upgrade_manager = self.upgrade_subscription_manager
         upgrade_manager.new_subscription = "premium"
 
-        kwargs = {"get": self.mock_response, "put": self.mock_response}
+        kwargs = {"get": self.mock_response, "patch": self.mock_response}
         with mock.patch.multiple("requests", **kwargs):
             upgrade_manager.upgrade()
 
@@ -121,7 +126,7 @@ class UpgradeSubscriptionTestCase(TestCase):
         upgrade_manager = self.upgrade_subscription_manager
         upgrade_manager.new_subscription = "premium"
 
-        kwargs = {"get": self.mock_response, "put": self.mock_response}
+        kwargs = {"get": self.mock_response, "patch": self.mock_response}
         with mock.patch.multiple("requests", **kwargs):
             upgrade_manager.upgrade()
 
@@ -135,7 +140,7 @@ class UpgradeSubscriptionTestCase(TestCase):
         upgrade_manager = self.upgrade_subscription_manager
         upgrade_manager.new_subscription = "premium"
 
-        kwargs = {"get": self.mock_response, "put": self.mock_response}
+        kwargs = {"get": self.mock_response, "patch": self.mock_response}
         with mock.patch.multiple("requests", **kwargs):
             upgrade_manager.upgrade()
 
@@ -150,7 +155,7 @@ class UpgradeSubscriptionTestCase(TestCase):
         upgrade_manager = self.upgrade_subscription_manager
         upgrade_manager.new_subscription = "premium"
 
-        kwargs = {"get": self.mock_response, "put": self.mock_response}
+        kwargs = {"get": self.mock_response, "patch": self.mock_response}
         with mock.patch.multiple("requests", **kwargs):
             upgrade_manager.upgrade()
 
@@ -165,7 +170,7 @@ class UpgradeSubscriptionTestCase(TestCase):
         upgrade_manager = self.upgrade_subscription_manager
         upgrade_manager.new_subscription = "premium"
 
-        kwargs = {"get": self.mock_response, "put": self.mock_response}
+        kwargs = {"get": self.mock_response, "patch": self.mock_response}
         with mock.patch.multiple("requests", **kwargs):
             report = upgrade_manager.upgrade()
 
@@ -176,13 +181,135 @@ class UpgradeSubscriptionTestCase(TestCase):
         )
         self.assertEqual(report, expected_message)
 
-    def test_upgrade_method_calls_system_exit_when_upgrade_fails(self):
+    def test_upgrade_method_raises_an_error_when_upgrade_fails(self):
         """
-        Tests if the upgrade method calls the 'sys.exit()'
-        method when the upgrade fails.
+        Tests if the upgrade method raises a SubscriptionManagerError
+        carrying a non zero exit code when the upgrade fails.
         """
         upgrade_manager = self.upgrade_subscription_manager
-        with self.assertRaises(SystemExit) as c_manager:
+        with self.assertRaises(SubscriptionManagerError) as c_manager:
+            upgrade_manager.upgrade()
+
+        self.assertTrue(c_manager.exception.exit_code != 0)
+
+    def test_upgrade_method_applies_the_upgrade_again_on_conflict(self):
+        """
+        Tests if the upgrade is validated and applied again to the new
+        customer data when another client updated it in the meantime.
+        """
+        first_version = copy.deepcopy(mock_customer_data)
+        first_version["data"]["SUBSCRIPTION"] = "free"
+        second_version = copy.deepcopy(mock_customer_data)
+        session = mock.MagicMock()
+        session.get.side_effect = [
+            MockResponse(200, response_data=first_version, headers={"ETag": '"1"'}),
+            MockResponse(200, response_data=second_version, headers={"ETag": '"2"'}),
+        ]
+        session.patch.side_effect = [
+            MockResponse(412, "Precondition Failed"),
+            MockResponse(200),
+        ]
+        upgrade_manager = UpgradeSubscription(**mock_manager_arguments, session=session)
+        upgrade_manager.new_subscription = "premium"
+
+        report = upgrade_manager.upgrade()
+
+        retry = session.patch.call_args_list[1]
+        self.assertTrue(report.endswith("-- UPGRADED -- from basic to premium"))
+        self.assertEqual(retry.kwargs["headers"]["If-Match"], '"2"')
+
+    def test_upgrade_method_raises_when_the_upgrade_is_no_longer_valid(self):
+        """
+        Tests if the upgrade stops with the error of the validation
+        when the new customer data, retrieved after a conflict, does not
+        allow the upgrade anymore.
+        """
+        upgraded = copy.deepcopy(mock_customer_data)
+        upgraded["data"]["SUBSCRIPTION"] = "premium"
+        session = mock.MagicMock()
+        session.get.side_effect = [
+            self.mock_response.return_value,
+            MockResponse(200, response_data=upgraded),
+        ]
+        session.patch.return_value = MockResponse(412, "Precondition Failed")
+        upgrade_manager = UpgradeSubscription(**mock_manager_arguments, session=session)
+        upgrade_manager.new_subscription = "premium"
+
+        with self.assertRaises(InvalidUpgradeError) as c_manager:
             upgrade_manager.upgrade()
 
-        self.assertTrue(c_manager.exception.code != 0)
+        self.assertEqual(c_manager.exception.exit_code, 4)
+        session.patch.assert_called_once()
+
+    def test_upgrade_method_uses_the_transition_action_of_the_api(self):
+        """
+        Tests if the upgrade is sent to the transition action of the
+        API in a single request when server transitions are enabled.
+        """
+        session = mock.MagicMock()
+        session.post.return_value = MockResponse(
+            200,
+            response_data={"report": "UPGRADED", "old_subscription": "basic"},
+        )
+        upgrade_manager = UpgradeSubscription(
+            **mock_manager_arguments, session=session, server_transitions=True
+        )
+        upgrade_manager.new_subscription = "premium"
+
+        report = upgrade_manager.upgrade()
+
+        (url,) = session.post.call_args.args
+        self.assertEqual(report, "UPGRADED")
+        self.assertEqual(url, f"{upgrade_manager.get_url()}transition/")
+        self.assertEqual(
+            session.post.call_args.kwargs["json"],
+            {"command": "upgrade", "subscription": "premium"},
+        )
+        self.assertEqual(upgrade_manager.old_subscription, "basic")
+        self.assertTrue(upgrade_manager.changes_sent)
+        session.get.assert_not_called()
+        session.patch.assert_not_called()
+
+    def test_upgrade_method_raises_the_exit_code_of_the_transition_action(self):
+        """
+        Tests if a change rejected by the transition action raises the
+        error of its exit code, and an unknown customer the one of exit code 1.
+        """
+        session = mock.MagicMock()
+        session.post.side_effect = [
+            MockResponse(409, response_data={"detail": "No.", "exit_code": 4}),
+            MockResponse(404, headers={"Content-Type": "application/json"}),
+        ]
+        upgrade_manager = UpgradeSubscription(
+            **mock_manager_arguments, session=session, server_transitions=True
+        )
+
+        with self.assertRaises(InvalidUpgradeError):
+            upgrade_manager.upgrade()
+        with self.assertRaises(SubscriptionManagerError) as c_manager:
+            upgrade_manager.upgrade()
+
+        self.assertEqual(c_manager.exception.exit_code, 1)
+
+    def test_upgrade_method_falls_back_without_the_transition_action(self):
+        """
+        Tests if the upgrade is applied here when the API
+        has no transition action.
+        """
+        session = mock.MagicMock()
+        session.post.return_value = MockResponse(
+            404, headers={"Content-Type": "text/html"}
+        )
+        customer_data = copy.deepcopy(mock_customer_data)
+        customer_data["data"]["SUBSCRIPTION"] = "basic"
+        session.get.return_value = MockResponse(200, response_data=customer_data)
+        session.patch.return_value = MockResponse(200)
+        upgrade_manager = UpgradeSubscription(
+            **mock_manager_arguments, session=session, server_transitions=True
+        )
+        upgrade_manager.new_subscription = "premium"
+
+        report = upgrade_manager.upgrade()
+
+        self.assertTrue(report.endswith("-- UPGRADED -- from basic to premium"))
+        session.patch.assert_called_once()
@@ -43,8 +43,11 @@ subscription_manager_attributes = [
     "new_subscription",
     "customer_data_api_url",
     "subscriptions",
+    "session",
+    "timeout",
     "customer_data",
     "old_subscription",
+    "changed_keys",
     "changes_sent",
     "exit_code",
 ]
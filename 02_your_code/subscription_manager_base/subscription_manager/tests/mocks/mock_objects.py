@@ -3,6 +3,9 @@
 Module for storing mock objects for testing.
 """
 import json
+from unittest import mock
+
+import requests
 
 
 class MockResponse:  # pylint: disable=R0903
@@ -11,7 +14,7 @@ class MockResponse:  # pylint: disable=R0903
     that can be used for testing purposes.
     """
 
-    def __init__(self, status_code, reason="", response_data=None):
+    def __init__(self, status_code, reason="", response_data=None, headers=None):
         """
         Initialize a new instance of the class with the given
         status code and response data.
@@ -20,10 +23,12 @@ class MockResponse:  # pylint: disable=R0903
         - status_code (int):    The HTTP status code of the mock response.
         - reason (str):         Short description of the HTTP response.
         - response_data (dict): Data to be returned in the response body.
+        - headers (dict):       Headers of the mock response.
         """
         self.status_code = status_code
         self.reason = reason
         self._response_data = response_data or {}
+        self.headers = headers or {}
 
     @property
     def text(self):
@@ -31,3 +36,29 @@ class MockResponse:  # pylint: disable=R0903
         Simulates the 'text' attribute of a real response.
         """
         return json.dumps(self._response_data)
+
+    def json(self):
+        """
+        Simulates the 'json' method of a real response.
+        """
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        """
+        Simulates the 'raise_for_status' method of a real response.
+        """
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} {self.reason}")
+
+
+def mock_session(customer_data):
+    """
+    Returns a mock session whose GET requests answer with the given
+    customer data and whose PATCH requests succeed.
+    """
+    session = mock.MagicMock()
+    session.get.return_value = MockResponse(
+        status_code=200, response_data=customer_data
+    )
+    session.patch.return_value = MockResponse(status_code=200)
+    return session
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Test the AsyncSubscriptionManager class from the aio.py file.
+"""
+import copy
+import io
+import json
+import threading
+import time
+from unittest import TestCase
+
+from subscription_manager_base.subscription_manager.aio import (
+    AsyncSubscriptionManager,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_data import (
+    mock_customer_data,
+    mock_manager_arguments,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_objects import (
+    MockResponse,
+    mock_session,
+)
+
+
+class AsyncSubscriptionManagerTestCase(TestCase):
+    """
+    Tests for the async subscription manager class.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        self.session = mock_session(mock_customer_data)
+        mock_customer_data["data"]["SUBSCRIPTION"] = "basic"
+
+    def build_manager(self, **kwargs):
+        """
+        Returns an AsyncSubscriptionManager using the mock session.
+        """
+        return AsyncSubscriptionManager(
+            mock_manager_arguments["customer_data_api_url"],
+            mock_manager_arguments["subscriptions"],
+            session=self.session,
+            **kwargs,
+        )
+
+    def test_run_applies_every_change_with_the_same_reports(self):
+        """
+        Tests if the run method applies the changes and writes
+        the same report strings of the synchronous managers.
+        """
+        manager = self.build_manager(concurrency=3)
+        input_stream = io.StringIO(
+            "id-1,upgrade,premium\nid-2,downgrade,free\nid-3,upgrade,free\n"
+        )
+        report_stream = io.StringIO()
+        failed = manager.run(input_stream, report_stream)
+
+        report = report_stream.getvalue()
+        self.assertEqual(failed, 1)
+        self.assertEqual(manager.succeeded, 2)
+        self.assertIn("id-1 -- UPGRADED -- from basic to premium", report)
+        self.assertIn("id-2 -- DOWNGRADED -- from basic to free", report)
+        self.assertIn("id-3,upgrade,free,4,", report)
+
+    def test_run_never_exceeds_the_concurrency_limit(self):
+        """
+        Tests if no more than `concurrency` customers are in
+        flight against the API at the same time.
+        """
+        lock = threading.Lock()
+        in_flight = {"now": 0, "max": 0}
+        response = self.session.get.return_value
+
+        def slow_get(*args, **kwargs):  # pylint: disable=unused-argument
+            with lock:
+                in_flight["now"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            time.sleep(0.01)
+            with lock:
+                in_flight["now"] -= 1
+            return response
+
+        self.session.get.side_effect = slow_get
+        manager = self.build_manager(concurrency=2)
+        rows = "".join(f"id-{i},upgrade,premium\n" for i in range(8))
+        manager.run(io.StringIO(rows), io.StringIO())
+
+        self.assertEqual(manager.succeeded, 8)
+        self.assertLessEqual(in_flight["max"], 2)
+
+    def test_run_applies_the_changes_of_a_customer_in_order(self):
+        """
+        Tests if the changes of one customer are applied one after
+        the other, in the order of the input, without false failures.
+        """
+        customer_data = copy.deepcopy(mock_customer_data)
+        patched = []
+
+        def get(*args, **kwargs):  # pylint: disable=unused-argument
+            time.sleep(0.001)
+            return MockResponse(200, response_data=customer_data)
+
+        def patch(url, data, **kwargs):  # pylint: disable=unused-argument
+            subscription = json.loads(data)["data"]["SUBSCRIPTION"]
+            customer_data["data"]["SUBSCRIPTION"] = subscription
+            patched.append(subscription)
+            return MockResponse(200)
+
+        self.session.get.side_effect = get
+        self.session.patch.side_effect = patch
+        manager = self.build_manager(concurrency=8)
+        rows = "id-1,upgrade,premium\nid-1,downgrade,basic\n" * 8
+        failed = manager.run(io.StringIO(rows), io.StringIO())
+
+        self.assertEqual(failed, 0)
+        self.assertEqual(patched, ["premium", "basic"] * 8)
+        self.assertEqual(customer_data["data"]["SUBSCRIPTION"], "basic")
+
+    def test_run_change_async_fails_with_exit_code_2_after_the_deadline(self):
+        """
+        Tests if a change whose request takes longer than the
+        deadline fails with exit code 2 and logs an error.
+        """
+        response = self.session.get.return_value
+        self.session.get.side_effect = lambda *args, **kwargs: (
+            time.sleep(0.2) or response
+        )
+        manager = self.build_manager(timeout=0.05)
+        report_stream = io.StringIO()
+
+        with self.assertLogs() as logs_captured:
+            manager.run(io.StringIO("id-1,upgrade,premium\n"), report_stream)
+
+        self.assertIn("id-1,upgrade,premium,2,", report_stream.getvalue())
+        self.assertEqual(
+            logs_captured.records[0].getMessage(),
+            "The customer data API did not answer in 0.05 seconds, "
+            "please try again later.",
+        )
+        self.session.patch.assert_not_called()
+
+    def test_run_change_async_waits_for_a_late_patch_before_reporting(self):
+        """
+        Tests if a change whose PATCH request ends after the deadline is
+        reported once the request finished, as applied when it succeeded.
+        """
+        response = self.session.patch.return_value
+        self.session.patch.side_effect = lambda *args, **kwargs: (
+            time.sleep(0.2) or response
+        )
+        manager = self.build_manager(timeout=0.05)
+        report_stream = io.StringIO()
+        manager.run(io.StringIO("id-1,upgrade,premium\n"), report_stream)
+
+        self.assertEqual(manager.failed, 0)
+        self.assertIn(
+            "id-1 -- UPGRADED -- from basic to premium", report_stream.getvalue()
+        )
+
+    def test_run_change_async_rejects_malformed_rows(self):
+        """
+        Tests if malformed rows get the cli exit codes
+        without reaching the API.
+        """
+        manager = self.build_manager()
+        report_stream = io.StringIO()
+        manager.run(io.StringIO("id-1,cancel,free\n"), report_stream)
+
+        self.assertIn("id-1,cancel,free,5,", report_stream.getvalue())
+        self.session.get.assert_not_called()
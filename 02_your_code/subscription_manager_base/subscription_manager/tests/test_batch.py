@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Test the BatchSubscriptionManager class from the batch.py file.
+"""
+import copy
+import io
+from unittest import TestCase, mock
+
+from subscription_manager_base.subscription_manager.batch import (
+    BatchSubscriptionManager,
+    ChangeRequest,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_data import (
+    mock_customer_data,
+    mock_manager_arguments,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_objects import (
+    MockResponse,
+)
+
+
+class BatchSubscriptionManagerTestCase(TestCase):
+    """
+    Tests for the batch subscription manager class.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        self.batch_manager = BatchSubscriptionManager(
+            mock_manager_arguments["customer_data_api_url"],
+            mock_manager_arguments["subscriptions"],
+        )
+        customer_data = copy.deepcopy(mock_customer_data)
+        customer_data["data"]["SUBSCRIPTION"] = "basic"
+        mock_response = MockResponse(status_code=200, response_data=customer_data)
+        self.mock_response = mock.MagicMock(return_value=mock_response)
+
+    def test_read_changes_yields_change_requests(self):
+        """
+        Tests if the read_changes method yields one ChangeRequest
+        per row, ignoring blank lines and comments.
+        """
+        stream = io.StringIO("# uuid,command,plan\n\nid-1, upgrade ,premium\nid-2\n")
+        changes = list(self.batch_manager.read_changes(stream))
+
+        self.assertEqual(
+            changes,
+            [
+                ChangeRequest("id-1", "upgrade", "premium"),
+                ChangeRequest("id-2", "", ""),
+            ],
+        )
+
+    def test_run_change_returns_report_when_change_succeeds(self):
+        """
+        Tests if the run_change method returns the report of changes
+        and a zero exit code when the change is applied.
+        """
+        change = ChangeRequest("id-1", "upgrade", "premium")
+        kwargs = {"get": self.mock_response, "patch": self.mock_response}
+        with mock.patch.multiple("requests", **kwargs):
+            result = self.batch_manager.run_change(change)
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.report, "id-1 -- UPGRADED -- from basic to premium")
+
+    def test_run_change_returns_exit_code_when_change_fails(self):
+        """
+        Tests if the run_change method returns the exit code of the
+        failed change instead of stopping the process.
+        """
+        change = ChangeRequest("id-1", "upgrade", "free")
+        kwargs = {"get": self.mock_response, "patch": self.mock_response}
+        with mock.patch.multiple("requests", **kwargs):
+            result = self.batch_manager.run_change(change)
+
+        self.assertEqual(result.exit_code, 4)
+        self.assertEqual(result.report, "")
+
+    def test_run_change_rejects_malformed_rows(self):
+        """
+        Tests if the run_change method uses the cli exit codes
+        for rows with missing arguments or unknown commands.
+        """
+        missing = self.batch_manager.run_change(ChangeRequest("id-1", "upgrade", ""))
+        unknown = self.batch_manager.run_change(ChangeRequest("id-1", "cancel", "free"))
+
+        self.assertEqual(missing.exit_code, 1)
+        self.assertEqual(unknown.exit_code, 5)
+
+    def test_run_writes_one_report_row_per_customer(self):
+        """
+        Tests if the run method writes a report row for every
+        change and counts the failed ones.
+        """
+        input_stream = io.StringIO("id-1,upgrade,premium\nid-2,downgrade,premium\n")
+        report_stream = io.StringIO()
+        kwargs = {"get": self.mock_response, "patch": self.mock_response}
+        with mock.patch.multiple("requests", **kwargs):
+            failed = self.batch_manager.run(input_stream, report_stream)
+
+        rows = report_stream.getvalue().splitlines()
+        self.assertEqual(failed, 1)
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(rows[2].startswith("id-2,downgrade,premium,5"))
+        self.assertEqual(
+            self.batch_manager.summary(), "2 changes -- 1 applied -- 1 failed"
+        )
+
+    def test_run_uses_the_prefetched_customer_data(self):
+        """
+        Tests if the run method retrieves the customer data in bulk
+        and only requests again the customers it did not get.
+        """
+        first_id = "1b2f7b83-7b4d-441d-a210-afaa970e5b76"
+        second_id = "49a6307e-c261-414d-86f5-c6004bcec8ab"
+        customer_data = copy.deepcopy(mock_customer_data)
+        customer_data["id"] = first_id
+        session = mock.MagicMock()
+        session.post.return_value = MockResponse(
+            status_code=200, response_data={"results": [customer_data]}
+        )
+        session.get.return_value = self.mock_response.return_value
+        session.patch.return_value = MockResponse(status_code=200)
+        self.batch_manager.session = session
+        self.batch_manager.prefetch_size = 10
+
+        input_stream = io.StringIO(
+            f"{first_id},upgrade,premium\n{second_id},upgrade,premium\n"
+        )
+        failed = self.batch_manager.run(input_stream, io.StringIO())
+
+        self.assertEqual(failed, 0)
+        session.post.assert_called_once()
+        session.get.assert_called_once()
+        self.assertIn(second_id, session.get.call_args.args[0])
+
+    def test_prefetch_returns_nothing_when_the_bulk_request_fails(self):
+        """
+        Tests if the prefetch method falls back to an empty dictionary
+        when the bulk request fails, or when there is nothing to prefetch.
+        """
+        session = mock.MagicMock()
+        session.post.return_value = MockResponse(404, "Not Found")
+        self.batch_manager.session = session
+        self.batch_manager.prefetch_size = 10
+        valid = ChangeRequest("1b2f7b83-7b4d-441d-a210-afaa970e5b76", "upgrade", "free")
+
+        self.assertEqual(self.batch_manager.prefetch([valid]), {})
+        self.assertEqual(
+            self.batch_manager.prefetch([ChangeRequest("bad", "upgrade", "free")]), {}
+        )
+        session.post.assert_called_once()
+
+    def test_run_sends_the_changes_in_bulk(self):
+        """
+        Tests if the run method sends the changes of a chunk with
+        a single bulk update request in bulk update mode.
+        """
+        session = mock.MagicMock()
+        session.get.return_value = self.mock_response.return_value
+        session.patch.return_value = MockResponse(
+            200, response_data={"results": [{"status": "updated"}] * 2}
+        )
+        self.batch_manager.session = session
+        self.batch_manager.prefetch_size = 10
+        self.batch_manager.bulk_update = True
+
+        input_stream = io.StringIO(
+            "id-1,upgrade,premium\nid-2,cancel,free\nid-1,downgrade,free\n"
+        )
+        report_stream = io.StringIO()
+        failed = self.batch_manager.run(input_stream, report_stream)
+
+        rows = report_stream.getvalue().splitlines()
+        changes = session.patch.call_args.kwargs["json"]["changes"]
+        self.assertEqual(failed, 1)
+        self.assertEqual(session.get.call_count, 1)
+        self.assertEqual(session.patch.call_count, 1)
+        self.assertEqual(changes[1]["update"]["SUBSCRIPTION"], "free")
+        self.assertIn("id-1 -- UPGRADED -- from basic to premium", rows[1])
+        self.assertIn("id-2,cancel,free,5", rows[2])
+        self.assertIn("id-1 -- DOWNGRADED -- from premium to free", rows[3])
+        self.assertTrue(session.patch.call_args.args[0].endswith("bulk-update/"))
+
+    def test_flush_falls_back_to_one_patch_per_customer(self):
+        """
+        Tests if the changes are sent one by one when the bulk
+        update endpoint is not available.
+        """
+        session = mock.MagicMock()
+        session.get.return_value = self.mock_response.return_value
+        session.patch.side_effect = [
+            MockResponse(405, "Method Not Allowed"),
+            MockResponse(200),
+        ]
+        self.batch_manager.session = session
+        self.batch_manager.bulk_update = True
+
+        input_stream = io.StringIO("id-1,upgrade,premium\n")
+        failed = self.batch_manager.run(input_stream, io.StringIO())
+
+        bulk_call, customer_call = session.patch.call_args_list
+        self.assertEqual(failed, 0)
+        self.assertTrue(bulk_call.args[0].endswith("bulk-update/"))
+        self.assertTrue(customer_call.args[0].endswith("id-1/"))
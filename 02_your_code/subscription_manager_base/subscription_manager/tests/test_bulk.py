@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Test the bulk requests from the bulk.py file.
+"""
+from unittest import TestCase, mock
+
+import requests
+from subscription_manager_base.subscription_manager.bulk import (
+    flush_pending_changes,
+    get_customer_data_many,
+    iter_customer_data,
+)
+from subscription_manager_base.subscription_manager.core import UpgradeSubscription
+from subscription_manager_base.subscription_manager.tests.mocks.mock_data import (
+    mock_customer_data,
+    mock_manager_arguments,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_objects import (
+    MockResponse,
+)
+
+
+class GetCustomerDataManyTestCase(TestCase):
+    """
+    Tests for the get_customer_data_many function.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        self.api_url = mock_manager_arguments["customer_data_api_url"]
+        self.session = mock.MagicMock()
+        self.session.post.return_value = MockResponse(
+            status_code=200, response_data={"results": [mock_customer_data]}
+        )
+
+    def test_returns_the_customer_data_by_id(self):
+        """
+        Tests if the customer data found is returned by customer id.
+        """
+        customer_id = mock_customer_data["id"]
+        customers = get_customer_data_many(
+            [customer_id], self.api_url, session=self.session
+        )
+
+        self.assertEqual(customers, {customer_id: mock_customer_data})
+        self.session.post.assert_called_once_with(
+            f"{self.api_url}bulk-retrieve/", json={"ids": [customer_id]}, timeout=5
+        )
+
+    def test_sends_one_request_per_chunk_of_ids(self):
+        """
+        Tests if the ids are split in chunks of `chunk_size` ids
+        and repeated ids are only requested once.
+        """
+        customer_ids = ["id-1", "id-2", "id-1", "id-3"]
+        get_customer_data_many(
+            customer_ids, self.api_url, session=self.session, chunk_size=2
+        )
+
+        sent_ids = [call.kwargs["json"]["ids"] for call in self.session.post.mock_calls]
+        self.assertEqual(sent_ids, [["id-1", "id-2"], ["id-3"]])
+
+    def test_raises_an_error_when_the_api_fails(self):
+        """
+        Tests if an error response of the API is raised.
+        """
+        self.session.post.return_value = MockResponse(400, "Bad Request")
+        with self.assertRaises(requests.exceptions.HTTPError):
+            get_customer_data_many(["id-1"], self.api_url, session=self.session)
+
+
+class IterCustomerDataTestCase(TestCase):
+    """
+    Tests for the iter_customer_data function.
+    """
+
+    def test_follows_the_pages_of_the_list(self):
+        """
+        Tests if the customer data of every page is yielded, sending
+        the filters with the first request and then following the
+        next links of the list.
+        """
+        api_url = mock_manager_arguments["customer_data_api_url"]
+        next_url = f"{api_url}?cursor=abc&subscription=premium"
+        session = mock.MagicMock()
+        session.get.side_effect = [
+            MockResponse(
+                200, response_data={"results": [{"id": "id-1"}], "next": next_url}
+            ),
+            MockResponse(
+                200, response_data={"results": [{"id": "id-2"}], "next": None}
+            ),
+        ]
+
+        customers = iter_customer_data(
+            api_url,
+            session=session,
+            subscriptions=["premium"],
+            enabled_features=["ENABLE_EDXNOTES"],
+        )
+
+        self.assertEqual([customer["id"] for customer in customers], ["id-1", "id-2"])
+        first_request, second_request = session.get.call_args_list
+        self.assertEqual(first_request.kwargs["params"]["subscription"], "premium")
+        self.assertEqual(first_request.kwargs["params"]["disabled_features"], "")
+        self.assertEqual(second_request.args[0], next_url)
+        self.assertIsNone(second_request.kwargs["params"])
+
+
+class FlushPendingChangesTestCase(TestCase):
+    """
+    Tests for the flush_pending_changes function.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        self.api_url = mock_manager_arguments["customer_data_api_url"]
+        self.session = mock.MagicMock()
+        self.managers = []
+        for customer_id in ("id-1", "id-2", "id-3"):
+            manager = UpgradeSubscription(
+                customer_id, "premium", self.api_url, {"basic": 2, "premium": 3}
+            )
+            manager.use_customer_data(
+                {"id": customer_id, "data": {"SUBSCRIPTION": "basic"}}
+            )
+            manager.add_or_update_item("SUBSCRIPTION", "premium")
+            self.managers.append(manager)
+
+    def test_sends_the_pending_changes_in_chunks(self):
+        """
+        Tests if the pending changes are sent to the bulk update
+        endpoint, `chunk_size` managers per request.
+        """
+        self.session.patch.side_effect = [
+            MockResponse(200, response_data={"results": [{"status": "updated"}] * 2}),
+            MockResponse(200, response_data={"results": [{"status": "updated"}]}),
+        ]
+        flush_pending_changes(
+            self.managers, self.api_url, session=self.session, chunk_size=2
+        )
+
+        first_request = self.session.patch.mock_calls[0]
+        self.assertEqual(first_request.args[0], f"{self.api_url}bulk-update/")
+        self.assertEqual(
+            first_request.kwargs["json"]["changes"][0],
+            {"id": "id-1", "update": {"SUBSCRIPTION": "premium"}, "delete": []},
+        )
+        self.assertEqual(self.session.patch.call_count, 2)
+        self.assertTrue(all(manager.changes_sent for manager in self.managers))
+
+    def test_failed_changes_get_exit_code_6(self):
+        """
+        Tests if the managers whose changes failed get the exit
+        code 6 and an error is logged for them.
+        """
+        results = [
+            {"status": "updated"},
+            {"status": "failed", "errors": ["Not found."]},
+            {"status": "updated"},
+        ]
+        self.session.patch.return_value = MockResponse(
+            200, response_data={"results": results}
+        )
+        with self.assertLogs() as logs_captured:
+            flush_pending_changes(self.managers, self.api_url, session=self.session)
+
+        self.assertFalse(self.managers[1].changes_sent)
+        self.assertEqual(self.managers[1].exit_code, 6)
+        self.assertEqual(
+            logs_captured.records[0].getMessage(),
+            "Failed to update the customer data [['Not found.']].",
+        )
+
+    def test_conflicting_changes_are_applied_again(self):
+        """
+        Tests if the changes of a customer updated by another client
+        are applied to its new customer data and sent one by one.
+        """
+        results = [{"status": "updated"}, {"status": "conflict"}, {"status": "updated"}]
+        self.session.patch.side_effect = [
+            MockResponse(200, response_data={"results": results}),
+            MockResponse(200),
+        ]
+        self.session.get.return_value = MockResponse(
+            200,
+            response_data={
+                "id": "id-2",
+                "data": {"SUBSCRIPTION": "basic"},
+                "version": 2,
+            },
+        )
+        self.managers[1].session = self.session
+        flush_pending_changes(self.managers, self.api_url, session=self.session)
+
+        self.assertTrue(all(manager.changes_sent for manager in self.managers))
+        self.assertEqual(self.managers[1].etag, '"2"')
+        self.assertTrue(self.session.patch.call_args.args[0].endswith("id-2/"))
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Test the CustomerDataCache class from the cache.py file.
+"""
+import copy
+from unittest import TestCase, mock
+
+from subscription_manager_base.subscription_manager.cache import CustomerDataCache
+from subscription_manager_base.subscription_manager.core import UpgradeSubscription
+from subscription_manager_base.subscription_manager.tests.mocks.mock_data import (
+    mock_customer_data,
+    mock_manager_arguments,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_objects import (
+    MockResponse,
+    mock_session,
+)
+
+
+class CustomerDataCacheTestCase(TestCase):
+    """
+    Tests for the customer data cache class.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        self.now = 0
+        self.cache = CustomerDataCache(max_size=2, ttl=10, clock=lambda: self.now)
+
+    def test_lookup_counts_hits_and_misses(self):
+        """
+        Tests if the lookup method answers with a copy of the fresh
+        entries and counts the hits and misses.
+        """
+        self.cache.store("id-1", {"data": {"SUBSCRIPTION": "free"}}, '"1"')
+
+        entry, fresh = self.cache.lookup("id-1")
+        entry.customer_data["data"]["SUBSCRIPTION"] = "premium"
+        missing, _ = self.cache.lookup("id-2")
+
+        self.assertTrue(fresh)
+        self.assertEqual(entry.etag, '"1"')
+        self.assertIsNone(missing)
+        self.assertEqual(
+            self.cache.lookup("id-1")[0].customer_data["data"], {"SUBSCRIPTION": "free"}
+        )
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+        self.assertAlmostEqual(self.cache.hit_ratio(), 2 / 3)
+
+    def test_lookup_keeps_the_expired_entries_to_revalidate_them(self):
+        """
+        Tests if the expired entries are answered as not fresh until
+        they are revalidated.
+        """
+        self.cache.store("id-1", {}, '"1"')
+        self.now = 10
+
+        entry, fresh = self.cache.lookup("id-1")
+        self.cache.revalidate("id-1")
+
+        self.assertEqual(entry.etag, '"1"')
+        self.assertFalse(fresh)
+        self.assertTrue(self.cache.lookup("id-1")[1])
+        self.assertEqual(self.cache.revalidations, 1)
+
+    def test_store_evicts_the_least_recently_used_customer(self):
+        """
+        Tests if the least recently used customer is evicted
+        when the cache is full.
+        """
+        self.cache.store("id-1", {})
+        self.cache.store("id-2", {})
+        self.cache.lookup("id-1")
+        self.cache.store("id-3", {})
+
+        self.assertEqual(list(self.cache.entries), ["id-1", "id-3"])
+        self.cache.invalidate("id-1")
+        self.cache.clear()
+        self.assertEqual(self.cache.hit_ratio(), 1.0)
+        self.assertFalse(self.cache.entries)
+
+
+class SubscriptionManagerCacheTestCase(TestCase):
+    """
+    Tests for the subscription manager using a customer data cache.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        self.now = 0
+        self.cache = CustomerDataCache(ttl=10, clock=lambda: self.now)
+        customer_data = copy.deepcopy(mock_customer_data)
+        customer_data["data"]["SUBSCRIPTION"] = "free"
+        self.session = mock_session(customer_data)
+        self.session.get.return_value.headers = {"ETag": '"1"'}
+
+    def build_manager(self):
+        """
+        Returns an UpgradeSubscription using the cache and the mock session.
+        """
+        manager = UpgradeSubscription(
+            **mock_manager_arguments, session=self.session, cache=self.cache
+        )
+        manager.new_subscription = "premium"
+        return manager
+
+    def test_get_customer_data_uses_the_fresh_customer_data(self):
+        """
+        Tests if the customer data is retrieved once while it is fresh.
+        """
+        self.build_manager().get_customer_data()
+        manager = self.build_manager()
+        manager.get_customer_data()
+
+        self.session.get.assert_called_once()
+        self.assertEqual(manager.etag, '"1"')
+        self.assertEqual(manager.old_subscription, "free")
+
+    def test_get_customer_data_revalidates_the_expired_customer_data(self):
+        """
+        Tests if the expired customer data is revalidated with its entity
+        tag and used again when the API answers it did not change.
+        """
+        self.build_manager().get_customer_data()
+        self.now = 10
+        self.session.get.return_value = MockResponse(304, "Not Modified")
+        manager = self.build_manager()
+        manager.get_customer_data()
+
+        headers = self.session.get.call_args.kwargs["headers"]
+        self.assertEqual(headers, {"If-None-Match": '"1"'})
+        self.assertEqual(manager.old_subscription, "free")
+        self.assertEqual(self.cache.revalidations, 1)
+
+    def test_upgrade_invalidates_the_customer_data_sent(self):
+        """
+        Tests if the customer is removed from the cache once
+        its changes are sent to the API.
+        """
+        self.build_manager().upgrade()
+
+        self.assertNotIn(mock_manager_arguments["customer_id"], self.cache.entries)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_upgrade_retrieves_the_customer_data_again_on_conflict(self):
+        """
+        Tests if the cached customer data is not used to apply the
+        changes again when another client updated the customer.
+        """
+        self.session.patch = mock.MagicMock(
+            side_effect=[MockResponse(412, "Precondition Failed"), MockResponse(200)]
+        )
+        self.build_manager().upgrade()
+
+        self.assertEqual(self.session.get.call_count, 2)
+
+    def test_upgrade_retrieves_the_stale_customer_data_again(self):
+        """
+        Tests if a change that is not valid on the fresh cached customer
+        data is validated again on the customer data of the API, without
+        an error, since the customer changed after it was cached.
+        """
+        stale = copy.deepcopy(mock_customer_data)
+        stale["data"]["SUBSCRIPTION"] = "premium"
+        self.cache.store(mock_manager_arguments["customer_id"], stale, '"1"')
+        manager = self.build_manager()
+
+        with mock.patch.object(manager, "log_error") as log_error:
+            report = manager.upgrade()
+
+        log_error.assert_not_called()
+        self.assertTrue(report.endswith("UPGRADED -- from free to premium"))
+        self.session.get.assert_called_once()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Test the DryRunSubscriptionManager class from the dryrun.py file.
+"""
+import copy
+import csv
+import io
+import json
+from unittest import TestCase
+
+from subscription_manager_base.subscription_manager.dryrun import (
+    DryRunSubscriptionManager,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_data import (
+    mock_customer_data,
+    mock_manager_arguments,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_objects import (
+    MockResponse,
+    mock_session,
+)
+
+FIRST_ID = "1b2f7b83-7b4d-441d-a210-afaa970e5b76"
+SECOND_ID = "49a6307e-c261-414d-86f5-c6004bcec8ab"
+
+
+class DryRunSubscriptionManagerTestCase(TestCase):
+    """
+    Tests for the dry run subscription manager class.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        customers = []
+        for customer_id in (FIRST_ID, SECOND_ID):
+            customer_data = copy.deepcopy(mock_customer_data)
+            customer_data["id"] = customer_id
+            customer_data["data"]["SUBSCRIPTION"] = "basic"
+            customers.append(customer_data)
+        self.session = mock_session(customers[0])
+        self.session.post.return_value = MockResponse(
+            200, response_data={"results": customers}
+        )
+        self.dry_run = DryRunSubscriptionManager(
+            mock_manager_arguments["customer_data_api_url"],
+            mock_manager_arguments["subscriptions"],
+            session=self.session,
+            prefetch_size=10,
+        )
+
+    def run_rows(self, rows):
+        """
+        Runs the dry run on the given input rows and
+        returns the rows of its report.
+        """
+        report_stream = io.StringIO()
+        self.dry_run.run(io.StringIO(rows), report_stream)
+        report_stream.seek(0)
+        return list(csv.DictReader(report_stream))
+
+    def test_run_writes_the_diff_of_every_change_without_writing(self):
+        """
+        Tests if every change gets the merge patch it would send, the
+        customers are retrieved in bulk and nothing is sent to the API.
+        """
+        rows = self.run_rows(
+            f"{FIRST_ID},upgrade,premium\n"
+            f"{FIRST_ID},downgrade,free\n"
+            f"{SECOND_ID},downgrade,premium\n"
+            f"{SECOND_ID},cancel,free\n"
+        )
+
+        upgrade = json.loads(rows[0]["diff"])
+        downgrade = json.loads(rows[1]["diff"])
+        self.assertEqual(upgrade["SUBSCRIPTION"], "premium")
+        self.assertIn("UPGRADE_DATE", upgrade)
+        self.assertIsNone(downgrade["UPGRADE_DATE"])
+        self.assertFalse(any(downgrade["ENABLED_FEATURES"].values()))
+        self.assertEqual(
+            rows[1]["report"], f"{FIRST_ID} -- DOWNGRADED -- from premium to free"
+        )
+        self.assertEqual([row["exit_code"] for row in rows[2:]], ["5", "5"])
+        self.assertEqual(rows[2]["diff"], "")
+        self.session.post.assert_called_once()
+        self.session.get.assert_not_called()
+        self.session.patch.assert_not_called()
+        self.session.put.assert_not_called()
+
+    def test_summary_returns_the_aggregate_statistics(self):
+        """
+        Tests if the summary counts the changes by transition,
+        changed key and exit code, and a change that fails does not
+        make the next one of the same customer retrieve it again.
+        """
+        self.run_rows(
+            f"{FIRST_ID},upgrade,premium\n"
+            f"{SECOND_ID},upgrade,premium\n"
+            f"{SECOND_ID},upgrade,free\n"
+            f"{SECOND_ID},downgrade,free\n"
+        )
+
+        lines = self.dry_run.summary().splitlines()
+        self.assertEqual(
+            lines[0],
+            "4 changes -- 3 would apply -- 1 would fail -- nothing was written",
+        )
+        self.assertIn("basic -> premium: 2", lines)
+        self.assertIn("SUBSCRIPTION changed: 3", lines)
+        self.assertIn("premium -> free: 1", lines)
+        self.assertIn("exit code 4: 1", lines)
+        self.session.get.assert_not_called()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Test the exceptions from the exceptions.py file.
+"""
+from unittest import TestCase
+
+from subscription_manager_base.subscription_manager.exceptions import (
+    CustomerDataAPIUnavailableError,
+    SubscriptionManagerError,
+    error_for_exit_code,
+)
+
+
+class ErrorForExitCodeTestCase(TestCase):
+    """
+    Tests for the error_for_exit_code function.
+    """
+
+    def test_error_for_exit_code_returns_the_error_of_the_exit_code(self):
+        """
+        Tests if the error_for_exit_code function returns the typed
+        error of a known exit code, with the given message.
+        """
+        error = error_for_exit_code(2, "The customer data API is unavailable.")
+
+        self.assertIsInstance(error, CustomerDataAPIUnavailableError)
+        self.assertEqual(error.exit_code, 2)
+        self.assertEqual(str(error), "The customer data API is unavailable.")
+
+    def test_error_for_exit_code_falls_back_to_the_base_error(self):
+        """
+        Tests if the error_for_exit_code function returns the base
+        error, with the given exit code, for unknown exit codes.
+        """
+        error = error_for_exit_code(9)
+
+        self.assertIs(type(error), SubscriptionManagerError)
+        self.assertEqual(error.exit_code, 9)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Test the CheckpointJournal class from the journal.py file.
+"""
+import copy
+import io
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from subscription_manager_base.subscription_manager.batch import (
+    BatchSubscriptionManager,
+    ChangeRequest,
+    ChangeResult,
+)
+from subscription_manager_base.subscription_manager.journal import CheckpointJournal
+from subscription_manager_base.subscription_manager.tests.mocks.mock_data import (
+    mock_customer_data,
+    mock_manager_arguments,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_objects import (
+    MockResponse,
+)
+
+
+class CheckpointJournalTestCase(TestCase):
+    """
+    Tests for the checkpoint journal class.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "batch.journal")
+
+    def test_journal_skips_the_changes_that_succeeded_before(self):
+        """
+        Tests if a new journal skips the changes that succeeded as many
+        times as they did, but not the failed ones or the cut lines.
+        """
+        with CheckpointJournal(self.path) as journal:
+            journal.append(ChangeResult("id-1", "upgrade", "premium", 0, "UPGRADED"))
+            journal.append(ChangeResult("id-2", "upgrade", "basic", 4, ""))
+        with open(self.path, "a", encoding="utf-8") as stream:
+            stream.write('{"customer_id": "id-3", "command": "upgr')
+
+        journal = CheckpointJournal(self.path)
+        journal.close()
+
+        self.assertTrue(journal.skip(ChangeRequest("id-1", "upgrade", "premium")))
+        self.assertFalse(journal.skip(ChangeRequest("id-1", "upgrade", "premium")))
+        self.assertFalse(journal.skip(ChangeRequest("id-2", "upgrade", "basic")))
+
+    def test_journal_appends_after_a_cut_line_on_a_new_line(self):
+        """
+        Tests if the first change appended after a line cut by a crash
+        is written on its own line, and skipped by the next journal.
+        """
+        with open(self.path, "w", encoding="utf-8") as stream:
+            stream.write('{"customer_id": "id-3", "command": "upgr')
+
+        with CheckpointJournal(self.path) as journal:
+            journal.append(ChangeResult("id-1", "upgrade", "premium", 0, "UPGRADED"))
+        journal = CheckpointJournal(self.path)
+        journal.close()
+
+        self.assertTrue(journal.skip(ChangeRequest("id-1", "upgrade", "premium")))
+
+    def test_journal_syncs_the_lines_in_batches(self):
+        """
+        Tests if the journal is synced to the disk every `sync_every`
+        lines, after `sync_interval` seconds and when it is closed.
+        """
+        clock = mock.MagicMock(side_effect=[0, 0, 0, 0, 5, 5, 5])
+        result = ChangeResult("id-1", "upgrade", "premium", 0, "")
+        with mock.patch("os.fsync") as fsync:
+            journal = CheckpointJournal(
+                self.path, sync_every=2, sync_interval=1, clock=clock
+            )
+            for _ in range(3):
+                journal.append(result)
+            self.assertEqual(fsync.call_count, 2)
+            journal.close()
+            journal.close()
+
+        self.assertEqual(fsync.call_count, 3)
+
+
+class JournaledBatchTestCase(TestCase):
+    """
+    Tests for the batch runs with a checkpoint journal.
+    """
+
+    def test_run_again_only_retries_the_failed_changes(self):
+        """
+        Tests if a second run of the same input skips the changes that
+        succeeded in the first one and runs the failed ones again.
+        """
+        customer_data = copy.deepcopy(mock_customer_data)
+        customer_data["data"]["SUBSCRIPTION"] = "basic"
+        session = mock.MagicMock()
+        session.get.return_value = MockResponse(200, response_data=customer_data)
+        session.patch.side_effect = [
+            MockResponse(200),
+            MockResponse(500, "Internal Server Error"),
+            MockResponse(200),
+        ]
+        rows = "id-1,upgrade,premium\nid-2,downgrade,free\n"
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "batch.journal")
+            runs = []
+            for _ in range(2):
+                with CheckpointJournal(path) as journal:
+                    batch_manager = BatchSubscriptionManager(
+                        mock_manager_arguments["customer_data_api_url"],
+                        mock_manager_arguments["subscriptions"],
+                        session=session,
+                        journal=journal,
+                    )
+                    batch_manager.run(io.StringIO(rows), io.StringIO())
+                runs.append(batch_manager.summary())
+
+        self.assertEqual(
+            runs,
+            [
+                "2 changes -- 1 applied -- 1 failed -- "
+                "0 skipped, applied in a previous run",
+                "1 changes -- 1 applied -- 0 failed -- "
+                "1 skipped, applied in a previous run",
+            ],
+        )
+        self.assertEqual(session.patch.call_count, 3)
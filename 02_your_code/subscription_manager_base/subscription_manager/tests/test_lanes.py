@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Test the LaneScheduler class from the lanes.py file.
+"""
+import copy
+import json
+import threading
+from unittest import TestCase
+
+from subscription_manager_base.subscription_manager.batch import (
+    BatchSubscriptionManager,
+    ChangeRequest,
+)
+from subscription_manager_base.subscription_manager.lanes import LaneScheduler
+from subscription_manager_base.subscription_manager.tests.mocks.mock_data import (
+    mock_customer_data,
+    mock_manager_arguments,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_objects import (
+    MockResponse,
+    mock_session,
+)
+
+
+class LaneSchedulerTestCase(TestCase):
+    """
+    Tests for the lane scheduler class.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        self.customer_data = copy.deepcopy(mock_customer_data)
+        self.customer_data["data"]["SUBSCRIPTION"] = "basic"
+        self.session = mock_session(self.customer_data)
+        self.session.get.side_effect = self.get
+        self.session.patch.side_effect = self.patch
+        self.patched = []
+        self.batch_manager = BatchSubscriptionManager(
+            mock_manager_arguments["customer_data_api_url"],
+            mock_manager_arguments["subscriptions"],
+            session=self.session,
+        )
+
+    def get(self, url, **kwargs):  # pylint: disable=unused-argument
+        """
+        Answers with the current customer data.
+        """
+        return MockResponse(200, response_data=self.customer_data)
+
+    def patch(self, url, data, **kwargs):  # pylint: disable=unused-argument
+        """
+        Applies the merge patch to the customer data.
+        """
+        subscription = json.loads(data)["data"]["SUBSCRIPTION"]
+        self.customer_data["data"]["SUBSCRIPTION"] = subscription
+        self.patched.append(subscription)
+        return MockResponse(200)
+
+    def test_lane_of_returns_the_same_lane_for_a_customer(self):
+        """
+        Tests if a customer ID is always hashed to the same lane.
+        """
+        scheduler = LaneScheduler(self.batch_manager, lanes=4)
+
+        self.assertIs(scheduler.lane_of("id-1"), scheduler.lane_of("id-1"))
+        self.assertIsNot(scheduler.lane_of("id-1"), scheduler.lane_of("id-4"))
+        scheduler.close()
+
+    def test_submit_applies_the_changes_of_a_customer_in_order(self):
+        """
+        Tests if the changes of one customer are applied one after
+        the other, each one on the customer data left by the previous.
+        """
+        scheduler = LaneScheduler(self.batch_manager, lanes=4)
+        changes = [
+            ChangeRequest("id-1", "upgrade", "premium"),
+            ChangeRequest("id-1", "downgrade", "free"),
+            ChangeRequest("id-1", "upgrade", "basic"),
+        ]
+        futures = [scheduler.submit(change) for change in changes]
+        results = [future.result(timeout=2) for future in futures]
+        scheduler.close()
+
+        self.assertEqual([result.exit_code for result in results], [0, 0, 0])
+        self.assertEqual(self.patched, ["premium", "free", "basic"])
+
+    def test_submit_answers_malformed_changes_at_once(self):
+        """
+        Tests if a malformed change gets the cli exit code
+        without going through a lane.
+        """
+        scheduler = LaneScheduler(self.batch_manager, lanes=1)
+        future = scheduler.submit(ChangeRequest("id-1", "cancel", "free"))
+        scheduler.close()
+
+        self.assertEqual(future.result().exit_code, 5)
+        self.session.get.assert_not_called()
+
+    def test_submit_coalesces_the_waiting_changes_of_a_customer(self):
+        """
+        Tests if the changes waiting for the lane of a customer are
+        collapsed into a single change to the plan of the last one.
+        """
+        released = threading.Event()
+
+        def get(url, **kwargs):
+            if "id-0" in url:
+                released.wait(timeout=2)
+            return self.get(url, **kwargs)
+
+        self.session.get.side_effect = get
+        scheduler = LaneScheduler(self.batch_manager, lanes=1, coalesce=True)
+        blocking = scheduler.submit(ChangeRequest("id-0", "upgrade", "premium"))
+        futures = [
+            scheduler.submit(ChangeRequest("id-1", "downgrade", "basic")),
+            scheduler.submit(ChangeRequest("id-1", "downgrade", "free")),
+        ]
+        released.set()
+        results = [future.result(timeout=2) for future in futures]
+        scheduler.close()
+
+        self.assertEqual(blocking.result().exit_code, 0)
+        self.assertEqual(self.patched, ["premium", "free"])
+        self.assertEqual(
+            [result.report for result in results],
+            [
+                "id-1 -- DOWNGRADED -- from premium to basic",
+                "id-1 -- DOWNGRADED -- from basic to free",
+            ],
+        )
+
+    def run_coalesced(self, subscription, *changes):
+        """
+        Applies the given changes of id-1 as a group, starting from the
+        given subscription, and returns their exit codes and reports.
+        """
+        self.customer_data["data"]["SUBSCRIPTION"] = subscription
+        scheduler = LaneScheduler(self.batch_manager)
+        results = scheduler.run_coalesced(
+            [ChangeRequest("id-1", *change) for change in changes]
+        )
+        scheduler.close()
+        return [(result.exit_code, result.report) for result in results]
+
+    def test_coalesced_changes_back_to_the_current_plan_send_nothing(self):
+        """
+        Tests if a group of changes that ends on the current plan of the
+        customer is reported as applied without sending any change.
+        """
+        results = self.run_coalesced(
+            "basic", ("upgrade", "premium"), ("downgrade", "basic")
+        )
+
+        self.assertEqual(
+            results,
+            [
+                (0, "id-1 -- UPGRADED -- from basic to premium"),
+                (0, "id-1 -- DOWNGRADED -- from premium to basic"),
+            ],
+        )
+        self.session.get.assert_called_once()
+        self.session.patch.assert_not_called()
+
+    def test_coalesced_changes_stop_at_the_first_invalid_one(self):
+        """
+        Tests if the changes of a group are validated in order against the
+        plan the previous one left, and only the valid ones are sent.
+        """
+        results = self.run_coalesced(
+            "premium", ("downgrade", "free"), ("downgrade", "premium")
+        )
+
+        self.assertEqual(
+            results, [(0, "id-1 -- DOWNGRADED -- from premium to free"), (5, "")]
+        )
+        self.assertEqual(self.patched, ["free"])
+
+    def test_coalesced_changes_fail_like_when_applied_alone(self):
+        """
+        Tests if every change of a group that is not valid from the plan
+        left by the previous ones fails with its own exit code.
+        """
+        results = self.run_coalesced(
+            "premium", ("upgrade", "premium"), ("downgrade", "premium")
+        )
+
+        self.assertEqual(results, [(4, ""), (5, "")])
+        self.session.patch.assert_not_called()
+
+    def test_coalesced_changes_keep_their_own_command(self):
+        """
+        Tests if a downgrade after an upgrade of the same group is not
+        turned into an upgrade to its plan.
+        """
+        results = self.run_coalesced(
+            "free", ("upgrade", "basic"), ("downgrade", "premium")
+        )
+
+        self.assertEqual(
+            results, [(0, "id-1 -- UPGRADED -- from free to basic"), (5, "")]
+        )
+        self.assertEqual(self.patched, ["basic"])
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Test the SubscriptionMigration class from the migration.py file.
+"""
+from unittest import TestCase, mock
+
+from subscription_manager_base.subscription_manager.exceptions import (
+    InvalidSubscriptionError,
+    InvalidUpgradeError,
+)
+from subscription_manager_base.subscription_manager.migration import (
+    MigrationProgress,
+    SubscriptionMigration,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_data import (
+    mock_manager_arguments,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_objects import (
+    MockResponse,
+)
+
+API_URL = mock_manager_arguments["customer_data_api_url"]
+
+
+def customer(number, subscription, features=True):
+    """
+    Returns the customer data of a test customer.
+    """
+    data = {"SUBSCRIPTION": subscription, "UPGRADE_DATE": "2020-01-10T09:25:00Z"}
+    if features:
+        data["ENABLED_FEATURES"] = {"ENABLE_EDXNOTES": True}
+    return {"id": f"customer-{number}", "data": data, "version": number}
+
+
+class SubscriptionMigrationTestCase(TestCase):
+    """
+    Tests for the subscription migration class.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        self.session = mock.MagicMock()
+        self.session.get.side_effect = [
+            MockResponse(
+                200,
+                response_data={
+                    "results": [customer(1, "premium"), customer(2, "basic")],
+                    "next": f"{API_URL}?cursor=next",
+                },
+            ),
+            MockResponse(
+                200,
+                response_data={
+                    "results": [customer(3, "premium", features=False)],
+                    "next": None,
+                },
+            ),
+        ]
+        self.session.patch.side_effect = [
+            MockResponse(
+                200,
+                response_data={
+                    "results": [{"status": "updated"}, {"status": "conflict"}]
+                },
+            ),
+            MockResponse(200, response_data={"results": [{"status": "updated"}]}),
+        ]
+
+    def migration(self, command, old_subscriptions, new_subscription):
+        """
+        Returns a migration of the test customers with chunks of two.
+        """
+        return SubscriptionMigration(
+            API_URL,
+            mock_manager_arguments["subscriptions"],
+            command,
+            old_subscriptions,
+            new_subscription,
+            session=self.session,
+            chunk_size=2,
+            filters={"enabled_features": ["ENABLE_EDXNOTES"]},
+        )
+
+    def test_run_sends_the_changes_of_every_chunk_in_bulk(self):
+        """
+        Tests if every chunk of customers is changed with a single bulk
+        update, with the rules of the transition, and the progress is counted.
+        """
+        migration = self.migration("downgrade", ["premium", "basic"], "free")
+
+        progress = list(migration.run())
+
+        first = self.session.patch.call_args_list[0].kwargs["json"]["changes"]
+        second = self.session.patch.call_args_list[1].kwargs["json"]["changes"]
+        params = self.session.get.call_args_list[0].kwargs["params"]
+        self.assertEqual(
+            progress,
+            [
+                MigrationProgress(1, 1, 0, "customer-2"),
+                MigrationProgress(2, 1, 0, "customer-3"),
+            ],
+        )
+        self.assertEqual(params["subscription"], "premium,basic")
+        self.assertEqual(params["enabled_features"], "ENABLE_EDXNOTES")
+        self.assertEqual(first[0]["delete"], ["UPGRADE_DATE"])
+        self.assertEqual(first[0]["version"], 1)
+        self.assertEqual(first[0]["update"]["SUBSCRIPTION"], "free")
+        self.assertEqual(
+            first[0]["update"]["ENABLED_FEATURES"], {"ENABLE_EDXNOTES": False}
+        )
+        self.assertEqual(
+            first[0]["update"]["DOWNGRADE_DATE"], first[1]["update"]["DOWNGRADE_DATE"]
+        )
+        self.assertNotIn("ENABLED_FEATURES", second[0]["update"])
+
+    def test_run_rejects_the_changes_that_are_not_allowed(self):
+        """
+        Tests if the migration fails before sending anything when the
+        change is not allowed from one of the old subscriptions.
+        """
+        with self.assertRaises(InvalidUpgradeError):
+            list(self.migration("upgrade", ["free", "premium"], "basic").run())
+        with self.assertRaises(InvalidSubscriptionError):
+            list(self.migration("upgrade", ["free"], "gold").run())
+        with self.assertRaises(ValueError):
+            self.migration("upgrade", [], "basic")
+
+        self.session.get.assert_not_called()
+        self.session.patch.assert_not_called()
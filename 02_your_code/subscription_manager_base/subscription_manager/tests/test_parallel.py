@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Test the ParallelSubscriptionManager class from the parallel.py file.
+"""
+import io
+import threading
+import time
+from unittest import TestCase
+
+from subscription_manager_base.subscription_manager.batch import ChangeRequest
+from subscription_manager_base.subscription_manager.parallel import (
+    ParallelSubscriptionManager,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_data import (
+    mock_customer_data,
+    mock_manager_arguments,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_objects import (
+    mock_session,
+)
+
+
+class ParallelSubscriptionManagerTestCase(TestCase):
+    """
+    Tests for the parallel subscription manager class.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        self.session = mock_session(mock_customer_data)
+        mock_customer_data["data"]["SUBSCRIPTION"] = "basic"
+
+    def build_manager(self, **kwargs):
+        """
+        Returns a ParallelSubscriptionManager using the mock session.
+        """
+        return ParallelSubscriptionManager(
+            mock_manager_arguments["customer_data_api_url"],
+            mock_manager_arguments["subscriptions"],
+            session=self.session,
+            **kwargs,
+        )
+
+    def test_run_changes_returns_the_results_in_input_order(self):
+        """
+        Tests if the results come back in the order of the changes,
+        even when the first change is the last one to finish.
+        """
+        response = self.session.get.return_value
+
+        def get(url, **kwargs):  # pylint: disable=unused-argument
+            if "id-1" in url:
+                time.sleep(0.05)
+            return response
+
+        self.session.get.side_effect = get
+        changes = [
+            ChangeRequest("id-1", "upgrade", "premium"),
+            ChangeRequest("id-2", "upgrade", "free"),
+            ChangeRequest("id-3", "downgrade", ""),
+            ChangeRequest("id-4", "downgrade", "free"),
+        ]
+        with self.build_manager(workers=4) as manager:
+            results = manager.run_changes(changes)
+
+        self.assertEqual(
+            [result.customer_id for result in results], [f"id-{n}" for n in range(1, 5)]
+        )
+        self.assertEqual([result.exit_code for result in results], [0, 4, 1, 0])
+        self.assertEqual(results[0].report, "id-1 -- UPGRADED -- from basic to premium")
+
+    def test_run_changes_applies_the_changes_in_parallel(self):
+        """
+        Tests if up to `workers` changes are applied at once, sharing
+        the same session.
+        """
+        barrier = threading.Barrier(3, timeout=2)
+        response = self.session.get.return_value
+
+        def get(*args, **kwargs):  # pylint: disable=unused-argument
+            barrier.wait()
+            return response
+
+        self.session.get.side_effect = get
+        changes = [ChangeRequest(f"id-{n}", "upgrade", "premium") for n in range(3)]
+        with self.build_manager(workers=3) as manager:
+            results = manager.run_changes(changes)
+
+        self.assertTrue(all(result.exit_code == 0 for result in results))
+        self.assertEqual(self.session.get.call_count, 3)
+
+    def test_run_writes_the_report_in_input_order(self):
+        """
+        Tests if the run method writes one report row per
+        change, in the order of the input.
+        """
+        input_stream = io.StringIO(
+            "id-1,upgrade,premium\nid-2,downgrade,free\nid-3,upgrade,free\n"
+        )
+        report_stream = io.StringIO()
+        with self.build_manager(workers=2) as manager:
+            failed = manager.run(input_stream, report_stream)
+
+        rows = report_stream.getvalue().splitlines()
+        self.assertEqual(failed, 1)
+        self.assertEqual(
+            [row.split(",")[0] for row in rows[1:]], ["id-1", "id-2", "id-3"]
+        )
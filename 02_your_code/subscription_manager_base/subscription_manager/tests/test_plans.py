@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Test the PlanRegistry class from the plans.py file.
+"""
+import copy
+from unittest import TestCase, mock
+
+from subscription_manager_base.subscription_manager.core import DowngradeSubscription
+from subscription_manager_base.subscription_manager.plans import (
+    Plan,
+    PlanRegistry,
+)
+from subscription_manager_base.subscription_manager.tests.mocks.mock_data import (
+    mock_customer_data,
+    mock_manager_arguments,
+)
+
+PLAN_SETTINGS = {
+    "starter": {"level": 1, "free": True},
+    "basic": {"level": 2},
+    "premium": 3,
+}
+
+
+class PlanRegistryTestCase(TestCase):
+    """
+    Tests for the plan registry class.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        self.registry = PlanRegistry(PLAN_SETTINGS)
+
+    def test_registry_builds_the_plans_of_both_settings_formats(self):
+        """
+        Tests if the plans are built from their attributes or from
+        their level only, and the registry maps names to levels.
+        """
+        self.assertEqual(
+            self.registry.plans["starter"], Plan("starter", 1, True, frozenset())
+        )
+        self.assertEqual(
+            self.registry.plans["premium"], Plan("premium", 3, False, None)
+        )
+        self.assertTrue(PlanRegistry({"Free": 1}).plans["Free"].free)
+        self.assertEqual(dict(self.registry), {"starter": 1, "basic": 2, "premium": 3})
+
+    def test_registry_precomputes_every_allowed_transition(self):
+        """
+        Tests if the transitions between plans of different levels
+        are computed with the actions of their rules.
+        """
+        downgrade = self.registry.transition("downgrade", "premium", "starter")
+        upgrade = self.registry.transition("upgrade", "starter", "basic")
+
+        self.assertEqual(len(self.registry.transitions), 6)
+        self.assertEqual(downgrade.actions.delete_keys, ("UPGRADE_DATE",))
+        self.assertEqual(downgrade.actions.stamp_keys, ("DOWNGRADE_DATE",))
+        self.assertEqual(downgrade.actions.allowed_features, frozenset())
+        self.assertEqual(upgrade.actions.delete_keys, ("DOWNGRADE_DATE",))
+        self.assertIsNone(upgrade.actions.allowed_features)
+        self.assertIsNone(
+            self.registry.transition(
+                "downgrade", "premium", "basic"
+            ).actions.allowed_features
+        )
+
+    def test_transition_returns_none_when_the_command_does_not_allow_it(self):
+        """
+        Tests if the transitions to a plan of the same level, to an
+        unknown plan or in the other direction are not allowed.
+        """
+        self.assertIsNone(self.registry.transition("upgrade", "basic", "basic"))
+        self.assertIsNone(self.registry.transition("upgrade", "basic", "starter"))
+        self.assertIsNone(self.registry.transition("upgrade", "unknown", "premium"))
+
+    def test_from_subscriptions_compiles_the_settings_only_once(self):
+        """
+        Tests if the from_subscriptions method returns the given registry as is.
+        """
+        self.assertIs(PlanRegistry.from_subscriptions(self.registry), self.registry)
+        self.assertIsInstance(
+            PlanRegistry.from_subscriptions(PLAN_SETTINGS), PlanRegistry
+        )
+
+    def test_downgrade_uses_the_attributes_of_the_plans(self):
+        """
+        Tests if downgrading to a free plan disables the enabled
+        features, whatever the name of the plan.
+        """
+        manager = DowngradeSubscription(**mock_manager_arguments)
+        manager.subscriptions = self.registry
+        manager.new_subscription = "starter"
+        manager.use_customer_data(copy.deepcopy(mock_customer_data))
+
+        self.assertTrue(manager.apply_changes())
+        features = manager.customer_data["data"]["ENABLED_FEATURES"]
+        self.assertFalse(any(features.values()))
+        self.assertIn("DOWNGRADE_DATE", manager.customer_data["data"])
+
+    def test_manager_compiles_the_plain_subscriptions_once(self):
+        """
+        Tests if a manager given the plain levels compiles their registry
+        once, not every time a change is validated and applied.
+        """
+        customer_data = copy.deepcopy(mock_customer_data)
+        customer_data["data"]["SUBSCRIPTION"] = "premium"
+        with mock.patch.object(
+            PlanRegistry, "from_subscriptions", wraps=PlanRegistry.from_subscriptions
+        ) as compile_registry:
+            manager = DowngradeSubscription(**mock_manager_arguments)
+            manager.use_customer_data(customer_data)
+            self.assertTrue(manager.apply_changes())
+            self.assertTrue(manager.downgrade_is_valid())
+
+        compile_registry.assert_called_once_with(
+            mock_manager_arguments["subscriptions"]
+        )
+        self.assertEqual(manager.customer_data["data"]["SUBSCRIPTION"], "basic")
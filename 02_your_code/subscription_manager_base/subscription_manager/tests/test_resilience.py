@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Test the retries and the circuit breaker from the resilience.py file.
+"""
+import threading
+from unittest import TestCase, mock
+
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+from subscription_manager_base.subscription_manager.batch import (
+    BatchSubscriptionManager,
+)
+from subscription_manager_base.subscription_manager.resilience import (
+    CircuitBreaker,
+    ResilientSession,
+    RetryPolicy,
+)
+from subscription_manager_base.subscription_manager.sessions import build_session
+from subscription_manager_base.subscription_manager.tests.mocks.mock_objects import (
+    MockResponse,
+)
+
+URL = "http://localhost:8010/api/v1/customerdata/"
+
+
+class RetryPolicyTestCase(TestCase):
+    """
+    Tests for the retry policy class.
+    """
+
+    def test_delay_grows_exponentially_up_to_the_maximum(self):
+        """
+        Tests if the delays double with every attempt, up to the
+        maximum backoff, and are drawn below that limit.
+        """
+        policy = RetryPolicy(retries=5, backoff=0.5, max_backoff=3, rand=lambda: 1)
+        half = RetryPolicy(backoff=0.5, rand=lambda: 0.5)
+
+        self.assertEqual(
+            [policy.delay(attempt) for attempt in range(4)], [0.5, 1, 2, 3]
+        )
+        self.assertEqual(half.delay(2), 1)
+        self.assertEqual(policy.max_delay(), 9.5)
+
+    def test_should_retry_only_the_requests_safe_to_send_again(self):
+        """
+        Tests if the idempotent requests are retried after a dropped
+        connection or a gateway error, the rest only when they never
+        reached the API, and none after the last attempt.
+        """
+        policy = RetryPolicy(retries=2)
+        dropped = requests.exceptions.ConnectionError()
+        unreachable = requests.exceptions.ConnectTimeout()
+        refused = requests.exceptions.ConnectionError(
+            MaxRetryError(None, URL, NewConnectionError(None, "refused"))
+        )
+
+        self.assertTrue(policy.should_retry("get", 0, error=dropped))
+        self.assertTrue(policy.should_retry("PATCH", 1, error=unreachable))
+        self.assertTrue(policy.should_retry("POST", 0, error=refused))
+        self.assertTrue(policy.should_retry("GET", 0, response=MockResponse(503)))
+        self.assertFalse(policy.should_retry("PATCH", 0, error=dropped))
+        self.assertFalse(policy.should_retry("GET", 0, response=MockResponse(404)))
+        self.assertFalse(policy.should_retry("GET", 2, error=dropped))
+        self.assertFalse(
+            policy.should_retry("GET", 0, error=requests.exceptions.InvalidURL())
+        )
+
+
+class CircuitBreakerTestCase(TestCase):
+    """
+    Tests for the circuit breaker class.
+    """
+
+    def test_breaker_opens_after_the_failures_in_a_row(self):
+        """
+        Tests if the circuit opens after `failure_threshold` failures in
+        a row, pauses the requests and closes after a successful probe.
+        """
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record(False)
+        breaker.record(True)
+        breaker.record(False)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        breaker.record(False)
+        breaker.record(False)
+        self.assertEqual((breaker.state, breaker.opens), (CircuitBreaker.OPEN, 1))
+
+        breaker.acquire()
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertGreater(breaker.paused, 0.03)
+        breaker.record(True)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_waiting_requests_go_on_after_the_probe(self):
+        """
+        Tests if the requests that wait for the probe go on when it
+        succeeds, and a failed probe opens the circuit again.
+        """
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.02)
+        breaker.record(False)
+        breaker.acquire()
+        breaker.record(False)
+        self.assertEqual(breaker.opens, 2)
+
+        breaker.acquire()
+        waiting = threading.Thread(target=breaker.acquire)
+        waiting.start()
+        breaker.record(True)
+        waiting.join(1)
+
+        self.assertFalse(waiting.is_alive())
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class ResilientSessionTestCase(TestCase):
+    """
+    Tests for the resilient session class.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        self.sleep = mock.MagicMock()
+        self.breaker = CircuitBreaker(failure_threshold=5)
+        self.session = ResilientSession(
+            RetryPolicy(retries=2, rand=lambda: 1), self.breaker, sleep=self.sleep
+        )
+
+    def test_session_retries_the_failed_idempotent_requests(self):
+        """
+        Tests if a GET that failed is sent again after the backoff
+        and only its last response reaches the caller.
+        """
+        outcomes = [
+            requests.exceptions.ConnectionError(),
+            MockResponse(503),
+            MockResponse(200),
+        ]
+        with mock.patch.object(requests.Session, "request", side_effect=outcomes):
+            response = self.session.get(URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.sleep.call_args_list, [mock.call(0.5), mock.call(1.0)])
+        self.assertEqual(self.session.metrics()["retries"], 2)
+        self.assertEqual(self.breaker.failures, 0)
+
+    def test_session_raises_the_last_error(self):
+        """
+        Tests if a PATCH that may have reached the API is not sent again,
+        and a GET fails with its last error after the retries.
+        """
+        dropped = requests.exceptions.ConnectionError()
+        with mock.patch.object(requests.Session, "request", side_effect=dropped):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.session.patch(URL, json={})
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.session.get(URL)
+
+        metrics = self.session.metrics()
+        self.assertEqual((metrics["retries"], metrics["gave_up"]), (2, 2))
+        self.assertEqual(metrics["breaker_state"], CircuitBreaker.CLOSED)
+        self.assertEqual(self.breaker.failures, 4)
+
+    def test_build_session_and_summary_use_the_resilient_session(self):
+        """
+        Tests if build_session returns a resilient session with a retry
+        policy, whose metrics are added to the summary of a batch, and
+        its deadline covers the retries and a pause of the circuit.
+        """
+        session = build_session(retry_policy=RetryPolicy(retries=1, backoff=2))
+        batch_manager = BatchSubscriptionManager(URL, {"free": 1}, session=session)
+
+        self.assertIsInstance(session, ResilientSession)
+        self.assertIsInstance(build_session(), requests.Session)
+        self.assertTrue(
+            batch_manager.summary().endswith("-- 0 retries -- circuit opened 0 times")
+        )
+        self.assertEqual(session.deadline(5), 12)
+        self.assertEqual(self.session.deadline(5), 46.5)
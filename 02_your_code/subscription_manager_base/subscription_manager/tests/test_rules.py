@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Test the rules engine from the rules.py file.
+"""
+from unittest import TestCase
+
+from subscription_manager_base.subscription_manager.plans import PlanRegistry
+from subscription_manager_base.subscription_manager.rules import (
+    build_rule,
+    compile_rules,
+)
+
+NOW = "2024-01-01T00:00:00Z"
+
+PLAN_SETTINGS = {
+    "free": {"level": 1, "free": True},
+    "basic": {"level": 2, "features": ["ENABLE_EDXNOTES"]},
+    "premium": {"level": 3},
+}
+
+FEATURES = {"ENABLE_EDXNOTES": True, "ENABLE_COURSEWARE_SEARCH": True}
+
+
+class RulesTestCase(TestCase):
+    """
+    Tests for the rules engine.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        self.registry = PlanRegistry(PLAN_SETTINGS)
+
+    def test_changes_apply_the_rules_to_a_single_customer(self):
+        """
+        Tests if the actions of a downgrade stamp its date, delete the
+        upgrade date and keep only the features of the new plan.
+        """
+        actions = self.registry.transition("downgrade", "premium", "basic").actions
+        data = {"UPGRADE_DATE": NOW, "ENABLED_FEATURES": FEATURES}
+
+        update, delete = actions.changes(data, NOW)
+
+        self.assertEqual(delete, ["UPGRADE_DATE"])
+        self.assertEqual(
+            update,
+            {
+                "DOWNGRADE_DATE": NOW,
+                "ENABLED_FEATURES": {
+                    "ENABLE_EDXNOTES": True,
+                    "ENABLE_COURSEWARE_SEARCH": False,
+                },
+            },
+        )
+        self.assertEqual(actions.changes({}, NOW), ({"DOWNGRADE_DATE": NOW}, []))
+
+    def test_columns_apply_the_rules_to_a_batch_of_customers(self):
+        """
+        Tests if the actions build the merge patch of a batch of customers
+        column by column, with null for the deleted keys.
+        """
+        actions = self.registry.transition("downgrade", "basic", "free").actions
+
+        columns = actions.columns([FEATURES, {}], NOW)
+
+        self.assertEqual(columns["UPGRADE_DATE"], [None, None])
+        self.assertEqual(columns["DOWNGRADE_DATE"], [NOW, NOW])
+        self.assertEqual(
+            columns["ENABLED_FEATURES"],
+            [{"ENABLE_EDXNOTES": False, "ENABLE_COURSEWARE_SEARCH": False}, {}],
+        )
+
+    def test_compile_rules_merges_the_matching_rules(self):
+        """
+        Tests if only the rules of the command and new plan are merged,
+        and a stamped key is never deleted.
+        """
+        rules = [
+            build_rule({"delete": ["theme_name", "UPGRADE_DATE"]}),
+            build_rule({"command": "upgrade", "stamp": ["UPGRADE_DATE"]}),
+            build_rule({"plans": ["free"], "stamp": ["FREE_SINCE"]}),
+        ]
+
+        actions = compile_rules(rules, "upgrade", self.registry.plans["premium"])
+
+        self.assertEqual(actions.delete_keys, ("theme_name",))
+        self.assertEqual(actions.stamp_keys, ("UPGRADE_DATE",))
+        self.assertIsNone(actions.allowed_features)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Test the connection pooled sessions from the sessions.py file.
+"""
+from unittest import TestCase, mock
+
+import requests
+from subscription_manager_base.subscription_manager.sessions import (
+    build_session,
+    connection_reuse_ratio,
+    connection_stats,
+)
+
+
+class SessionsTestCase(TestCase):
+    """
+    Tests for the connection pooled sessions.
+    """
+
+    def test_build_session_mounts_a_pooled_adapter(self):
+        """
+        Tests if the build_session function returns a session
+        whose adapter uses the given pool limits.
+        """
+        session = build_session(pool_connections=2, pool_maxsize=20, pool_block=True)
+        adapter = session.get_adapter("http://localhost:8010/")
+
+        self.assertIsInstance(session, requests.Session)
+        self.assertEqual(adapter._pool_connections, 2)  # pylint: disable=W0212
+        self.assertEqual(adapter._pool_maxsize, 20)  # pylint: disable=W0212
+        self.assertTrue(adapter._pool_block)  # pylint: disable=W0212
+
+    def test_build_session_can_disable_keep_alive(self):
+        """
+        Tests if the build_session function asks the server to
+        close the connections when keep alive is disabled.
+        """
+        session = build_session(keep_alive=False)
+        self.assertEqual(session.headers["Connection"], "close")
+
+    def test_connection_stats_adds_up_the_pools_of_the_session(self):
+        """
+        Tests if the connection_stats function counts the requests
+        and the connections of every pool of the session.
+        """
+        session = build_session()
+        adapter = session.get_adapter("http://localhost:8010/")
+        pool = adapter.poolmanager.connection_from_url("http://localhost:8010/")
+        pool.num_requests = 10
+        pool.num_connections = 2
+
+        self.assertEqual(connection_stats(session), (10, 2))
+        self.assertAlmostEqual(connection_reuse_ratio(session), 0.8)
+
+    def test_connection_reuse_ratio_is_zero_without_requests(self):
+        """
+        Tests if the connection_reuse_ratio function returns zero
+        when the session did not send any request.
+        """
+        with mock.patch(
+            "subscription_manager_base.subscription_manager.sessions.connection_stats",
+            return_value=(0, 0),
+        ):
+            self.assertEqual(connection_reuse_ratio(build_session()), 0.0)
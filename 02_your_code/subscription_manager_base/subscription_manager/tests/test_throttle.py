@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Test the rate limiter and the adaptive concurrency from the throttle.py file.
+"""
+import threading
+from unittest import TestCase, mock
+
+import requests
+from subscription_manager_base.subscription_manager.batch import (
+    BatchSubscriptionManager,
+)
+from subscription_manager_base.subscription_manager.resilience import (
+    ResilientSession,
+    RetryPolicy,
+)
+from subscription_manager_base.subscription_manager.sessions import build_session
+from subscription_manager_base.subscription_manager.tests.mocks.mock_objects import (
+    MockResponse,
+)
+from subscription_manager_base.subscription_manager.throttle import (
+    AdaptiveConcurrency,
+    TokenBucket,
+    percentile,
+)
+
+URL = "http://localhost:8010/api/v1/customerdata/"
+
+
+class TokenBucketTestCase(TestCase):
+    """
+    Tests for the token bucket class.
+    """
+
+    def test_bucket_lets_a_burst_through_then_spaces_the_requests(self):
+        """
+        Tests if the requests of a burst go on at once, the next ones
+        wait for their token in order, and the bucket refills with time.
+        """
+        now = [0.0]
+        sleep = mock.MagicMock()
+        bucket = TokenBucket(rate=10, burst=2, clock=lambda: now[0], sleep=sleep)
+
+        for _ in range(4):
+            bucket.acquire()
+        self.assertEqual(
+            [round(args[0], 6) for args, _ in sleep.call_args_list], [0.1, 0.2]
+        )
+        self.assertAlmostEqual(bucket.throttled, 0.3)
+
+        now[0] = 10.0
+        sleep.reset_mock()
+        bucket.acquire()
+        bucket.acquire()
+        sleep.assert_not_called()
+
+
+class AdaptiveConcurrencyTestCase(TestCase):
+    """
+    Tests for the adaptive concurrency class.
+    """
+
+    def release_window(self, concurrency, latency, overloaded=False):
+        """
+        Sends and ends a whole window of requests with the given latency.
+        """
+        for _ in range(concurrency.window):
+            concurrency.acquire()
+            concurrency.release(latency, overloaded)
+
+    def test_limit_grows_while_the_api_is_healthy(self):
+        """
+        Tests if the limit grows by one after every healthy window,
+        up to the maximum, once the baseline latency is known.
+        """
+        concurrency = AdaptiveConcurrency(initial=2, maximum=4, window=10)
+        for _ in range(4):
+            self.release_window(concurrency, 0.01)
+
+        self.assertEqual(concurrency.baseline, 0.01)
+        self.assertEqual((concurrency.limit, concurrency.increases), (4, 3))
+
+    def test_limit_is_cut_on_overload_and_on_high_latency(self):
+        """
+        Tests if an overloaded answer halves the limit at once, only once
+        per window, and so does a window whose p99 latency grew beyond
+        the tolerance, never below the minimum.
+        """
+        concurrency = AdaptiveConcurrency(initial=8, minimum=2, window=10)
+        self.release_window(concurrency, 0.01)
+
+        concurrency.acquire()
+        concurrency.release(0.01, overloaded=True)
+        concurrency.acquire()
+        concurrency.release(0.01, overloaded=True)
+        self.assertEqual((concurrency.limit, concurrency.decreases), (4, 1))
+
+        self.release_window(concurrency, 0.05)
+        self.release_window(concurrency, 0.05)
+        self.assertEqual((concurrency.limit, concurrency.decreases), (2, 2))
+        self.assertGreater(concurrency.baseline, 0.01)
+
+    def test_requests_wait_for_a_slot_below_the_limit(self):
+        """
+        Tests if a request waits while the limit is reached,
+        and goes on when a request in flight ends.
+        """
+        concurrency = AdaptiveConcurrency(initial=1)
+        concurrency.acquire()
+        waiting = threading.Thread(target=concurrency.acquire)
+        waiting.start()
+        waiting.join(0.05)
+        self.assertTrue(waiting.is_alive())
+
+        concurrency.release(0.01)
+        waiting.join(1)
+        self.assertFalse(waiting.is_alive())
+        self.assertEqual(concurrency.in_flight, 1)
+        self.assertEqual(percentile([3, 1, 2], 0.99), 3)
+
+
+class ThrottledSessionTestCase(TestCase):
+    """
+    Tests for the resilient session with a rate limiter and a concurrency limit.
+    """
+
+    def test_session_throttles_every_attempt(self):
+        """
+        Tests if every attempt of a request takes a token and a slot,
+        and a 429 answer is retried and cuts the concurrency limit.
+        """
+        limiter = mock.MagicMock(rate=10)
+        concurrency = AdaptiveConcurrency(initial=4)
+        session = ResilientSession(
+            RetryPolicy(retries=1, rand=lambda: 0),
+            sleep=mock.MagicMock(),
+            rate_limiter=limiter,
+            concurrency=concurrency,
+        )
+        outcomes = [MockResponse(429), MockResponse(200)]
+        with mock.patch.object(requests.Session, "request", side_effect=outcomes):
+            response = session.get(URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(limiter.acquire.call_count, 2)
+        self.assertEqual((concurrency.in_flight, concurrency.limit), (0, 2))
+        metrics = session.metrics()
+        self.assertEqual((metrics["retries"], metrics["concurrency_limit"]), (1, 2))
+
+    def test_session_releases_the_slot_on_any_error(self):
+        """
+        Tests if an attempt that fails with an error that is not a
+        RequestException still releases its concurrency slot.
+        """
+        concurrency = AdaptiveConcurrency(initial=1)
+        session = ResilientSession(RetryPolicy(retries=0), concurrency=concurrency)
+        with mock.patch.object(requests.Session, "request", side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                session.get(URL)
+
+        self.assertEqual(concurrency.in_flight, 0)
+
+    def test_build_session_and_summary_use_the_throttles(self):
+        """
+        Tests if build_session returns a resilient session with a
+        concurrency limit, whose limit is added to the summary of a batch,
+        and its deadline covers the waits behind the other callers.
+        """
+        session = build_session(
+            retry_policy=RetryPolicy(retries=0),
+            rate_limiter=TokenBucket(rate=5),
+            concurrency=AdaptiveConcurrency(initial=3, minimum=2),
+        )
+        batch_manager = BatchSubscriptionManager(URL, {"free": 1}, session=session)
+
+        self.assertIsInstance(session, ResilientSession)
+        self.assertTrue(batch_manager.summary().endswith("-- concurrency limit 3"))
+        self.assertEqual(session.deadline(5), 5.2)
+        self.assertEqual(session.deadline(5, callers=10), 27)
+        self.assertEqual(session.deadline(5, callers=100), 60)
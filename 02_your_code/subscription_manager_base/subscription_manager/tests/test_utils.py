@@ -3,7 +3,11 @@ Test the core classes of the subscription manager library.
 """
 from unittest import TestCase
 from datetime import datetime
-from subscription_manager_base.subscription_manager.utils import get_standard_datetime
+from subscription_manager_base.subscription_manager.utils import (
+    get_standard_datetime,
+    is_valid_uuid,
+    version_etag,
+)
 
 
 class TestUtils(TestCase):
@@ -21,3 +25,20 @@ class TestUtils(TestCase):
             datetime.strptime(datetime_string, "%Y-%m-%dT%H:%M:%SZ")
         except ValueError:
             self.fail("Incorrect date format")
+
+    def test_is_valid_uuid(self):
+        """
+        Tests if the is_valid_uuid function only accepts
+        well formatted UUIDs.
+        """
+        self.assertTrue(is_valid_uuid("1b2f7b83-7b4d-441d-a210-afaa970e5b76"))
+        self.assertFalse(is_valid_uuid("not-a-uuid"))
+        self.assertFalse(is_valid_uuid(None))
+
+    def test_version_etag(self):
+        """
+        Tests if the version_etag function returns the entity tag of
+        the version of the customer data, or None without version.
+        """
+        self.assertEqual(version_etag({"data": {}, "version": 3}), '"3"')
+        self.assertIsNone(version_etag({"data": {}}))
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Test the SubscriptionWorker class from the worker.py file.
+"""
+import json
+import os
+import socket
+import stat
+import tempfile
+import threading
+from unittest import TestCase, mock
+
+from subscription_manager_base.subscription_manager.batch import ChangeResult
+from subscription_manager_base.subscription_manager.jobs import send_job
+from subscription_manager_base.subscription_manager.logging_config import logging
+from subscription_manager_base.subscription_manager.worker import (
+    SubscriptionWorker,
+)
+
+
+def run_change(change):
+    """
+    Fake run_change method of the batch manager, which logs an
+    error for the downgrades.
+    """
+    if change.command == "downgrade":
+        logging.error("Attempted to downgrade from free to free.")
+        return ChangeResult(*change, 5, "")
+    return ChangeResult(*change, 0, f"{change.customer_id} -- UPGRADED")
+
+
+class SubscriptionWorkerTestCase(TestCase):
+    """
+    Tests for the subscription worker class.
+    """
+
+    def setUp(self):
+        """
+        Setup common conditions for test cases.
+        """
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.socket_path = os.path.join(self.directory.name, "worker.sock")
+        self.batch_manager = mock.MagicMock()
+        self.batch_manager.run_change.side_effect = run_change
+        self.worker = SubscriptionWorker(self.batch_manager, self.socket_path)
+        self.thread = threading.Thread(
+            target=self.worker.serve_forever, kwargs={"poll_interval": 0.05}
+        )
+
+    def tearDown(self):
+        """
+        Stops the worker and removes its socket.
+        """
+        self.worker.shutdown()
+        if self.thread.is_alive():
+            self.thread.join()
+        logging.getLogger().removeHandler(self.worker.job_errors)
+        self.directory.cleanup()
+
+    def start(self):
+        """
+        Starts the worker in a thread and waits for its socket.
+        """
+        self.thread.start()
+        while not self.socket_is_ready():
+            self.thread.join(0.01)
+
+    def socket_is_ready(self):
+        """
+        Checks if the socket of the worker was created.
+        """
+        try:
+            return stat.S_ISSOCK(os.stat(self.socket_path).st_mode)
+        except FileNotFoundError:
+            return False
+
+    def test_run_job_returns_the_result_and_the_errors_of_the_job(self):
+        """
+        Tests if the run_job method returns the exit code, the report
+        and only the errors logged while applying the job.
+        """
+        logging.error("Logged outside of the job.")
+        result = self.worker.run_job(
+            {"command": "downgrade", "customer_id": "id-1", "plan": "free"}
+        )
+
+        self.assertEqual(
+            result,
+            {
+                "exit_code": 5,
+                "report": "",
+                "error": "Attempted to downgrade from free to free.",
+            },
+        )
+
+    def test_run_job_applies_the_jobs_of_a_customer_one_at_a_time(self):
+        """
+        Tests if the jobs of one customer sent at once never run at the
+        same time, while the jobs of other customers still do.
+        """
+        lock = threading.Lock()
+        running = {}
+        overlapped = []
+
+        def slow_run_change(change):
+            with lock:
+                running[change.customer_id] = running.get(change.customer_id, 0) + 1
+                overlapped.append(running[change.customer_id] > 1)
+            threading.Event().wait(0.01)
+            with lock:
+                running[change.customer_id] -= 1
+            return run_change(change)
+
+        self.batch_manager.run_change.side_effect = slow_run_change
+        jobs = [
+            {"command": "upgrade", "customer_id": f"id-{i % 2}", "plan": "premium"}
+            for i in range(8)
+        ]
+        threads = [
+            threading.Thread(target=self.worker.run_job, args=(job,)) for job in jobs
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.batch_manager.run_change.call_count, 8)
+        self.assertFalse(any(overlapped))
+
+    def test_answers_the_jobs_sent_to_the_socket(self):
+        """
+        Tests if the jobs sent through the socket are applied by the
+        batch manager and answered with their result.
+        """
+        self.start()
+
+        result = send_job(self.socket_path, "upgrade", "id-1", "premium")
+
+        self.assertEqual(result["exit_code"], 0)
+        self.assertEqual(result["report"], "id-1 -- UPGRADED")
+        self.batch_manager.run_change.assert_called_once()
+
+    def send_line(self, line):
+        """
+        Sends a raw line to the worker and returns its answer.
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(self.socket_path)
+            client.sendall(line)
+            return json.loads(client.makefile("rb").readline())
+
+    def test_answers_malformed_jobs_with_exit_code_1(self):
+        """
+        Tests if a job that is not a JSON line, not an object, or
+        with fields that are not strings gets the exit code 1.
+        """
+        self.start()
+        lines = [
+            b"not json\n",
+            b"[1, 2]\n",
+            b'{"customer_id": 1, "command": "upgrade", "plan": "premium"}\n',
+        ]
+        results = [self.send_line(line) for line in lines]
+
+        self.assertEqual([result["exit_code"] for result in results], [1, 1, 1])
+        self.batch_manager.run_change.assert_not_called()
+
+    def test_answers_the_jobs_that_fail_unexpectedly(self):
+        """
+        Tests if a job whose change raises an unexpected error is
+        still answered, with the exit code of a failed update.
+        """
+        self.batch_manager.run_change.side_effect = RuntimeError("unexpected")
+        self.start()
+
+        with self.assertLogs(level="ERROR"):
+            result = send_job(self.socket_path, "upgrade", "id-1", "premium")
+
+        self.assertEqual(result["exit_code"], 6)
+        self.assertEqual(
+            result["error"], "The job failed unexpectedly, please try again later."
+        )
+
+    def test_replaces_the_socket_of_a_stopped_worker(self):
+        """
+        Tests if the worker starts when a stopped worker left its
+        socket behind, but not when another worker is listening.
+        """
+        with open(self.socket_path, "w", encoding="utf-8"):
+            pass
+        self.start()
+
+        other_worker = SubscriptionWorker(self.batch_manager, self.socket_path)
+        with self.assertRaises(OSError):
+            other_worker.listen()
+        other_worker.shutdown()
+        logging.getLogger().removeHandler(other_worker.job_errors)
+
+    def test_shutdown_removes_the_socket(self):
+        """
+        Tests if the worker stops and removes its socket on shutdown,
+        and clients then fail to connect.
+        """
+        self.start()
+        self.worker.shutdown()
+        self.thread.join()
+
+        self.assertFalse(os.path.exists(self.socket_path))
+        with self.assertRaises(FileNotFoundError):
+            send_job(self.socket_path, "upgrade", "id-1", "premium")
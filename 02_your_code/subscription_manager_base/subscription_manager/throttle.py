@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Client side rate limiting and adaptive concurrency of the requests to the customer data API.
+"""
+import threading
+import time
+
+
+def percentile(samples, fraction):
+    """
+    Returns the value below which the given fraction of the samples fall.
+    """
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class TokenBucket:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """
+    Lets through up to `rate` requests per second on average, and bursts
+    of up to `burst` requests after a quiet period. A request that finds
+    the bucket empty reserves the next token and waits for it, so the
+    waiting requests go on in order, one every 1 / `rate` seconds.
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        """
+        Attributes:
+        - rate (float):      Tokens added to the bucket per second.
+        - burst (int):       Maximum number of tokens kept in the bucket.
+        - clock (callable):  Returns the current time in seconds.
+        - sleep (callable):  Waits the given seconds.
+        - tokens (float):    Tokens in the bucket, negative when reserved ahead.
+        - updated_at (float): Time the tokens were last added.
+        - throttled (float): Seconds the requests spent waiting, added up.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(burst)
+        self.updated_at = clock()
+        self.throttled = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes a token from the bucket, waiting for it when it is empty.
+        """
+        with self.lock:
+            now = self.clock()
+            elapsed = now - self.updated_at
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.throttled += wait
+        if wait:
+            self.sleep(wait)
+
+
+class AdaptiveConcurrency:  # pylint: disable=too-many-instance-attributes
+    """
+    Limits the requests in flight at once, and adapts the limit to the
+    health of the API with additive increase and multiplicative decrease
+    (AIMD). The latency of every request is kept for a window of `window`
+    requests. After a window with a p99 latency close to the baseline,
+    the lowest p99 seen, the limit grows by one. An overloaded answer (a
+    5xx, a 429 or a failed request), or a window whose p99 grew beyond
+    `tolerance` times the baseline, cuts the limit by `backoff`, at most
+    once per window. The baseline follows the p99 slowly when it rises,
+    so a service that is just slower does not shrink the limit forever.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        initial=10,
+        minimum=1,
+        maximum=50,
+        window=50,
+        tolerance=2.0,
+        backoff=0.5,
+    ):
+        """
+        Attributes:
+        - limit (float):        Current number of requests allowed in flight.
+        - minimum (int):        Lowest limit.
+        - maximum (int):        Highest limit.
+        - window (int):         Requests between two adjustments of the limit.
+        - tolerance (float):    Ratio of the p99 latency to its baseline that
+                                counts as an overloaded API.
+        - backoff (float):      Factor applied to the limit on overload.
+        - in_flight (int):      Requests sent and not answered yet.
+        - samples (list):       Latencies in seconds of the current window.
+        - baseline (float):     p99 latency of the API when it is healthy.
+        - decreased (bool):     The limit was already cut in the current window.
+        - increases (int):      Times the limit was raised.
+        - decreases (int):      Times the limit was cut.
+        - condition (Condition): Wakes up the requests waiting for a slot.
+        """
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.window = window
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self.samples = []
+        self.baseline = None
+        self.decreased = False
+        self.increases = 0
+        self.decreases = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Waits until the requests in flight are below the limit,
+        and counts one more.
+        """
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency, overloaded=False):
+        """
+        Counts the end of a request, with its latency in seconds and
+        whether the API answered that it is overloaded, and adjusts
+        the limit when due.
+        """
+        with self.condition:
+            self.in_flight -= 1
+            self.samples.append(latency)
+            if overloaded and not self.decreased:
+                self.decrease()
+            if len(self.samples) >= self.window:
+                self.adjust()
+            self.condition.notify_all()
+
+    def decrease(self):
+        """
+        Cuts the limit by the backoff factor.
+        """
+        self.limit = max(self.minimum, self.limit * self.backoff)
+        self.decreased = True
+        self.decreases += 1
+
+    def adjust(self):
+        """
+        Raises or cuts the limit from the latencies of
+        the window that ended, and starts a new one.
+        """
+        p99 = percentile(self.samples, 0.99)
+        if self.baseline is None or p99 < self.baseline:
+            self.baseline = p99
+        elif not self.decreased:
+            if p99 > self.baseline * self.tolerance:
+                self.decrease()
+            else:
+                self.limit = min(self.maximum, self.limit + 1)
+                self.increases += 1
+            self.baseline += (p99 - self.baseline) * 0.1
+        self.samples = []
+        self.decreased = False
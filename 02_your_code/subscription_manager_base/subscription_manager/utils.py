@@ -2,6 +2,7 @@
 """
 Utilities for the subscription manager library.
 """
+import uuid
 from datetime import datetime
 
 import pytz
@@ -15,3 +16,24 @@ def get_standard_datetime():
     now = datetime.now(pytz.utc)
     iso_8601_datetime_standard = now.strftime("%Y-%m-%dT%H:%M:%SZ")
     return iso_8601_datetime_standard
+
+
+def is_valid_uuid(value):
+    """
+    Checks if the given string is a well formatted UUID.
+    """
+    try:
+        uuid.UUID(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def version_etag(customer_data):
+    """
+    Returns the entity tag the customer data API gives to the
+    version of the given customer data, None when it has none.
+    """
+    if "version" not in customer_data:
+        return None
+    return f'"{customer_data["version"]}"'
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Long running worker that applies the jobs sent to its Unix socket.
+"""
+import contextlib
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from subscription_manager_base.subscription_manager.batch import (
+    MISSING_ARGUMENTS_EXIT_CODE,
+    ChangeRequest,
+)
+from subscription_manager_base.subscription_manager.exceptions import (
+    CustomerDataUpdateError,
+)
+from subscription_manager_base.subscription_manager.jobs import (
+    read_message,
+    write_message,
+)
+from subscription_manager_base.subscription_manager.lanes import LaneScheduler
+from subscription_manager_base.subscription_manager.logging_config import logging
+
+
+# Fields of a job, all of them strings.
+JOB_FIELDS = ("customer_id", "command", "plan")
+
+
+def job_error(exit_code, message):
+    """
+    Returns the result of a job that failed before applying its change.
+    """
+    return {"exit_code": exit_code, "report": "", "error": message}
+
+
+class JobErrors(logging.Handler):
+    """
+    Logging handler that keeps the errors logged by every job, so they
+    are sent back to its client instead of only to the log file.
+    """
+
+    def __init__(self):
+        """
+        Attributes:
+        - local (threading.local): Messages logged by the job of every thread.
+        """
+        super().__init__(level=logging.ERROR)
+        self.setFormatter(logging.Formatter("%(message)s"))
+        self.local = threading.local()
+
+    def emit(self, record):
+        """
+        Keeps the message when the current thread is running a job.
+        """
+        messages = getattr(self.local, "messages", None)
+        if messages is not None:
+            messages.append(self.format(record))
+
+    @contextlib.contextmanager
+    def capture(self):
+        """
+        Collects the messages logged by the current thread in a list.
+        """
+        self.local.messages = []
+        try:
+            yield self.local.messages
+        finally:
+            self.local.messages = None
+
+
+class SubscriptionWorker:
+    """
+    Keeps the interpreter, the imports and the pooled HTTP session of a
+    BatchSubscriptionManager alive between changes. Every connection to
+    the Unix socket sends one job and gets back its result, while up to
+    `workers` jobs run at once. The jobs of one customer are applied one
+    after the other, in the order they arrived, on the lane of a
+    LaneScheduler, so they never race on its GET/PATCH cycle.
+    """
+
+    def __init__(self, batch_manager, socket_path, workers=4):
+        """
+        Attributes:
+        - batch_manager (BatchSubscriptionManager): Applies the change of every job.
+        - socket_path (str):                        Path of the Unix socket to listen on.
+        - executor (ThreadPoolExecutor):            Runs up to `workers` jobs at once.
+        - scheduler (LaneScheduler):                Keeps the jobs of a customer in order.
+        - job_errors (JobErrors):                   Collects the errors of every job.
+        - server (socket):                          Listening socket, None when stopped.
+        """
+        self.batch_manager = batch_manager
+        self.socket_path = socket_path
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.scheduler = LaneScheduler(batch_manager, lanes=workers)
+        self.job_errors = JobErrors()
+        self.server = None
+        logging.getLogger().addHandler(self.job_errors)
+
+    def run_job(self, job):
+        """
+        Applies the change of a job and returns its result. A job that is
+        not an object of string fields gets the exit code of a badly
+        formed invocation.
+        """
+        if not isinstance(job, dict) or not all(
+            isinstance(job.get(field, ""), str) for field in JOB_FIELDS
+        ):
+            return job_error(
+                MISSING_ARGUMENTS_EXIT_CODE,
+                "The job must be an object with string customer_id, "
+                "command and plan fields.",
+            )
+        change = ChangeRequest(*(job.get(field, "") for field in JOB_FIELDS))
+        lane = self.scheduler.lane_of(change.customer_id)
+        return lane.submit(self.apply_job, change).result()
+
+    def apply_job(self, change):
+        """
+        Applies a ChangeRequest on the current thread and returns
+        its result with the errors logged while applying it.
+        """
+        with self.job_errors.capture() as errors:
+            result = self.batch_manager.run_change(change)
+        return {
+            "exit_code": result.exit_code,
+            "report": result.report,
+            "error": "\n".join(errors),
+        }
+
+    def handle(self, connection):
+        """
+        Reads the job of a connection and answers with its result,
+        also when the job failed with an unexpected error.
+        """
+        with connection, connection.makefile("rwb") as stream:
+            try:
+                job = read_message(stream)
+            except ValueError:
+                result = job_error(
+                    MISSING_ARGUMENTS_EXIT_CODE, "The job is not a valid JSON line."
+                )
+            else:
+                try:
+                    result = self.run_job(job)
+                except Exception:  # pylint: disable=broad-except
+                    logging.exception("The job %s failed unexpectedly.", job)
+                    result = job_error(
+                        CustomerDataUpdateError.exit_code,
+                        "The job failed unexpectedly, please try again later.",
+                    )
+            write_message(stream, result)
+
+    def listen(self):
+        """
+        Binds the Unix socket, replacing the one left by a stopped worker.
+
+        Raises OSError when another worker is listening on it.
+        """
+        with contextlib.suppress(FileNotFoundError, ConnectionRefusedError):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(self.socket_path)
+                raise OSError(f"A worker is already listening on {self.socket_path}.")
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        self.server.listen()
+
+    def serve_forever(self, poll_interval=0.5):
+        """
+        Accepts connections and hands them to the pool of workers until
+        the shutdown method is called, which is checked every
+        `poll_interval` seconds.
+        """
+        self.listen()
+        server = self.server
+        server.settimeout(poll_interval)
+        while self.server is server:
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.executor.submit(self.handle, connection)
+
+    def shutdown(self):
+        """
+        Stops accepting jobs, waits for the running ones and
+        removes the Unix socket.
+        """
+        server, self.server = self.server, None
+        if server:
+            server.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)
+        self.executor.shutdown(wait=True)
+        self.scheduler.close()